@@ -0,0 +1 @@
+"""Offline benchmarks of bwaw hot paths on synthetic data."""
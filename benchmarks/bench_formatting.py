@@ -0,0 +1,51 @@
+"""Benchmarks of UMWaw API responses formatting."""
+import json
+from bwaw.api.formatting import (_format_active_bus_response,
+                                 _format_active_bus_responses_to_dataframe,
+                                 _format_all_coordinates_response,
+                                 _format_all_coordinates_response_to_dataframe,
+                                 _decode_json,
+                                 _format_timetable_on_stop_response)
+from bwaw.utils.format_conversion import convert_response_list_to_dataframe
+
+
+def bench_active_bus_list_of_dicts(context):
+    """Decoding active buses responses through list of dicts."""
+    responses = context.active_bus_responses
+
+    def target():
+        flat = [d for r in responses for d in _format_active_bus_response(r)]
+        return convert_response_list_to_dataframe(flat)
+    return target, sum(len(r['result']) for r in responses)
+
+
+def bench_active_bus_columns(context):
+    """Decoding active buses responses straight into typed columns."""
+    responses = context.active_bus_responses
+    return (lambda: _format_active_bus_responses_to_dataframe(responses),
+            sum(len(r['result']) for r in responses))
+
+
+def bench_coordinates_formatting(context):
+    """Formatting response with all bus stops coordinates."""
+    response = context.coordinates_response
+    return lambda: _format_all_coordinates_response(response), len(response['result'])
+
+
+def bench_coordinates_columns(context):
+    """Decoding response with all bus stops coordinates into typed columns."""
+    response = context.coordinates_response
+    return (lambda: _format_all_coordinates_response_to_dataframe(response),
+            len(response['result']))
+
+
+def bench_coordinates_json_decoding(context):
+    """Decoding raw JSON body with all bus stops coordinates."""
+    body = json.dumps(context.coordinates_response).encode()
+    return lambda: _decode_json(body), len(context.coordinates_response['result'])
+
+
+def bench_timetable_formatting(context):
+    """Formatting response with timetable of line on bus stop."""
+    response = context.timetable_response
+    return lambda: _format_timetable_on_stop_response(response), len(response['result'])
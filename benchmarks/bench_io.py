@@ -0,0 +1,49 @@
+"""Benchmarks of saving and loading active buses data."""
+from bwaw.io.columnar import _to_typed_frame
+from bwaw.io.load import load_response_from_csv, load_response_from_pickle, \
+    load_response_from_columnar
+from bwaw.io.save import save_response_to_csv, save_response_to_pickle, save_response_to_columnar
+
+
+def _save(context, save, name):
+    data = _to_typed_frame(context.fleet)
+    path = context.workdir / name
+    return lambda: save(data, path), len(data)
+
+
+def _load(context, save, load, name):
+    data = _to_typed_frame(context.fleet)
+    path = context.workdir / name
+    if not path.exists():
+        save(data, path)
+    return lambda: load(path), len(data)
+
+
+def bench_save_csv(context):
+    """Saving fleet data to csv."""
+    return _save(context, save_response_to_csv, 'fleet.csv')
+
+
+def bench_load_csv(context):
+    """Loading fleet data from csv."""
+    return _load(context, save_response_to_csv, load_response_from_csv, 'fleet.csv')
+
+
+def bench_save_pickle(context):
+    """Saving fleet data to pickle."""
+    return _save(context, save_response_to_pickle, 'fleet.pkl')
+
+
+def bench_load_pickle(context):
+    """Loading fleet data from pickle."""
+    return _load(context, save_response_to_pickle, load_response_from_pickle, 'fleet.pkl')
+
+
+def bench_save_columnar(context):
+    """Saving fleet data to directory of typed columns."""
+    return _save(context, save_response_to_columnar, 'fleet.cols')
+
+
+def bench_load_columnar(context):
+    """Loading fleet data from directory of typed columns."""
+    return _load(context, save_response_to_columnar, load_response_from_columnar, 'fleet.cols')
@@ -0,0 +1,23 @@
+"""Benchmarks of punctuality analysis."""
+from bwaw.insights.headways import get_headways, get_headways_summary
+from bwaw.insights.punctuality import get_punctuality_report
+from bwaw.insights.stop_events import get_stop_events
+
+
+def bench_punctuality_report(context):
+    """Punctuality report of chosen lines with timetables read from directory."""
+    fleet, stops, timetables = context.punctuality_fleet, context.stops, context.timetables
+    return (lambda: get_punctuality_report(fleet, stops, time=3, proximity=10, path=timetables),
+            len(fleet))
+
+
+def bench_stop_events(context):
+    """Stop visits of the whole fleet interpolated between pings."""
+    fleet, stops = context.fleet, context.stops
+    return lambda: get_stop_events(fleet, stops), len(fleet)
+
+
+def bench_headways(context):
+    """Observed headways and their summary for stop visits of the whole fleet."""
+    events = context.stop_events
+    return lambda: get_headways_summary(get_headways(events), by_stop=True), len(events)
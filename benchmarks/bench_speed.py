@@ -0,0 +1,16 @@
+"""Benchmarks of speed incidents detection."""
+from bwaw.insights.speed import get_all_incidents, get_full_incidents_summary
+
+SPEED_LIMIT = 50
+
+
+def bench_all_incidents(context):
+    """Finding speed incidents of the whole fleet."""
+    fleet = context.fleet
+    return lambda: get_all_incidents(fleet, SPEED_LIMIT), len(fleet)
+
+
+def bench_full_incidents_summary(context):
+    """Finding speed incidents with locations summary."""
+    fleet = context.fleet
+    return lambda: get_full_incidents_summary(fleet, SPEED_LIMIT), len(fleet)
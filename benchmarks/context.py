@@ -0,0 +1,77 @@
+"""Scales and lazily generated datasets shared by benchmarks."""
+from functools import cached_property
+from pathlib import Path
+from typing import Dict
+import pandas as pd
+
+from benchmarks.synthetic import (synthetic_active_bus_responses, synthetic_fleet,
+                                  synthetic_stops, synthetic_timetables,
+                                  synthetic_coordinates_response, synthetic_timetable_response)
+from bwaw.insights.stop_events import get_stop_events
+
+SCALES = {
+    'small': {'vehicles': 150, 'hours': 1., 'sampling': 10, 'stops': 7000,
+              'punctuality_lines': 2, 'snapshots': 20},
+    'medium': {'vehicles': 1500, 'hours': 2., 'sampling': 10, 'stops': 7000,
+               'punctuality_lines': 5, 'snapshots': 60},
+    'warsaw': {'vehicles': 1500, 'hours': 24., 'sampling': 10, 'stops': 7000,
+               'punctuality_lines': 20, 'snapshots': 360}
+}
+
+
+class BenchmarkContext:
+    """Synthetic datasets of given scale, generated on first use and reused by benchmarks."""
+
+    def __init__(self, scale: Dict, workdir: Path):
+        """
+        Args:
+            scale: scale parameters (see SCALES)
+            workdir: directory for files created by benchmarks
+        """
+        self.scale = scale
+        self.workdir = workdir
+
+    @cached_property
+    def fleet(self) -> pd.DataFrame:
+        """Active buses data of the whole fleet."""
+        return synthetic_fleet(vehicles=self.scale['vehicles'], hours=self.scale['hours'],
+                               sampling=self.scale['sampling'])
+
+    @cached_property
+    def stops(self) -> pd.DataFrame:
+        """Bus stops coordinates."""
+        return synthetic_stops(stops=self.scale['stops'])
+
+    @cached_property
+    def punctuality_fleet(self) -> pd.DataFrame:
+        """Active buses data restricted to lines used in punctuality benchmarks."""
+        lines = self.fleet['Lines'].cat.categories[:self.scale['punctuality_lines']]
+        return self.fleet[self.fleet['Lines'].isin(lines)].reset_index(drop=True)
+
+    @cached_property
+    def timetables(self) -> Path:
+        """Directory with timetables of all stops visited by punctuality_fleet."""
+        path = self.workdir / 'timetables'
+        synthetic_timetables(path, self.punctuality_fleet, self.stops)
+        return path
+
+    @cached_property
+    def stop_events(self) -> pd.DataFrame:
+        """Stop visits of the whole fleet."""
+        return get_stop_events(self.fleet, self.stops)
+
+    @cached_property
+    def active_bus_responses(self):
+        """Not processed responses with active buses."""
+        return synthetic_active_bus_responses(vehicles=self.scale['vehicles'],
+                                              snapshots=self.scale['snapshots'])
+
+    @cached_property
+    def coordinates_response(self) -> dict:
+        """Not processed response with all coordinates."""
+        return synthetic_coordinates_response(self.stops)
+
+    @cached_property
+    def timetable_response(self) -> dict:
+        """Not processed response with timetable of line on bus stop."""
+        return synthetic_timetable_response()
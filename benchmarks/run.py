@@ -0,0 +1,166 @@
+"""
+Runs benchmarks of bwaw hot paths on synthetic data.
+
+Every function named bench_* in benchmarks/bench_*.py modules takes a BenchmarkContext and
+returns a tuple (target, rows): a callable to be timed and the number of rows it processes.
+
+Usage:
+    python -m benchmarks.run --scale small --output results.json [--compare baseline.json]
+"""
+import argparse
+import importlib
+import json
+import pkgutil
+import platform
+import subprocess
+import sys
+import tempfile
+import tracemalloc
+from pathlib import Path
+from statistics import mean
+from time import perf_counter
+from typing import Callable, Dict, List, Tuple
+import numpy as np
+import pandas as pd
+
+import benchmarks
+from benchmarks.context import SCALES, BenchmarkContext
+
+DEFAULT_MAX_SLOWDOWN = 1.2
+
+
+def discover(pattern: str = None) -> List[Tuple[str, Callable]]:
+    """
+    Finds benchmarks in benchmarks/bench_*.py modules.
+    Args:
+        pattern: substring that benchmark names must contain (all if None)
+
+    Returns:
+        list of (name, function) tuples
+    """
+    found = []
+    for module_info in sorted(pkgutil.iter_modules(benchmarks.__path__), key=lambda i: i.name):
+        if not module_info.name.startswith('bench_'):
+            continue
+        module = importlib.import_module(f'benchmarks.{module_info.name}')
+        for name in dir(module):
+            func = getattr(module, name)
+            if name.startswith('bench_') and callable(func) \
+                    and func.__module__ == module.__name__ \
+                    and (pattern is None or pattern in f'{module_info.name[6:]}.{name[6:]}'):
+                found.append((f'{module_info.name[6:]}.{name[6:]}', func))
+    return found
+
+
+def run_benchmark(func: Callable, context: BenchmarkContext,
+                  repeat: int = 3, memory: bool = True) -> Dict:
+    """
+    Times benchmark and measures its peak memory.
+    Args:
+        func: benchmark function
+        context: datasets shared by benchmarks
+        repeat: number of timed runs
+        memory: if peak memory should be measured (in a separate run under tracemalloc)
+
+    Returns:
+        dict with rows, best and mean time, throughput and peak memory
+    """
+    target, rows = func(context)
+    times = []
+    for _ in range(repeat):
+        start = perf_counter()
+        target()
+        times.append(perf_counter() - start)
+
+    result = {'rows': rows, 'seconds_min': min(times), 'seconds_mean': mean(times),
+              'rows_per_second': rows / min(times) if min(times) > 0 else None}
+    if memory:
+        tracemalloc.start()
+        target()
+        result['peak_bytes'] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return result
+
+
+def compare(results: Dict, baseline: Dict, max_slowdown: float = DEFAULT_MAX_SLOWDOWN) -> List[str]:
+    """
+    Compares results with baseline results.
+    Args:
+        results: benchmarks results
+        baseline: baseline benchmarks results
+        max_slowdown: allowed ratio of best times
+
+    Returns:
+        names of benchmarks slower than allowed
+    """
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        ratio = result['seconds_min'] / baseline[name]['seconds_min']
+        memory = ''
+        if 'peak_bytes' in result and 'peak_bytes' in baseline[name]:
+            memory = f", memory x{result['peak_bytes'] / max(baseline[name]['peak_bytes'], 1):.2f}"
+        print(f'{name}: time x{ratio:.2f}{memory}')
+        if ratio > max_slowdown:
+            regressions.append(name)
+    return regressions
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _parse_arguments(argv: List[str] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', choices=sorted(SCALES), default='small')
+    parser.add_argument('--filter', default=None, help='run benchmarks containing this substring')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--no-memory', action='store_true', help='skip peak memory measurement')
+    parser.add_argument('--output', type=Path, default=None, help='JSON file for results')
+    parser.add_argument('--compare', type=Path, default=None, help='JSON file with baseline')
+    parser.add_argument('--max-slowdown', type=float, default=DEFAULT_MAX_SLOWDOWN)
+    return parser.parse_args(argv)
+
+
+def main(argv: List[str] = None) -> int:
+    """
+    Runs benchmarks from command line.
+    Args:
+        argv: command line arguments
+
+    Returns:
+        exit code (1 if any benchmark regressed against baseline)
+    """
+    arguments = _parse_arguments(argv)
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        context = BenchmarkContext(SCALES[arguments.scale], Path(workdir))
+        for name, func in discover(arguments.filter):
+            results[name] = run_benchmark(func, context, arguments.repeat,
+                                          not arguments.no_memory)
+            result = results[name]
+            peak = f", peak {result['peak_bytes'] / 2 ** 20:.1f} MiB" \
+                if 'peak_bytes' in result else ''
+            print(f"{name}: {result['rows']} rows, {result['seconds_min']:.3f} s{peak}")
+
+    report = {'meta': {'scale': arguments.scale, 'parameters': SCALES[arguments.scale],
+                       'commit': _git_commit(), 'python': platform.python_version(),
+                       'numpy': np.__version__, 'pandas': pd.__version__},
+              'results': results}
+    if arguments.output is not None:
+        arguments.output.write_text(json.dumps(report, indent=2))
+    if arguments.compare is not None:
+        baseline = json.loads(arguments.compare.read_text())['results']
+        if compare(results, baseline, arguments.max_slowdown):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,183 @@
+"""Synthetic Warsaw-scale data for benchmarks."""
+from pathlib import Path
+from typing import List
+import numpy as np
+import pandas as pd
+
+from bwaw.api.bulk import _timetable_file_name
+from bwaw.insights.spatial import BusStopIndex
+
+WARSAW_LAT = (52.10, 52.37)
+WARSAW_LON = (20.85, 21.27)
+START = np.datetime64('2021-02-09T04:00:00')
+STEP_DEGREES = 0.0004
+
+
+def synthetic_active_bus_responses(vehicles: int = 1500,
+                                   snapshots: int = 60,
+                                   seed: int = 0) -> List[dict]:
+    """
+    Generates busestrams_get responses of a fleet polled repeatedly.
+    Args:
+        vehicles: number of vehicles in every snapshot
+        snapshots: number of responses
+        seed: random seed
+
+    Returns:
+        list of not processed responses with active buses
+    """
+    rng = np.random.default_rng(seed)
+    lines = rng.integers(100, 600, size=vehicles).astype(str)
+    brigades = rng.integers(1, 30, size=vehicles).astype(str)
+    lat = rng.uniform(*WARSAW_LAT, size=vehicles)
+    lon = rng.uniform(*WARSAW_LON, size=vehicles)
+    responses = []
+    for snapshot in range(snapshots):
+        time = str(START + np.timedelta64(10 * snapshot, 's')).replace('T', ' ')
+        lat = lat + rng.normal(0, 1e-4, size=vehicles)
+        lon = lon + rng.normal(0, 1e-4, size=vehicles)
+        responses.append({'result': [
+            {'Lines': lines[i], 'Lon': float(lon[i]), 'VehicleNumber': str(1000 + i),
+             'Time': time, 'Lat': float(lat[i]), 'Brigade': brigades[i]}
+            for i in range(vehicles)]})
+    return responses
+
+
+def synthetic_fleet(vehicles: int = 1500,
+                    hours: float = 24.,
+                    sampling: int = 10,
+                    vehicles_per_line: int = 5,
+                    seed: int = 0) -> pd.DataFrame:
+    """
+    Generates active buses data of a fleet moving as random walks.
+    Args:
+        vehicles: number of vehicles
+        hours: length of the period (in hours)
+        sampling: time between pings (in seconds)
+        vehicles_per_line: number of brigades of each line
+        seed: random seed
+
+    Returns:
+        data frame with Lines, Lon, VehicleNumber, Time, Lat, Brigade columns (categoricals for
+        text columns), ordered by time
+    """
+    rng = np.random.default_rng(seed)
+    pings = int(hours * 3600 // sampling)
+    vehicle = np.tile(np.arange(vehicles), pings)
+    step = np.repeat(np.arange(pings), vehicles)
+
+    lat = rng.uniform(*WARSAW_LAT, size=vehicles) \
+        + np.cumsum(rng.normal(0, STEP_DEGREES, size=(pings, vehicles)), axis=0)
+    lon = rng.uniform(*WARSAW_LON, size=vehicles) \
+        + np.cumsum(rng.normal(0, STEP_DEGREES * 1.6, size=(pings, vehicles)), axis=0)
+
+    line_names = np.array([str(100 + i) for i in range(-(-vehicles // vehicles_per_line))])
+    return pd.DataFrame({
+        'Lines': pd.Categorical(line_names[vehicle // vehicles_per_line]),
+        'Lon': lon.ravel(),
+        'VehicleNumber': pd.Categorical((1000 + vehicle).astype(str)),
+        'Time': START + step.astype('timedelta64[s]') * sampling,
+        'Lat': lat.ravel(),
+        'Brigade': pd.Categorical((vehicle % vehicles_per_line + 1).astype(str))
+    })
+
+
+def synthetic_stops(stops: int = 7000, seed: int = 0) -> pd.DataFrame:
+    """
+    Generates bus stops coordinates in get_bus_stops_coordinates format.
+    Args:
+        stops: number of stop posts
+        seed: random seed
+
+    Returns:
+        data frame with ID, Number, Latitude, Longitude, Destination, Validity columns
+    """
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'ID': [str(1000 + i // 2) for i in range(stops)],
+        'Number': [f'0{i % 2 + 1}' for i in range(stops)],
+        'Latitude': rng.uniform(*WARSAW_LAT, size=stops),
+        'Longitude': rng.uniform(*WARSAW_LON, size=stops),
+        'Destination': 'Centrum',
+        'Validity': '2020-10-12 00:00:00.0'
+    })
+
+
+def synthetic_timetables(path: Path,
+                         fleet: pd.DataFrame,
+                         stops: pd.DataFrame,
+                         proximity: int = 10,
+                         headway: int = 600) -> int:
+    """
+    Writes timetables for every (stop, line) pair visited by the fleet.
+    Args:
+        path: directory where timetables are stored
+        fleet: active buses data
+        stops: bus stops coordinates
+        proximity: distance of a visit to a stop (in meters)
+        headway: time between departures of consecutive brigades (in seconds)
+
+    Returns:
+        number of written timetables
+    """
+    path.mkdir(exist_ok=True, parents=True)
+    index = BusStopIndex(stops)
+    nearest = index.nearest(fleet['Lat'].to_numpy(), fleet['Lon'].to_numpy(), proximity / 1000)
+    visits = pd.DataFrame({'Lines': np.asarray(fleet['Lines'])[nearest >= 0],
+                           'Stop': nearest[nearest >= 0]}).drop_duplicates()
+    brigades = fleet.groupby('Lines', observed=True)['Brigade'].unique()
+
+    seconds = np.arange(4 * 3600, 24 * 3600, headway)
+    times = [f'{i // 3600:02d}:{i // 60 % 60:02d}:{i % 60:02d}' for i in seconds]
+    for line, stop in visits.itertuples(index=False):
+        line_brigades = [str(i) for i in brigades[line]]
+        pd.DataFrame({'Brigade': [line_brigades[i % len(line_brigades)]
+                                  for i in range(len(times))],
+                      'Destination': 'Centrum',
+                      'Time': times}).to_csv(
+            path / _timetable_file_name(stops.at[stop, 'ID'], stops.at[stop, 'Number'], line),
+            index=False)
+    return len(visits)
+
+
+def synthetic_coordinates_response(stops: pd.DataFrame) -> dict:
+    """
+    Builds dbstore_get response with bus stops coordinates.
+    Args:
+        stops: bus stops coordinates
+
+    Returns:
+        not processed response with all coordinates
+    """
+    return {'result': [{'values': [
+        {'value': stop.ID, 'key': 'zespol'},
+        {'value': stop.Number, 'key': 'slupek'},
+        {'value': 'Centrum', 'key': 'nazwa_zespolu'},
+        {'value': '2201', 'key': 'id_ulicy'},
+        {'value': str(stop.Latitude), 'key': 'szer_geo'},
+        {'value': str(stop.Longitude), 'key': 'dlug_geo'},
+        {'value': stop.Destination, 'key': 'kierunek'},
+        {'value': stop.Validity, 'key': 'obowiazuje_od'}
+    ]} for stop in stops.itertuples(index=False)]}
+
+
+def synthetic_timetable_response(departures: int = 200, seed: int = 0) -> dict:
+    """
+    Builds dbtimetable_get response with line timetable on bus stop.
+    Args:
+        departures: number of departures
+        seed: random seed
+
+    Returns:
+        not processed response with timetable of line on bus stop
+    """
+    rng = np.random.default_rng(seed)
+    seconds = np.sort(rng.integers(4 * 3600, 26 * 3600, size=departures))
+    return {'result': [{'values': [
+        {'value': 'null', 'key': 'symbol_2'},
+        {'value': 'null', 'key': 'symbol_1'},
+        {'value': f'{i % 20 + 1:03d}', 'key': 'brygada'},
+        {'value': 'Centrum', 'key': 'kierunek'},
+        {'value': 'TP-CEN', 'key': 'trasa'},
+        {'value': f'{t // 3600:02d}:{t // 60 % 60:02d}:{t % 60:02d}', 'key': 'czas'}
+    ]} for i, t in enumerate(seconds)]}
@@ -0,0 +1,337 @@
+"""Asyncio counterparts of UM Warszawa API (UMWaw API) getters."""
+import asyncio
+from contextlib import asynccontextmanager
+from functools import partial
+from typing import AsyncIterator, Dict, List, Union
+from urllib import error, request
+import pandas as pd
+
+from bwaw.api.cache import get_response_cache
+from bwaw.api.download import _endpoint_of, _validate_response
+from bwaw.api.formatting import (_decode_json, _format_bus_stop_id_response,
+                                 _format_all_lines_on_stop_response,
+                                 _format_timetable_on_stop_response, _format_active_bus_response,
+                                 _format_all_coordinates_response,
+                                 _format_all_coordinates_response_to_dataframe,
+                                 _format_active_bus_responses_to_dataframe)
+from bwaw.api.requests import (_create_active_buses_request, _create_bus_stops_ids_request,
+                               _create_lines_on_bus_stop_request,
+                               _create_bus_stops_coordinates_request, _create_timetable_request)
+from bwaw.api.scheduling import FixedRateScheduler
+from bwaw.api.throttling import get_request_throttle
+from bwaw.utils.metrics import increment, timer
+from bwaw.utils.validation import validate_data_is_type
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+DEFAULT_POOL_SIZE = 8
+DEFAULT_TIMEOUT = 30.
+
+
+def _require_aiohttp() -> None:
+    if aiohttp is None:
+        raise ImportError('Async getters require aiohttp. Install it with bwaw[async] extra.')
+
+
+class AsyncSession:
+    """
+    Pooled keep-alive HTTP session shared by async getters, built on aiohttp.
+
+    Connections to each host are reused between requests and at most pool_size of them are
+    open at once. Every request has a timeout covering connecting, sending and reading the
+    whole response. Connections are opened on first request and belong to its event loop;
+    they are closed when the session is exited, after which the session can be used again,
+    also in another event loop (e.g. in the next asyncio.run).
+    """
+
+    def __init__(self, pool_size: int = DEFAULT_POOL_SIZE, timeout: float = DEFAULT_TIMEOUT):
+        """
+        Args:
+            pool_size: maximum number of concurrent connections to a single host
+            timeout: default time limit of a single request (in seconds)
+        """
+        _require_aiohttp()
+        validate_data_is_type(pool_size, int)
+        validate_data_is_type(timeout, (int, float))
+        if pool_size <= 0 or timeout <= 0:
+            raise ValueError('Pool size and timeout must be positive.')
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self._client = None
+        self._loop = None
+
+    def _session(self) -> 'aiohttp.ClientSession':
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client.closed or self._loop is not loop:
+            connector = aiohttp.TCPConnector(limit_per_host=self.pool_size)
+            self._client = aiohttp.ClientSession(connector=connector)
+            self._loop = loop
+        return self._client
+
+    async def _get(self, url: str, timeout: float) -> Dict:
+        endpoint = _endpoint_of(url)
+        with timer('api_request_seconds', endpoint=endpoint):
+            async with self._session().get(url, headers={'Accept': 'application/json'},
+                                           timeout=aiohttp.ClientTimeout(total=timeout)) \
+                    as response:
+                body = await response.read()
+
+        increment('api_responses', endpoint=endpoint, status=response.status)
+        if response.status >= 300:
+            raise error.HTTPError(url=url, code=response.status, msg=response.reason,
+                                  hdrs=response.headers, fp=None)
+        increment('api_response_bytes', len(body), endpoint=endpoint)
+        return _decode_json(body)
+
+    async def get_json(self, url: str, timeout: float = None) -> Dict:
+        """
+        Single GET request over pooled keep-alive connection.
+        Args:
+            url: full url of request
+            timeout: time limit of the request (session timeout if None)
+
+        Returns:
+            decoded response body
+        """
+        try:
+            return await self._get(url, self.timeout if timeout is None else timeout)
+        except asyncio.TimeoutError as err:
+            raise error.URLError(f'Request to {url} timed out.') from err
+        except aiohttp.ClientError as err:
+            raise error.URLError(err) from err
+
+    async def close(self) -> None:
+        """Closes all pooled connections."""
+        if self._client is not None and self._loop is asyncio.get_running_loop():
+            await self._client.close()
+        self._client = None
+        self._loop = None
+
+    async def __aenter__(self) -> 'AsyncSession':
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        await self.close()
+
+
+@asynccontextmanager
+async def _session_scope(session: AsyncSession = None) -> AsyncIterator[AsyncSession]:
+    """Yields given session or temporary one closed afterwards."""
+    if session is not None:
+        validate_data_is_type(session, AsyncSession)
+        yield session
+        return
+    async with AsyncSession() as temporary:
+        yield temporary
+
+
+async def _fetch_resource(session: AsyncSession, url: str, timeout: float = None) -> Dict:
+    """
+    Sends GET request to UMWaw API over async session.
+    Args:
+        session: pooled session
+        url: full request url
+        timeout: time limit of the request (session timeout if None)
+
+    Returns:
+        validated response for url
+    """
+    response = await session.get_json(url, timeout)
+    _validate_response(request.Request(url), response)
+    return response
+
+
+async def _get_resource_from_request(session: AsyncSession,
+                                     resource_request: request.Request,
+                                     timeout: float = None) -> Dict:
+    """
+    Call for request to UMWaw API over async session.
+    Responses of static resources are served from the active response cache, if any, and
+    requests are sent through the active request throttle, if any.
+    Args:
+        session: pooled session
+        resource_request: formatted request
+        timeout: time limit of the request (session timeout if None)
+
+    Returns:
+        validated response for resource_request
+    """
+    url = resource_request.full_url
+    cache = get_response_cache()
+    if cache is not None and cache.is_cacheable(url):
+        response = cache.get(url)
+        if response is not None:
+            increment('api_cache_hits')
+            return response
+
+    throttle = get_request_throttle()
+    if throttle is None:
+        response = await _fetch_resource(session, url, timeout)
+    else:
+        response = await throttle.fetch_async(url, partial(_fetch_resource, session,
+                                                           timeout=timeout))
+    if cache is not None:
+        cache.put(url, response)
+    return response
+
+
+async def get_active_buses(api_key: str,
+                           as_dataframe: bool = False,
+                           session: AsyncSession = None,
+                           timeout: float = None) -> Union[List, pd.DataFrame]:
+    """
+    Get method for list of all currently active buses.
+    Args:
+        api_key: API key provided by UMWaw
+        as_dataframe: if response should be decoded into compact typed data frame
+        session: pooled session (temporary one if None)
+        timeout: time limit of the request (session timeout if None)
+
+    Returns:
+        list (or data frame) of metadata of all currently active buses
+    """
+    validate_data_is_type(api_key, str)
+    async with _session_scope(session) as scope:
+        response = await _get_resource_from_request(scope, _create_active_buses_request(api_key),
+                                                    timeout)
+    if as_dataframe:
+        return _format_active_bus_responses_to_dataframe([response])
+    return _format_active_bus_response(response)
+
+
+# pylint: disable=too-many-arguments
+async def get_active_buses_over_time(api_key: str,
+                                     no_of_requests: int = 1,
+                                     interval_btwn_requests: Union[int, float] = 1,
+                                     align_to_clock: bool = False,
+                                     as_dataframe: bool = False,
+                                     session: AsyncSession = None,
+                                     timeout: float = None) -> Union[List, pd.DataFrame]:
+    """
+    Get method for list of all currently active buses requested over some period.
+    Requests are sent at fixed rate without blocking the event loop, so other requests can be
+    served in between. Failed request ends the collection with its error.
+    Args:
+        api_key: API key provided by UMWaw
+        no_of_requests: number of calls to UMWaw
+        interval_btwn_requests: time [minutes] between calls to UMWaw, e.g. 1 / 6 for 10 seconds
+        align_to_clock: if calls should be made on wall clock multiples of interval
+        as_dataframe: if responses should be decoded into compact typed data frame
+        session: pooled session (temporary one if None)
+        timeout: time limit of a single request (session timeout if None)
+
+    Returns:
+        list (or data frame) of metadata of all currently active buses aggregated from whole period
+    """
+    validate_data_is_type(api_key, str)
+    validate_data_is_type(no_of_requests, int)
+    if no_of_requests <= 0:
+        raise ValueError('Number of requests must be positive.')
+    scheduler = FixedRateScheduler(interval_btwn_requests * 60, align_to_clock=align_to_clock)
+    req = _create_active_buses_request(api_key)
+    responses = []
+    async with _session_scope(session) as scope:
+        for _ in range(no_of_requests):
+            await scheduler.wait_async()
+            responses.append(await _get_resource_from_request(scope, req, timeout))
+    if as_dataframe:
+        return _format_active_bus_responses_to_dataframe(responses)
+    return [d for r in responses for d in _format_active_bus_response(r)]
+# pylint: enable=too-many-arguments
+
+
+async def get_bus_stops_ids_by_name(api_key: str,
+                                    name: str,
+                                    session: AsyncSession = None,
+                                    timeout: float = None) -> List:
+    """
+    Get method for list of all bus stops' ids by bus stop name.
+    Args:
+        api_key: API key provided by UMWaw
+        name: bus stop name
+        session: pooled session (temporary one if None)
+        timeout: time limit of the request (session timeout if None)
+
+    Returns:
+        list of all bus stops' ids by bus stop name
+    """
+    req = _create_bus_stops_ids_request(api_key, name)
+    async with _session_scope(session) as scope:
+        response = await _get_resource_from_request(scope, req, timeout)
+    return _format_bus_stop_id_response(response)
+
+
+async def get_all_lines_on_bus_stop(api_key: str,
+                                    bus_stop_id: str,
+                                    bus_stop_nr: str,
+                                    session: AsyncSession = None,
+                                    timeout: float = None) -> List:
+    """
+    Get method for list of all bus lines on given bus stop.
+    Args:
+        api_key: API key provided by UMWaw
+        bus_stop_id: bus stop identifier
+        bus_stop_nr: bus stop number (eg. 01, 02, etc.)
+        session: pooled session (temporary one if None)
+        timeout: time limit of the request (session timeout if None)
+
+    Returns:
+        list of all bus lines on given bus stop
+    """
+    req = _create_lines_on_bus_stop_request(api_key, bus_stop_id, bus_stop_nr)
+    async with _session_scope(session) as scope:
+        response = await _get_resource_from_request(scope, req, timeout)
+    return _format_all_lines_on_stop_response(response)
+
+
+# pylint: disable=too-many-arguments
+async def get_timetable_for_line_on_bus_stop(api_key: str,
+                                             bus_stop_id: str,
+                                             bus_stop_nr: str,
+                                             line: str,
+                                             session: AsyncSession = None,
+                                             timeout: float = None) -> List:
+    """
+    Get method for list of line timetable on bus stop.
+    Args:
+        api_key: API key provided by UMWaw
+        bus_stop_id: bus stop identifier
+        bus_stop_nr: bus stop number (eg. 01, 02, etc.)
+        line: bus line number
+        session: pooled session (temporary one if None)
+        timeout: time limit of the request (session timeout if None)
+
+    Returns:
+        list of line timetable on bus stop.
+    """
+    req = _create_timetable_request(api_key, bus_stop_id, bus_stop_nr, line)
+    async with _session_scope(session) as scope:
+        response = await _get_resource_from_request(scope, req, timeout)
+    return _format_timetable_on_stop_response(response)
+# pylint: enable=too-many-arguments
+
+
+async def get_bus_stops_coordinates(api_key: str,
+                                    as_dataframe: bool = False,
+                                    session: AsyncSession = None,
+                                    timeout: float = None) -> Union[List, pd.DataFrame]:
+    """
+    Get method for list of all bus stops' coordinates.
+    Args:
+        api_key: API key provided by UMWaw
+        as_dataframe: if response should be decoded into typed data frame
+        session: pooled session (temporary one if None)
+        timeout: time limit of the request (session timeout if None)
+
+    Returns:
+        list (or data frame) of all bus stops' coordinates
+    """
+    req = _create_bus_stops_coordinates_request(api_key)
+    async with _session_scope(session) as scope:
+        response = await _get_resource_from_request(scope, req, timeout)
+    if as_dataframe:
+        return _format_all_coordinates_response_to_dataframe(response)
+    return _format_all_coordinates_response(response)
@@ -0,0 +1,239 @@
+"""Concurrent bulk downloads from UM Warszawa API (UMWaw API)."""
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import partial
+from http import client
+from pathlib import Path
+from queue import LifoQueue, Empty
+from threading import BoundedSemaphore, Lock
+from time import sleep
+from typing import Dict, Iterator, List, Tuple, Union
+from urllib import error, parse
+import logging
+
+from bwaw.api import CONSTANTS
+from bwaw.api.download import _endpoint_of, _validate_response
+from bwaw.api.formatting import _decode_json, _format_timetable_on_stop_response
+from bwaw.api.requests import _create_timetable_request
+from bwaw.api.throttling import get_request_throttle
+from bwaw.io.save import save_response_to_csv
+from bwaw.utils.metrics import increment, timer
+from bwaw.utils.validation import validate_data_is_type, validate_multiple_params
+
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+TimetableKey = Tuple[str, str, str]
+
+
+def _timetable_file_name(bus_stop_id: str, bus_stop_nr: str, line: str) -> str:
+    """
+    Name of .csv file storing line timetable on bus stop.
+    Args:
+        bus_stop_id: bus stop identifier
+        bus_stop_nr: bus stop number (eg. 01, 02, etc.)
+        line: bus line number
+
+    Returns:
+        file name
+    """
+    return f'timetable_{bus_stop_id}_{bus_stop_nr}_{line}.csv'
+
+
+class _ConnectionPool:
+    """Keep-alive connections to single host, at most size of them used at once."""
+
+    def __init__(self, scheme: str, netloc: str, size: int, timeout: float):
+        self._connection_class = client.HTTPSConnection if scheme == 'https' \
+            else client.HTTPConnection
+        self._netloc = netloc
+        self._timeout = timeout
+        self._slots = BoundedSemaphore(size)
+        self._idle = LifoQueue()
+
+    @contextmanager
+    def connection(self) -> Iterator[client.HTTPConnection]:
+        """Borrows idle connection (or opens new one) and returns it after successful use."""
+        with self._slots:
+            try:
+                conn = self._idle.get_nowait()
+            except Empty:
+                conn = self._connection_class(self._netloc, timeout=self._timeout)
+            try:
+                yield conn
+            except BaseException:
+                conn.close()
+                raise
+            self._idle.put(conn)
+
+    def close(self) -> None:
+        """Closes all idle connections."""
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except Empty:
+                return
+
+
+class _ConnectionPools:
+    """Connection pools for each requested host."""
+
+    def __init__(self, size: int, timeout: float):
+        self._size = size
+        self._timeout = timeout
+        self._pools = {}
+        self._lock = Lock()
+
+    def get(self, url: str) -> _ConnectionPool:
+        """Pool of connections to host of url."""
+        parts = parse.urlsplit(url)
+        with self._lock:
+            if (parts.scheme, parts.netloc) not in self._pools:
+                self._pools[(parts.scheme, parts.netloc)] = _ConnectionPool(
+                    parts.scheme, parts.netloc, self._size, self._timeout)
+            return self._pools[(parts.scheme, parts.netloc)]
+
+    def close(self) -> None:
+        """Closes all pools."""
+        for pool in self._pools.values():
+            pool.close()
+
+
+def _get_json(pools: _ConnectionPools, url: str) -> Dict:
+    """
+    Single GET request over pooled keep-alive connection.
+    Args:
+        pools: connection pools
+        url: full url of request
+
+    Returns:
+        decoded response body
+    """
+    parts = parse.urlsplit(url)
+    endpoint = _endpoint_of(url)
+    with pools.get(url).connection() as conn, timer('api_request_seconds', endpoint=endpoint):
+        conn.request('GET', f'{parts.path}?{parts.query}', headers={'Connection': 'keep-alive'})
+        response = conn.getresponse()
+        body = response.read()
+        increment('api_responses', endpoint=endpoint, status=response.status)
+        if response.status >= 300:
+            raise error.HTTPError(url=url, code=response.status, msg=response.reason,
+                                  hdrs=response.headers, fp=None)
+    increment('api_response_bytes', len(body), endpoint=endpoint)
+    return _decode_json(body)
+
+
+def _is_retryable(err: Exception) -> bool:
+    if isinstance(err, error.HTTPError):
+        return err.code in RETRY_STATUS_CODES
+    return isinstance(err, (error.URLError, client.HTTPException, OSError))
+
+
+# pylint: disable=too-many-arguments
+def _download_timetable(pools: _ConnectionPools,
+                        api_key: str,
+                        key: TimetableKey,
+                        path: Path,
+                        attempts: int,
+                        backoff: float,
+                        api_url: str) -> Path:
+    """
+    Downloads line timetable on bus stop and stores it as .csv file, retrying with backoff.
+    Request is sent through the active request throttle, if any.
+    Args:
+        pools: connection pools
+        api_key: API key provided by UMWaw
+        key: (bus stop id, bus stop nr, line)
+        path: directory where timetable is stored
+        attempts: how many times request is attempted
+        backoff: delay before first retry (in seconds), doubled after each failure
+        api_url: base url of UMWaw API
+
+    Returns:
+        path of stored timetable
+    """
+    req = _create_timetable_request(api_key, *key, api_url=api_url)
+    throttle = get_request_throttle()
+    for attempt in range(attempts):
+        try:
+            if throttle is None:
+                response = _get_json(pools, req.full_url)
+            else:
+                response = throttle.fetch(req.full_url, partial(_get_json, pools))
+            break
+        except Exception as err:  # pylint: disable=broad-except
+            if attempt + 1 == attempts or not _is_retryable(err):
+                raise
+            logging.info('Retrying %s after error: %s.', key, err)
+            sleep(backoff * 2 ** attempt)
+
+    _validate_response(req, response)
+    file_path = path / _timetable_file_name(*key)
+    save_response_to_csv(_format_timetable_on_stop_response(response), file_path)
+    return file_path
+
+
+def download_timetables(api_key: str,
+                        keys: List[TimetableKey],
+                        path: Union[Path, str],
+                        max_workers: int = 8,
+                        connections_per_host: int = 4,
+                        attempts: int = 3,
+                        backoff: float = 0.5,
+                        timeout: float = 30.,
+                        overwrite: bool = False,
+                        api_url: str = CONSTANTS.API_URL) -> Tuple[Dict, Dict]:
+    """
+    Downloads timetables for many (bus stop id, bus stop nr, line) keys concurrently.
+    Timetables are stored as timetable_{id}_{nr}_{line}.csv files, so the directory can be
+    used for punctuality insights.
+    Args:
+        api_key: API key provided by UMWaw
+        keys: list of (bus stop id, bus stop nr, line)
+        path: directory where timetables are stored
+        max_workers: number of downloading threads
+        connections_per_host: maximum number of simultaneous connections to single host
+        attempts: how many times each request is attempted
+        backoff: delay before first retry (in seconds), doubled after each failure
+        timeout: socket timeout (in seconds)
+        overwrite: if already stored timetables should be downloaded again
+        api_url: base url of UMWaw API
+
+    Returns:
+        (tuple):
+            dict of stored timetables paths for each key
+            dict of errors for each key which failed
+    """
+    validate_data_is_type(api_key, str)
+    validate_data_is_type(keys, list)
+    validate_data_is_type(path, (Path, str))
+    validate_multiple_params([max_workers, connections_per_host, attempts],
+                             lambda x: validate_data_is_type(x, int))
+    if not (max_workers > 0 and connections_per_host > 0 and attempts > 0):
+        raise ValueError('Number of workers, connections and attempts must be positive.')
+
+    path = Path(path) if isinstance(path, str) else path
+    path.mkdir(exist_ok=True, parents=True)
+    stored, failed, pending = {}, {}, []
+    for key in dict.fromkeys(tuple(key) for key in keys):
+        file_path = path / _timetable_file_name(*key)
+        if file_path.exists() and not overwrite:
+            stored[key] = file_path
+        else:
+            pending.append(key)
+
+    pools = _ConnectionPools(size=connections_per_host, timeout=timeout)
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {key: executor.submit(_download_timetable, pools, api_key, key, path,
+                                            attempts, backoff, api_url) for key in pending}
+            for key, future in futures.items():
+                try:
+                    stored[key] = future.result()
+                except (error.URLError, client.HTTPException, OSError, ValueError) as err:
+                    logging.info('Timetable %s could not be downloaded: %s.', key, err)
+                    failed[key] = err
+    finally:
+        pools.close()
+
+    return stored, failed
+# pylint: enable=too-many-arguments
@@ -0,0 +1,262 @@
+"""Cache of responses from static UM Warszawa API (UMWaw API) resources."""
+import hashlib
+import json
+import os
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
+from threading import Lock, get_ident
+from time import time
+from typing import Callable, Dict, Optional, Tuple, Union
+from urllib import parse
+
+from bwaw.api import PARAMETER, RESOURCE_ID
+from bwaw.api.formatting import _decode_json, _encode_json
+from bwaw.utils.validation import validate_data_is_type
+
+DAY_SECONDS = 24 * 60 * 60
+DEFAULT_TTLS = {
+    RESOURCE_ID.BUS_STOP_COORDINATE: DAY_SECONDS,
+    RESOURCE_ID.BUS_STOP_BY_NAME: DAY_SECONDS,
+    RESOURCE_ID.BUSES_ON_STOP: DAY_SECONDS,
+    RESOURCE_ID.TIMETABLE_FOR_LINE: DAY_SECONDS
+}
+DEFAULT_MAX_ENTRIES = 256
+VALIDITY_KEY = 'obowiazuje_od'
+
+_ACTIVE_CACHE = None
+
+
+def _normalize_url(url: str) -> Tuple[str, Optional[str]]:
+    """
+    Normalizes request url into cache key.
+    Args:
+        url: full request url
+
+    Returns:
+        (tuple): url without api key and with sorted parameters, and requested resource id
+    """
+    parts = parse.urlsplit(url)
+    parameters = sorted((k, v) for k, v in parse.parse_qsl(parts.query, keep_blank_values=True)
+                        if k != PARAMETER.API_KEY)
+    resource = dict(parameters).get(PARAMETER.RESOURCE_ID1, dict(parameters).get(
+        PARAMETER.RESOURCE_ID2))
+    key = parse.urlunsplit((parts.scheme, parts.netloc, parts.path.rstrip('/'),
+                            parse.urlencode(parameters), ''))
+    return key, resource
+
+
+def _next_validity_change(response: Dict, now: float) -> Optional[float]:
+    """
+    Finds the earliest validity date (obowiazuje_od) in the future.
+    Args:
+        response: response from UMWaw API
+        now: current time (seconds since epoch)
+
+    Returns:
+        the earliest future validity date (seconds since epoch) or None
+    """
+    changes = []
+    for item in response.get('result', []):
+        values = item.get('values', []) if isinstance(item, dict) else []
+        for value in values:
+            if value.get('key') != VALIDITY_KEY:
+                continue
+            try:
+                valid_from = datetime.fromisoformat(str(value.get('value'))[:19]).timestamp()
+            except ValueError:
+                continue
+            if valid_from > now:
+                changes.append(valid_from)
+    return min(changes) if changes else None
+
+
+class ResponseCache:
+    """
+    Two-level cache of UMWaw API responses keyed by request url without api key.
+
+    Responses are kept in memory (LRU of max_entries) and, if path is given, on disk as
+    JSON files shared between sessions. Every resource has its own time to live and only
+    resources with TTL are cached. Entries expire earlier if the response announces data
+    valid from a future date (obowiazuje_od). Responses are kept as JSON bodies and every
+    hit is decoded anew, so callers can modify returned responses. The cache can be shared
+    by threads (e.g. bulk downloads); disk is read and written outside its lock.
+    """
+
+    def __init__(self, path: Union[Path, str] = None,
+                 ttls: Dict[str, int] = None,
+                 max_entries: int = DEFAULT_MAX_ENTRIES,
+                 clock: Callable[[], float] = None):
+        """
+        Args:
+            path: directory of on-disk store (memory only if None)
+            ttls: time to live (in seconds) for every cached resource id (DEFAULT_TTLS if None)
+            max_entries: maximum number of responses kept in memory
+            clock: function returning current time in seconds (time.time by default)
+        """
+        if path is not None:
+            validate_data_is_type(path, (Path, str))
+            path = Path(path)
+            path.mkdir(exist_ok=True, parents=True)
+        validate_data_is_type(max_entries, int)
+        if max_entries <= 0:
+            raise ValueError('Maximum number of entries must be positive.')
+
+        self.path = path
+        self.ttls = dict(DEFAULT_TTLS if ttls is None else ttls)
+        self.max_entries = max_entries
+        self._clock = clock or time
+        self._entries = OrderedDict()
+        self._lock = Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.stores = 0
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def is_cacheable(self, url: str) -> bool:
+        """
+        Checks if responses for request url are cached.
+        Args:
+            url: full request url
+
+        Returns:
+            True if requested resource has time to live
+        """
+        return self.ttls.get(_normalize_url(url)[1], 0) > 0
+
+    def _file(self, key: str) -> Path:
+        return self.path / f'{hashlib.sha1(key.encode()).hexdigest()}.json'
+
+    def _remember(self, key: str, expires: float, body: bytes) -> None:
+        # called with lock held
+        self._entries[key] = (expires, body)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _read_disk(self, key: str) -> Optional[Tuple[float, Dict]]:
+        if self.path is None or not self._file(key).exists():
+            return None
+        try:
+            entry = json.loads(self._file(key).read_text())
+        except (OSError, ValueError):
+            return None
+        if entry.get('key') != key:
+            return None
+        return entry['expires'], entry['response']
+
+    def get(self, url: str) -> Optional[Dict]:
+        """
+        Get cached response for request url.
+        Args:
+            url: full request url
+
+        Returns:
+            copy of cached response or None if missing or expired
+        """
+        key, _ = _normalize_url(url)
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            hit = entry is not None and entry[0] > now
+            if hit:
+                self._entries.move_to_end(key)
+                self.hits += 1
+        if hit:
+            return _decode_json(entry[1])
+
+        entry = self._read_disk(key)
+        with self._lock:
+            if entry is not None and entry[0] > now:
+                self._remember(key, entry[0], _encode_json(entry[1]))
+                self.hits += 1
+                self.disk_hits += 1
+                return entry[1]
+
+            stale = self._entries.get(key)
+            if stale is not None and stale[0] <= now:
+                del self._entries[key]
+            self.misses += 1
+        return None
+
+    def put(self, url: str, response: Dict) -> None:
+        """
+        Store response for request url (if its resource is cached).
+        Args:
+            url: full request url
+            response: validated response from UMWaw API
+        """
+        key, resource = _normalize_url(url)
+        ttl = self.ttls.get(resource, 0)
+        if ttl <= 0:
+            return
+        now = self._clock()
+        expires = now + ttl
+        validity_change = _next_validity_change(response, now)
+        if validity_change is not None:
+            expires = min(expires, validity_change)
+
+        body = _encode_json(response)
+        with self._lock:
+            self._remember(key, expires, body)
+            self.stores += 1
+        if self.path is not None:
+            file = self._file(key)
+            temporary = file.with_suffix(f'.{get_ident()}.tmp')
+            temporary.write_text(json.dumps({'key': key, 'expires': expires,
+                                             'response': response}))
+            os.replace(temporary, file)
+
+    def clear(self) -> None:
+        """Remove all cached responses from memory and disk."""
+        with self._lock:
+            self._entries.clear()
+        if self.path is not None:
+            for file in self.path.glob('*.json'):
+                file.unlink()
+
+    @property
+    def stats(self) -> Dict:
+        """
+        Cache statistics.
+
+        Returns:
+            dict with number of hits (and disk hits among them), misses, stored responses,
+            responses in memory and hit ratio
+        """
+        with self._lock:
+            requests = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'stores': self.stores,
+                'entries': len(self._entries),
+                'hit_ratio': self.hits / requests if requests else 0.
+            }
+
+
+def set_response_cache(cache: Optional[ResponseCache]) -> None:
+    """
+    Plug cache into all requests to UMWaw API (None disables caching).
+    Args:
+        cache: cache of responses
+    """
+    global _ACTIVE_CACHE  # pylint: disable=global-statement
+    if cache is not None:
+        validate_data_is_type(cache, ResponseCache)
+    _ACTIVE_CACHE = cache
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """
+    Get cache plugged into requests to UMWaw API.
+
+    Returns:
+        active cache of responses or None
+    """
+    return _ACTIVE_CACHE
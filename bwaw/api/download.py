@@ -1,138 +1,183 @@
 """Module related to basic calls to UM Warszawa API (UMWaw API)."""
 from pathlib import Path
-from time import sleep
-from typing import Dict, List, Tuple
-from urllib import request, error
+from typing import Dict, Iterator, List, Union
+from urllib import request, error, parse
 import logging
-import json
-import pickle
-from tqdm import tqdm, std
-
-PARTIAL_PATH = Path('partial.pkl')
+from tqdm import tqdm
+from bwaw.api.cache import get_response_cache
+from bwaw.api.formatting import _decode_json
+from bwaw.api.scheduling import FixedRateScheduler
+from bwaw.api.throttling import get_request_throttle
+from bwaw.io.segments import SegmentStore
+from bwaw.utils.metrics import increment, timer
+
+PARTIAL_PATH = Path('partial')
 logging.basicConfig(format='%(levelname)s:%(message)s', level=logging.INFO)
 
 
-def _store_partial_data(partial_data: List, path: Path = PARTIAL_PATH) -> None:
-    """
-    Stores partial data when over-time request fails.
-    Args:
-        partial_data: already aggregated responses
-        path: where to store partial data
-    """
-    with path.open('wb') as file:
-        pickle.dump(partial_data, file)
-
-
-def _restore_partial_data(path: Path = PARTIAL_PATH) -> List:
-    """
-    Reads partial data from past failed request.
-    Args:
-        path: where partial data were saved
-
-    Returns:
-        already aggregated responses
-    """
-    with path.open('rb') as file:
-        partial_data = pickle.load(file)
-    return partial_data
+def _endpoint_of(url: str) -> str:
+    return parse.urlsplit(url).path.rstrip('/').rsplit('/', 1)[-1]
 
 
-def _set_up_session(no_requests: int, path: Path = PARTIAL_PATH) -> Tuple[List, int, std.tqdm]:
+def _fetch_resource(url: str) -> Dict:
     """
-    Restores downloading session based on already saved data or sets up a new one
+    Sends GET request to UMWaw API.
+    Latency, HTTP status and size of the response body are recorded in the active metrics
+    registry, if any.
     Args:
-        no_requests: total number of requests target
-        path: path to partial data from previous session
+        url: full request url
 
     Returns:
-        (tuple):
-            data from previous session or initialized new ones
-            starting iterator for request
-            progress bar (new or from previous session)
+        validated response for url
     """
-    if path.exists():
-        logging.info('Restoring previous download session.')
-        partial_data = _restore_partial_data()
-        last_iteration = len(partial_data)
-        progress_bar = tqdm(total=no_requests)
-        progress_bar.update(last_iteration)
-    else:
-        logging.info('Initialising new download session.')
-        partial_data, last_iteration, progress_bar = [], 0, tqdm(total=no_requests)
-    return partial_data, last_iteration, progress_bar
+    resource_request = request.Request(url)
+    endpoint = _endpoint_of(url)
+    with timer('api_request_seconds', endpoint=endpoint):
+        try:
+            with request.urlopen(resource_request) as req:
+                body, status = req.read(), req.status
+        except error.HTTPError as err:
+            increment('api_responses', endpoint=endpoint, status=err.code)
+            raise
+    increment('api_responses', endpoint=endpoint, status=status)
+    increment('api_response_bytes', len(body), endpoint=endpoint)
+    response = _decode_json(body)
+    _validate_response(resource_request, response)
+    return response
 
 
 def _get_resource_from_request(resource_request: request.Request) -> Dict:
     """
     Call for request to UMWaw API.
+    Responses of static resources are served from the active response cache, if any, and
+    requests are sent through the active request throttle, if any.
     Args:
         resource_request: formatted request
 
     Returns:
         validated response for resource_request
     """
+    cache = get_response_cache()
+    if cache is not None and cache.is_cacheable(resource_request.full_url):
+        response = cache.get(resource_request.full_url)
+        if response is not None:
+            increment('api_cache_hits')
+            return response
+
+    throttle = get_request_throttle()
     try:
-        with request.urlopen(resource_request) as req:
-            response = json.loads(req.read().decode())
-            _validate_response(resource_request, response)
+        if throttle is None:
+            response = _fetch_resource(resource_request.full_url)
+        else:
+            response = throttle.fetch(resource_request.full_url, _fetch_resource)
     except (error.URLError, error.HTTPError) as err:
         raise err
 
+    if cache is not None:
+        cache.put(resource_request.full_url, response)
     return response
 
 
 # pylint: disable=too-many-arguments
+def _stream_resource_over_time(resource_request: request.Request,
+                               no_of_requests: int = 1,
+                               interval_btwn_requests: Union[int, float] = 1,
+                               attempts: int = 3,
+                               path: Path = PARTIAL_PATH,
+                               replay: bool = True,
+                               align_to_clock: bool = False) -> Iterator[Dict]:
+    """
+    Wrapper for _get_resource_from_request to iterate over time, yielding responses as they come.
+    Each validated response is appended to segment store in path before it is yielded,
+    so the collection resumes from the last stored response after failure or restart.
+    Requests are sent at fixed rate, so their latency does not shift the sampling timeline.
+    Args:
+        resource_request: formatted request
+        no_of_requests: total number of requests target
+        interval_btwn_requests: how many minutes (possibly fractional) between requests
+        attempts: how many times to attempt session restoration before failing
+        path: directory of segment store
+        replay: if responses stored by previous session should be yielded first
+        align_to_clock: if requests should be sent on wall clock multiples of interval
+
+    Returns:
+        validated responses for resource_request
+    """
+    if not (isinstance(no_of_requests, int)
+            and isinstance(interval_btwn_requests, (int, float))
+            and isinstance(attempts, int)):
+        raise TypeError('All numerical parameters must be positive numbers.')
+    if not (no_of_requests > 0 and interval_btwn_requests > 0 and attempts > 0):
+        raise ValueError('All numerical parameters must be positive numbers.')
+
+    scheduler = FixedRateScheduler(interval_btwn_requests * 60, align_to_clock=align_to_clock)
+    with SegmentStore(path) as store:
+        if len(store) > 0:
+            logging.info('Restoring previous download session.')
+            if replay:
+                yield from store
+        else:
+            logging.info('Initialising new download session.')
+
+        with tqdm(total=no_of_requests, initial=len(store)) as progress_bar:
+            for attempt in range(attempts):
+                logging.info('Attempt %s/%s.', attempt + 1, attempts)
+                scheduler.start(delay_first=len(store) > 0)
+                while len(store) < no_of_requests:
+                    try:
+                        scheduler.wait()
+                        response = _get_resource_from_request(resource_request)
+                    except (error.HTTPError, error.URLError, KeyboardInterrupt):
+                        logging.info('Attempt %s failed.', attempt + 1)
+                        break
+                    store.append(response)
+                    progress_bar.update(1)
+                    yield response
+
+                if len(store) >= no_of_requests:
+                    logging.info('Data collected in %s/%s attempts.', attempt + 1, attempts)
+                    logging.info('Scheduling: %s.', scheduler.stats)
+                    return
+
+    raise RuntimeError(f'All attempts failed. Partial results stored in {path}')
+
+
 def _get_resource_over_time(resource_request: request.Request,
                             no_of_requests: int = 1,
-                            interval_btwn_requests: int = 1,
+                            interval_btwn_requests: Union[int, float] = 1,
                             attempts: int = 3,
                             keep_partial_if_fail: bool = True,
-                            path: Path = PARTIAL_PATH) -> List:
+                            path: Path = PARTIAL_PATH,
+                            align_to_clock: bool = False) -> List:
     """
     Wrapper for _get_resource_from_request to iterate over time.
     Args:
         resource_request: formatted request
         no_of_requests: total number of requests target
-        interval_btwn_requests: how many minutes to wait between requests
+        interval_btwn_requests: how many minutes (possibly fractional) between requests
         attempts: how many times to attempt session restoration before failing
         keep_partial_if_fail: if partial data from failed attempt should be kept
         path: path to partial data storage
+        align_to_clock: if requests should be sent on wall clock multiples of interval
 
     Returns:
         list of aggregated validated responses for resource_request
     """
-    if not (isinstance(no_of_requests, int)
-            and isinstance(interval_btwn_requests, int)
-            and isinstance(attempts, int)):
-        raise TypeError('All numerical parameters must be positive integers.')
-    if not (no_of_requests > 0 and interval_btwn_requests > 0 and attempts > 0):
-        raise ValueError('All numerical parameters must be positive integers.')
-
-    for attempt in range(attempts):
-        logging.info('Attempt %s/%s.', attempt + 1, attempts)
-        aggregated_results, i, pbar = _set_up_session(no_of_requests)
-
-        while i < no_of_requests:
-            try:
-                if i != 0:
-                    sleep(interval_btwn_requests * 60)
-                response = _get_resource_from_request(resource_request)
-                aggregated_results.append(response)
-                pbar.update(1)
-                i += 1
-            except (error.HTTPError, error.URLError, KeyboardInterrupt):
-                _store_partial_data(aggregated_results)
-                logging.info('Attempt %s failed.', attempt + 1)
-                break
-
-        if len(aggregated_results) == no_of_requests:
-            logging.info('Data collected in %s/%s attempts.', attempt + 1, attempts)
-            path.unlink(missing_ok=True)
-            return aggregated_results
-
-    if not keep_partial_if_fail:
-        path.unlink(missing_ok=True)
-    raise RuntimeError(f'All attempts failed. Partial results stored in {path}')
+    try:
+        aggregated_results = list(_stream_resource_over_time(
+            resource_request=resource_request,
+            no_of_requests=no_of_requests,
+            interval_btwn_requests=interval_btwn_requests,
+            attempts=attempts,
+            path=path,
+            align_to_clock=align_to_clock))
+    except RuntimeError:
+        if not keep_partial_if_fail:
+            SegmentStore(path).clear()
+        raise
+
+    SegmentStore(path).clear()
+    return aggregated_results
 # pylint: enable=too-many-arguments
 
 
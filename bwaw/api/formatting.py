@@ -1,26 +1,78 @@
 """Formatting information from UM Warszawa API (UMWaw API) responses."""
-from typing import List
-from bwaw.utils.validation import validate_matches_time_format
+import json
+from typing import Dict, List, Union
+import numpy as np
+import pandas as pd
+from bwaw.utils.format_conversion import column_time_to_seconds
+from bwaw.utils.metrics import timed
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+ACTIVE_BUS_CODED_COLUMNS = ['Lines', 'VehicleNumber', 'Brigade']
+ACTIVE_BUS_COLUMNS = ['Lines', 'Lon', 'VehicleNumber', 'Time', 'Lat', 'Brigade']
+COORDINATES_KEYS = {'zespol': 'ID', 'slupek': 'Number', 'szer_geo': 'Latitude',
+                    'dlug_geo': 'Longitude', 'kierunek': 'Destination',
+                    'obowiazuje_od': 'Validity'}
+COORDINATES_FLOAT_COLUMNS = ['Latitude', 'Longitude']
+TIMETABLE_KEYS = {'brygada': 'Brigade', 'kierunek': 'Destination', 'czas': 'Time'}
+HOURS_IN_DAY = 24
+
+
+def _decode_json(body: Union[bytes, str]) -> Dict:
+    """
+    Decodes JSON body of response, with orjson if it is installed.
+    Args:
+        body: raw response body
+
+    Returns:
+        decoded response
+    """
+    if orjson is not None:
+        return orjson.loads(body)
+    return json.loads(body.decode() if isinstance(body, bytes) else body)
+
+
+def _encode_json(response: Dict) -> bytes:
+    """
+    Encodes decoded response back into JSON body, with orjson if it is installed.
+    Args:
+        response: decoded response
+
+    Returns:
+        raw response body
+    """
+    if orjson is not None:
+        return orjson.dumps(response)
+    return json.dumps(response).encode()
 
 
-def _correct_time(time: str) -> str:
+def _decode_key_value_records(records: List[dict], keys: Dict[str, str]) -> Dict[str, List]:
     """
-    Corrects time from timetable response (hour higher than 23).
+    Decodes dbstore_get/dbtimetable_get records into columns in a single pass.
+    Every value is routed by its key name, so the order of values in records does not matter.
     Args:
-        time: time from timetable response
+        records: list of records with 'values' lists of key/value pairs
+        keys: mapping of keys to be extracted to column names
 
     Returns:
-        corrected time
+        dict of column name to list of values (None where record lacks the key)
     """
-    validate_matches_time_format(time)
-    split_time = time.split(':')
-    if int(split_time[0]) >= 24:
-        new_hour = int(split_time[0]) % 24
-        if new_hour < 10:
-            split_time[0] = f'0{new_hour}'
-        else:
-            split_time[0] = str(new_hour)
-    return ':'.join(split_time)
+    columns = {name: [None] * len(records) for name in keys.values()}
+    targets = {key: columns[name] for key, name in keys.items()}
+    for row, record in enumerate(records):
+        for item in record['values']:
+            target = targets.get(item['key'])
+            if target is not None:
+                target[row] = item['value']
+    return columns
+
+
+def _columns_to_records(columns: Dict[str, List]) -> List[dict]:
+    names = list(columns)
+    return [dict(zip(names, row)) for row in zip(*columns.values())]
 
 
 def _format_simple_key_value_response(response: dict,
@@ -38,9 +90,8 @@ def _format_simple_key_value_response(response: dict,
     """
     response = response['result']
     if len(response) > 0:
-        response = [item['value'] for values in response for item in values['values']
-                    if item['key'] == information_key]
-        return response
+        return [item['value'] for record in response for item in record['values']
+                if item['key'] == information_key]
 
     raise ValueError(f'Incorrect {error_msg_parameter}. No results found.')
 
@@ -57,6 +108,46 @@ def _format_active_bus_response(response: dict) -> List:
     return response['result']
 
 
+@timed('api_format_seconds')
+def _format_active_bus_responses_to_dataframe(responses: List[dict]) -> pd.DataFrame:
+    """
+    Formats responses with active buses into typed columns.
+    Responses are already decoded (and validated) dicts, as they are stored and replayed as
+    JSON lines before formatting, so records are not decoded from raw bytes here. Values are
+    written into preallocated arrays (time strings are parsed on assignment into datetime64
+    array) and lines, brigades and vehicle numbers are interned into integer codes of
+    categoricals, so no intermediate list of records or object columns is built.
+    Args:
+        responses: not processed responses with currently active buses.
+
+    Returns:
+        data frame with Lines, Lon, VehicleNumber, Time, Lat, Brigade columns
+    """
+    total = sum(len(response['result']) for response in responses)
+    lat, lon = np.empty(total, dtype=np.float64), np.empty(total, dtype=np.float64)
+    time = np.empty(total, dtype='datetime64[ns]')
+    codes = {name: np.empty(total, dtype=np.int32) for name in ACTIVE_BUS_CODED_COLUMNS}
+    interned = {name: {} for name in ACTIVE_BUS_CODED_COLUMNS}
+
+    start = 0
+    for response in responses:
+        records = response['result']
+        rows = slice(start, start + len(records))
+        lat[rows] = [record['Lat'] for record in records]
+        lon[rows] = [record['Lon'] for record in records]
+        time[rows] = [record['Time'] for record in records]
+        for name in ACTIVE_BUS_CODED_COLUMNS:
+            known = interned[name]
+            codes[name][rows] = [known.setdefault(record[name], len(known)) for record in records]
+        start += len(records)
+
+    columns = {name: pd.Categorical.from_codes(codes[name], categories=list(interned[name]))
+               for name in ACTIVE_BUS_CODED_COLUMNS}
+    columns.update({'Lat': lat, 'Lon': lon, 'Time': time})
+    return pd.DataFrame(columns, columns=ACTIVE_BUS_COLUMNS)
+
+
+@timed('api_format_seconds')
 def _format_bus_stop_id_response(response: dict) -> List:
     """
     Formats response with all bus stop ids for bus stop name.
@@ -71,6 +162,7 @@ def _format_bus_stop_id_response(response: dict) -> List:
                                              error_msg_parameter='bus stop name')
 
 
+@timed('api_format_seconds')
 def _format_all_lines_on_stop_response(response: dict) -> List:
     """
     Formats response with all lines on bus stop.
@@ -85,6 +177,7 @@ def _format_all_lines_on_stop_response(response: dict) -> List:
                                              error_msg_parameter='bus stop number')
 
 
+@timed('api_format_seconds')
 def _format_all_coordinates_response(response: dict) -> List:
     """
     Formats response with all coordinates.
@@ -96,15 +189,32 @@ def _format_all_coordinates_response(response: dict) -> List:
     """
     response = response['result']
     if len(response) > 0:
-        keys = ['zespol', 'slupek', 'szer_geo', 'dlug_geo', 'kierunek', 'obowiazuje_od']
-        new_names = ['ID', 'Number', 'Latitude', 'Longitude', 'Destination', 'Validity']
-        response = [[d['value'] for d in item['values'] if d['key'] in keys] for item in response]
-        response = [dict(zip(new_names, i)) for i in response]
-        return response
+        return _columns_to_records(_decode_key_value_records(response, COORDINATES_KEYS))
+
+    raise ValueError('No results found.')
+
+
+@timed('api_format_seconds')
+def _format_all_coordinates_response_to_dataframe(response: dict) -> pd.DataFrame:
+    """
+    Formats response with all coordinates into typed columns.
+    Args:
+        response: not processed response with all coordinates.
+
+    Returns:
+        data frame with ID, Number, Latitude, Longitude (floats), Destination, Validity columns
+    """
+    response = response['result']
+    if len(response) > 0:
+        columns = _decode_key_value_records(response, COORDINATES_KEYS)
+        for name in COORDINATES_FLOAT_COLUMNS:
+            columns[name] = np.array(columns[name], dtype=np.float64)
+        return pd.DataFrame(columns)
 
     raise ValueError('No results found.')
 
 
+@timed('api_format_seconds')
 def _format_timetable_on_stop_response(response: dict) -> List:
     """
     Formats response with timetable of line on bus stop.
@@ -116,11 +226,11 @@ def _format_timetable_on_stop_response(response: dict) -> List:
     """
     response = response['result']
     if len(response) > 0:
-        keys = ['brygada', 'kierunek', 'czas']
-        response = [[d['value'] for d in item['values'] if d['key'] in keys] for item in response]
-        response = [dict(zip(['Brigade', 'Destination', 'Time'], i)) for i in response]
-        for item in response:
-            item['Time'] = _correct_time(item['Time'])
-        return response
+        columns = _decode_key_value_records(response, TIMETABLE_KEYS)
+        times = columns['Time']
+        hours = column_time_to_seconds(pd.Series(times, dtype=object)) // 3600
+        for row in np.flatnonzero(hours >= HOURS_IN_DAY).tolist():
+            times[row] = f'{hours[row] % HOURS_IN_DAY:02d}{times[row][2:]}'
+        return _columns_to_records(columns)
 
     raise ValueError('Incorrect bus stop or line number. No results found.')
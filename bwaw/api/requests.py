@@ -1,27 +1,34 @@
 """Highest level module to get data from UM Warszawa API (UMWaw API)."""
 
-from typing import List
+from pathlib import Path
+from typing import Iterator, List, Union
 from urllib import request, parse
+import pandas as pd
 from bwaw.api import CONSTANTS, TABLE, RESOURCE_ID, PARAMETER
-from bwaw.api.download import _get_resource_from_request, _get_resource_over_time
+from bwaw.api.download import (_get_resource_from_request, _get_resource_over_time,
+                               _stream_resource_over_time)
 from bwaw.api.formatting import (_format_bus_stop_id_response, _format_all_lines_on_stop_response,
                                  _format_timetable_on_stop_response, _format_active_bus_response,
-                                 _format_all_coordinates_response)
+                                 _format_all_coordinates_response,
+                                 _format_all_coordinates_response_to_dataframe,
+                                 _format_active_bus_responses_to_dataframe)
 from bwaw.utils.validation import validate_data_is_type, validate_multiple_params
 
 
 def _create_request(table_name: str,
-                    parameters: dict) -> request.Request:
+                    parameters: dict,
+                    api_url: str = CONSTANTS.API_URL) -> request.Request:
     """
     Creates an arbitrary request conforming to API guidelines.
     Args:
         table_name: name of the table in UMWaw database
         parameters: parameters related to request
+        api_url: base url of UMWaw API
 
     Returns:
         GET request for UMWaw API
     """
-    return request.Request(f"{CONSTANTS.API_URL}{table_name}/?{parse.urlencode(parameters)}")
+    return request.Request(f"{api_url}{table_name}/?{parse.urlencode(parameters)}")
 
 
 def _create_active_buses_request(api_key: str) -> request.Request:
@@ -42,43 +49,175 @@ def _create_active_buses_request(api_key: str) -> request.Request:
     })
 
 
-def get_active_buses(api_key: str) -> List:
+def _create_bus_stops_ids_request(api_key: str, name: str) -> request.Request:
+    """
+    Creates a request for list of bus stops' ids by bus stop name.
+    Args:
+        api_key: API key provided by UMWaw
+        name: bus stop name
+
+    Returns:
+        request for list of bus stops' ids
+    """
+    validate_multiple_params([api_key, name], lambda x: validate_data_is_type(x, str))
+    return _create_request(table_name=TABLE.TIMETABLES, parameters={
+        PARAMETER.RESOURCE_ID2: RESOURCE_ID.BUS_STOP_BY_NAME,
+        PARAMETER.API_KEY: api_key,
+        PARAMETER.BUS_STOP_NAME: name
+
+    })
+
+
+def _create_lines_on_bus_stop_request(api_key: str,
+                                      bus_stop_id: str,
+                                      bus_stop_nr: str) -> request.Request:
+    """
+    Creates a request for list of all bus lines on bus stop.
+    Args:
+        api_key: API key provided by UMWaw
+        bus_stop_id: bus stop identifier
+        bus_stop_nr: bus stop number (eg. 01, 02, etc.)
+
+    Returns:
+        request for list of bus lines on bus stop
+    """
+    validate_multiple_params([api_key, bus_stop_nr, bus_stop_id],
+                             lambda x: validate_data_is_type(x, str))
+    return _create_request(table_name=TABLE.TIMETABLES, parameters={
+        PARAMETER.RESOURCE_ID2: RESOURCE_ID.BUSES_ON_STOP,
+        PARAMETER.API_KEY: api_key,
+        PARAMETER.BUS_STOP_ID: bus_stop_id,
+        PARAMETER.BUS_STOP_NR: bus_stop_nr
+
+    })
+
+
+def _create_bus_stops_coordinates_request(api_key: str) -> request.Request:
+    """
+    Creates a request for list of all bus stops' coordinates.
+    Args:
+        api_key: API key provided by UMWaw
+
+    Returns:
+        request for list of bus stops' coordinates
+    """
+    validate_data_is_type(api_key, str)
+    return _create_request(table_name=TABLE.STOPS, parameters={
+        PARAMETER.RESOURCE_ID2: RESOURCE_ID.BUS_STOP_COORDINATE,
+        PARAMETER.API_KEY: api_key
+
+    })
+
+
+def _create_timetable_request(api_key: str,
+                              bus_stop_id: str,
+                              bus_stop_nr: str,
+                              line: str,
+                              api_url: str = CONSTANTS.API_URL) -> request.Request:
+    """
+    Creates a request for line timetable on bus stop.
+    Args:
+        api_key: API key provided by UMWaw
+        bus_stop_id: bus stop identifier
+        bus_stop_nr: bus stop number (eg. 01, 02, etc.)
+        line: bus line number
+        api_url: base url of UMWaw API
+
+    Returns:
+        request for line timetable on bus stop
+    """
+    validate_multiple_params([api_key, bus_stop_id, bus_stop_nr, line],
+                             lambda x: validate_data_is_type(x, str))
+    return _create_request(table_name=TABLE.TIMETABLES, parameters={
+        PARAMETER.RESOURCE_ID2: RESOURCE_ID.TIMETABLE_FOR_LINE,
+        PARAMETER.API_KEY: api_key,
+        PARAMETER.BUS_STOP_ID: bus_stop_id,
+        PARAMETER.BUS_STOP_NR: bus_stop_nr,
+        PARAMETER.LINE_NR: line
+
+    }, api_url=api_url)
+
+
+def get_active_buses(api_key: str, as_dataframe: bool = False) -> Union[List, pd.DataFrame]:
     """
     Get method for list of all currently active buses.
     Args:
         api_key: API key provided by UMWaw
+        as_dataframe: if response should be decoded into compact typed data frame
 
     Returns:
-        list of metadata of all currently active buses
+        list (or data frame) of metadata of all currently active buses
     """
     validate_data_is_type(api_key, str)
     response = _get_resource_from_request(resource_request=_create_active_buses_request(api_key))
+    if as_dataframe:
+        return _format_active_bus_responses_to_dataframe([response])
     return _format_active_bus_response(response)
 
 
 def get_active_buses_over_time(api_key: str,
                                no_of_requests: int = 1,
-                               interval_btwn_requests: int = 1,
-                               keep_partial_if_fail: bool = True) -> List:
+                               interval_btwn_requests: Union[int, float] = 1,
+                               keep_partial_if_fail: bool = True,
+                               align_to_clock: bool = False,
+                               as_dataframe: bool = False) -> Union[List, pd.DataFrame]:
     """
     Get method for list of all currently active buses requested over some period.
     Args:
         api_key: API key provided by UMWaw
         no_of_requests: number of calls to UMWaw
-        interval_btwn_requests: time [minutes] between calls to UMWaw
+        interval_btwn_requests: time [minutes] between calls to UMWaw, e.g. 1 / 6 for 10 seconds
         keep_partial_if_fail: if partial results should be stored if call fails
+        align_to_clock: if calls should be made on wall clock multiples of interval
+        as_dataframe: if responses should be decoded into compact typed data frame
 
     Returns:
-        list of metadata of all currently active buses aggregated from whole period
+        list (or data frame) of metadata of all currently active buses aggregated from whole period
     """
     validate_data_is_type(api_key, str)
     response = _get_resource_over_time(resource_request=_create_active_buses_request(api_key),
                                        no_of_requests=no_of_requests,
                                        interval_btwn_requests=interval_btwn_requests,
-                                       keep_partial_if_fail=keep_partial_if_fail)
+                                       keep_partial_if_fail=keep_partial_if_fail,
+                                       align_to_clock=align_to_clock)
+    if as_dataframe:
+        return _format_active_bus_responses_to_dataframe(response)
     return [d for r in response for d in _format_active_bus_response(r)]
 
 
+def stream_active_buses_over_time(api_key: str,
+                                  path: Union[Path, str],
+                                  no_of_requests: int = 1,
+                                  interval_btwn_requests: Union[int, float] = 1,
+                                  replay: bool = True,
+                                  align_to_clock: bool = False) -> Iterator[List]:
+    """
+    Generator of active buses snapshots requested over some period.
+    Every snapshot is appended to segment store in path as soon as it arrives, and calling
+    it again with the same path resumes the collection from the last stored snapshot.
+    Args:
+        api_key: API key provided by UMWaw
+        path: directory where snapshots are stored
+        no_of_requests: number of calls to UMWaw
+        interval_btwn_requests: time [minutes] between calls to UMWaw, e.g. 1 / 6 for 10 seconds
+        replay: if snapshots stored by previous session should be yielded first
+        align_to_clock: if calls should be made on wall clock multiples of interval
+
+    Returns:
+        list of metadata of all active buses, for each call to UMWaw
+    """
+    validate_data_is_type(api_key, str)
+    validate_data_is_type(path, (Path, str))
+    responses = _stream_resource_over_time(resource_request=_create_active_buses_request(api_key),
+                                           no_of_requests=no_of_requests,
+                                           interval_btwn_requests=interval_btwn_requests,
+                                           path=Path(path),
+                                           replay=replay,
+                                           align_to_clock=align_to_clock)
+    for response in responses:
+        yield _format_active_bus_response(response)
+
+
 def get_bus_stops_ids_by_name(api_key: str,
                               name: str) -> List:
     """
@@ -90,13 +229,7 @@ def get_bus_stops_ids_by_name(api_key: str,
     Returns:
         list of all bus stops' ids by bus stop name
     """
-    validate_multiple_params([api_key, name], lambda x: validate_data_is_type(x, str))
-    req = _create_request(table_name=TABLE.TIMETABLES, parameters={
-        PARAMETER.RESOURCE_ID2: RESOURCE_ID.BUS_STOP_BY_NAME,
-        PARAMETER.API_KEY: api_key,
-        PARAMETER.BUS_STOP_NAME: name
-
-    })
+    req = _create_bus_stops_ids_request(api_key, name)
     response = _get_resource_from_request(resource_request=req)
     return _format_bus_stop_id_response(response)
 
@@ -114,15 +247,7 @@ def get_all_lines_on_bus_stop(api_key: str,
     Returns:
         list of all bus lines on given bus stop
     """
-    validate_multiple_params([api_key, bus_stop_nr, bus_stop_id],
-                             lambda x: validate_data_is_type(x, str))
-    req = _create_request(table_name=TABLE.TIMETABLES, parameters={
-        PARAMETER.RESOURCE_ID2: RESOURCE_ID.BUSES_ON_STOP,
-        PARAMETER.API_KEY: api_key,
-        PARAMETER.BUS_STOP_ID: bus_stop_id,
-        PARAMETER.BUS_STOP_NR: bus_stop_nr
-
-    })
+    req = _create_lines_on_bus_stop_request(api_key, bus_stop_id, bus_stop_nr)
     response = _get_resource_from_request(resource_request=req)
     return _format_all_lines_on_stop_response(response)
 
@@ -142,35 +267,24 @@ def get_timetable_for_line_on_bus_stop(api_key: str,
     Returns:
         list of line timetable on bus stop.
     """
-    validate_multiple_params([api_key, bus_stop_id, bus_stop_nr, line],
-                             lambda x: validate_data_is_type(x, str))
-
-    req = _create_request(table_name=TABLE.TIMETABLES, parameters={
-        PARAMETER.RESOURCE_ID2: RESOURCE_ID.TIMETABLE_FOR_LINE,
-        PARAMETER.API_KEY: api_key,
-        PARAMETER.BUS_STOP_ID: bus_stop_id,
-        PARAMETER.BUS_STOP_NR: bus_stop_nr,
-        PARAMETER.LINE_NR: line
-
-    })
+    req = _create_timetable_request(api_key, bus_stop_id, bus_stop_nr, line)
     response = _get_resource_from_request(resource_request=req)
     return _format_timetable_on_stop_response(response)
 
 
-def get_bus_stops_coordinates(api_key: str) -> List:
+def get_bus_stops_coordinates(api_key: str,
+                              as_dataframe: bool = False) -> Union[List, pd.DataFrame]:
     """
     Get method for list of all bus stops' coordinates.
     Args:
         api_key: API key provided by UMWaw
+        as_dataframe: if response should be decoded into typed data frame
 
     Returns:
-        list of all bus stops' coordinates
+        list (or data frame) of all bus stops' coordinates
     """
-    validate_data_is_type(api_key, str)
-    req = _create_request(table_name=TABLE.STOPS, parameters={
-        PARAMETER.RESOURCE_ID2: RESOURCE_ID.BUS_STOP_COORDINATE,
-        PARAMETER.API_KEY: api_key
-
-    })
+    req = _create_bus_stops_coordinates_request(api_key)
     response = _get_resource_from_request(resource_request=req)
+    if as_dataframe:
+        return _format_all_coordinates_response_to_dataframe(response)
     return _format_all_coordinates_response(response)
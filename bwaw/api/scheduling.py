@@ -0,0 +1,124 @@
+"""Fixed-rate scheduling of repeated requests."""
+import asyncio
+from math import floor, sqrt
+from time import monotonic, sleep, time
+from typing import Callable, Dict, Union
+from bwaw.utils.validation import validate_data_is_type
+
+
+class FixedRateScheduler:
+    """
+    Drift-free scheduler of ticks every interval seconds on a monotonic clock.
+
+    Ticks are planned as start + n * interval, so time spent between waits (e.g. request
+    latency) does not shift the timeline. When a tick is missed by more than a whole interval,
+    the missed ticks are skipped and counted instead of being fired in a burst. Lateness of
+    every fired tick (jitter) is recorded.
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(self, interval: Union[int, float],
+                 align_to_clock: bool = False,
+                 clock: Callable[[], float] = None,
+                 wall_clock: Callable[[], float] = None,
+                 sleeper: Callable[[float], None] = None):
+        """
+        Args:
+            interval: time between ticks (in seconds)
+            align_to_clock: if ticks should fall on wall clock multiples of interval
+            clock: monotonic clock used for scheduling (time.monotonic by default)
+            wall_clock: wall clock used for alignment (time.time by default)
+            sleeper: function sleeping for given number of seconds (time.sleep by default)
+        """
+        validate_data_is_type(interval, (int, float))
+        if interval <= 0:
+            raise ValueError('Interval must be positive.')
+
+        self.interval = float(interval)
+        self.align_to_clock = align_to_clock
+        self._clock = clock or monotonic
+        self._wall_clock = wall_clock or time
+        self._sleep = sleeper or sleep
+        self._next_tick = None
+        self.ticks = 0
+        self.skipped = 0
+        self._jitter_sum = 0.
+        self._jitter_squares = 0.
+        self._jitter_max = 0.
+    # pylint: enable=too-many-arguments
+
+    def start(self, delay_first: bool = False) -> None:
+        """
+        Plans first tick now (or on next aligned wall clock time).
+        Args:
+            delay_first: if first tick should be postponed by one interval
+        """
+        self._next_tick = self._clock()
+        if self.align_to_clock:
+            self._next_tick += -self._wall_clock() % self.interval
+        if delay_first:
+            self._next_tick += self.interval
+
+    def _delay(self) -> float:
+        """Skips missed ticks and returns time left to the next planned tick."""
+        if self._next_tick is None:
+            self.start()
+
+        now = self._clock()
+        missed = floor((now - self._next_tick) / self.interval)
+        if missed > 0:
+            self.skipped += missed
+            self._next_tick += missed * self.interval
+        return max(self._next_tick - now, 0.)
+
+    def _fire(self) -> int:
+        """Records jitter of the planned tick and plans the next one."""
+        jitter = self._clock() - self._next_tick
+        self._jitter_sum += jitter
+        self._jitter_squares += jitter ** 2
+        self._jitter_max = max(self._jitter_max, abs(jitter))
+        self.ticks += 1
+        self._next_tick += self.interval
+        return self.ticks + self.skipped - 1
+
+    def wait(self) -> int:
+        """
+        Sleeps until the next planned tick.
+
+        Returns:
+            number of the tick since start, including skipped ones
+        """
+        delay = self._delay()
+        if delay > 0:
+            self._sleep(delay)
+        return self._fire()
+
+    async def wait_async(self) -> int:
+        """
+        Awaits the next planned tick without blocking the event loop.
+
+        Returns:
+            number of the tick since start, including skipped ones
+        """
+        delay = self._delay()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return self._fire()
+
+    @property
+    def stats(self) -> Dict:
+        """
+        Scheduling statistics.
+
+        Returns:
+            dict with number of fired and skipped ticks and jitter mean, std and max (in seconds)
+        """
+        mean = self._jitter_sum / self.ticks if self.ticks else 0.
+        variance = self._jitter_squares / self.ticks - mean ** 2 if self.ticks else 0.
+        return {
+            'ticks': self.ticks,
+            'skipped': self.skipped,
+            'jitter_mean': mean,
+            'jitter_std': sqrt(max(variance, 0.)),
+            'jitter_max': self._jitter_max
+        }
@@ -0,0 +1,370 @@
+"""Rate limiting and coalescing of requests to UM Warszawa API (UMWaw API)."""
+import asyncio
+from concurrent.futures import Future
+from threading import Lock
+from time import monotonic, sleep
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple, Union
+from urllib import error, parse
+
+from bwaw.api import PARAMETER
+from bwaw.api.cache import _normalize_url
+from bwaw.api.formatting import _decode_json, _encode_json
+from bwaw.utils.validation import validate_data_is_type
+
+DEFAULT_RATE = 5.
+DEFAULT_RETRIES = 2
+THROTTLED_STATUS = 429
+
+_ACTIVE_THROTTLE = None
+
+
+def _api_key_of(url: str) -> Optional[str]:
+    return dict(parse.parse_qsl(parse.urlsplit(url).query)).get(PARAMETER.API_KEY)
+
+
+def _with_api_key(url: str, api_key: Optional[str]) -> str:
+    """
+    Replaces api key in request url.
+    Args:
+        url: full request url
+        api_key: new API key (url is returned unchanged if None)
+
+    Returns:
+        url with api key replaced
+    """
+    if api_key is None:
+        return url
+    parts = parse.urlsplit(url)
+    parameters = [(k, api_key if k == PARAMETER.API_KEY else v)
+                  for k, v in parse.parse_qsl(parts.query, keep_blank_values=True)]
+    return parse.urlunsplit(parts._replace(query=parse.urlencode(parameters)))
+
+
+def _copy_response(response: Dict) -> Dict:
+    return _decode_json(_encode_json(response))
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket refilled with rate tokens per second up to capacity.
+
+    Callers reserve tokens in order of arrival; a reservation beyond available tokens returns
+    the time the caller has to wait for its token, so sleeping happens outside the lock.
+    """
+
+    def __init__(self, rate: Union[int, float],
+                 capacity: Union[int, float] = None,
+                 clock: Callable[[], float] = None):
+        """
+        Args:
+            rate: number of tokens added every second
+            capacity: maximum number of stored tokens, i.e. burst size (max(rate, 1) if None)
+            clock: monotonic clock (time.monotonic by default)
+        """
+        validate_data_is_type(rate, (int, float))
+        capacity = max(rate, 1) if capacity is None else capacity
+        validate_data_is_type(capacity, (int, float))
+        if rate <= 0 or capacity < 1:
+            raise ValueError('Rate must be positive and capacity at least 1.')
+
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self._clock = clock or monotonic
+        self._tokens = self.capacity
+        self._updated = self._clock()
+        self._lock = Lock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def delay(self) -> float:
+        """
+        Time until the next token is available, without taking it.
+
+        Returns:
+            seconds to wait (0 if a token is available)
+        """
+        with self._lock:
+            self._refill()
+            return max(0., (1 - self._tokens) / self.rate)
+
+    def reserve(self) -> float:
+        """
+        Takes one token, possibly from the future.
+
+        Returns:
+            seconds the caller has to wait before using the token
+        """
+        with self._lock:
+            self._refill()
+            self._tokens -= 1
+            return max(0., -self._tokens / self.rate)
+
+    def drain(self) -> None:
+        """Drops stored tokens, e.g. after the server signalled throttling."""
+        with self._lock:
+            self._refill()
+            self._tokens = min(self._tokens, 0.)
+
+
+class RequestThrottle:
+    """
+    Shared rate-limiting layer for requests to UMWaw API.
+
+    Every api key has its own token bucket. If api_keys are given, each request is sent with
+    the key whose bucket frees a token first. Concurrent requests for the same url (regardless
+    of the api key) are coalesced, so only one of them is sent and all callers share its
+    response or error; if the response was shared, every caller gets its own copy. Responses
+    with HTTP 429 drain the key's bucket and are retried. Threads use fetch and coroutines
+    fetch_async, both drawing tokens from the same buckets.
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(self, rate: Union[int, float] = DEFAULT_RATE,
+                 burst: Union[int, float] = None,
+                 api_keys: List[str] = None,
+                 retries: int = DEFAULT_RETRIES,
+                 clock: Callable[[], float] = None,
+                 sleeper: Callable[[float], None] = None,
+                 async_sleeper: Callable[[float], Awaitable] = None):
+        """
+        Args:
+            rate: maximum number of requests per second for a single api key
+            burst: number of requests which can be sent at once (max(rate, 1) if None)
+            api_keys: API keys the requests are spread across (key of request if None)
+            retries: how many times throttled (HTTP 429) request is retried
+            clock: monotonic clock (time.monotonic by default)
+            sleeper: function sleeping for given number of seconds (time.sleep by default)
+            async_sleeper: coroutine function sleeping for given number of seconds
+                (asyncio.sleep by default)
+        """
+        TokenBucket(rate, burst)  # validates rate and burst
+        validate_data_is_type(retries, int)
+        if retries < 0:
+            raise ValueError('Number of retries cannot be negative.')
+        if api_keys is not None:
+            validate_data_is_type(api_keys, list)
+            if len(api_keys) == 0:
+                raise ValueError('List of API keys cannot be empty.')
+            for api_key in api_keys:
+                validate_data_is_type(api_key, str)
+
+        self.rate = rate
+        self.burst = burst
+        self.api_keys = api_keys
+        self.retries = retries
+        self._clock = clock or monotonic
+        self._sleep = sleeper or sleep
+        self._sleep_async = async_sleeper or asyncio.sleep
+        self._buckets = {}
+        self._in_flight = {}
+        self._in_flight_async = {}
+        self._lock = Lock()
+        self.requests = 0
+        self.queued = 0
+        self.coalesced = 0
+        self.throttled = 0
+    # pylint: enable=too-many-arguments
+
+    def _bucket(self, api_key: Optional[str]) -> TokenBucket:
+        with self._lock:
+            if api_key not in self._buckets:
+                self._buckets[api_key] = TokenBucket(self.rate, self.burst, clock=self._clock)
+            return self._buckets[api_key]
+
+    def _choose_key(self, url: str) -> Tuple[Optional[str], TokenBucket]:
+        if self.api_keys is None:
+            api_key = _api_key_of(url)
+            return api_key, self._bucket(api_key)
+        buckets = [(key, self._bucket(key)) for key in self.api_keys]
+        return min(buckets, key=lambda item: item[1].delay())
+
+    def _count(self, counter: str) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def _reserve(self, url: str) -> Tuple[str, TokenBucket, float]:
+        """
+        Chooses api key for request and takes a token from its bucket.
+        Args:
+            url: full request url
+
+        Returns:
+            (tuple): url with chosen api key, its bucket and seconds to wait for the token
+        """
+        api_key, bucket = self._choose_key(url)
+        wait = bucket.reserve()
+        if wait > 0:
+            self._count('queued')
+        return _with_api_key(url, api_key if self.api_keys else None), bucket, wait
+
+    def _retry_throttled(self, err: error.HTTPError, bucket: TokenBucket, attempt: int) -> bool:
+        """
+        Handles HTTP error of request, draining the bucket if the request was throttled.
+        Args:
+            err: error of the request
+            bucket: bucket of api key the request was sent with
+            attempt: number of retries made so far
+
+        Returns:
+            True if the request should be retried
+        """
+        if err.code != THROTTLED_STATUS:
+            return False
+        self._count('throttled')
+        bucket.drain()
+        return attempt < self.retries
+
+    def _send(self, url: str, fetch: Callable[[str], Dict]) -> Dict:
+        attempt = 0
+        while True:
+            target, bucket, wait = self._reserve(url)
+            if wait > 0:
+                self._sleep(wait)
+            self._count('requests')
+            try:
+                return fetch(target)
+            except error.HTTPError as err:
+                if not self._retry_throttled(err, bucket, attempt):
+                    raise
+                attempt += 1
+
+    async def _send_async(self, url: str, fetch: Callable[[str], Awaitable[Dict]]) -> Dict:
+        attempt = 0
+        while True:
+            target, bucket, wait = self._reserve(url)
+            if wait > 0:
+                await self._sleep_async(wait)
+            self._count('requests')
+            try:
+                return await fetch(target)
+            except error.HTTPError as err:
+                if not self._retry_throttled(err, bucket, attempt):
+                    raise
+                attempt += 1
+
+    def _join(self, in_flight: Dict, key: str, create: Callable) -> Tuple[object, bool]:
+        """
+        Joins request in flight for key or registers new one.
+        Args:
+            in_flight: requests in flight (of threads or coroutines), future and number of
+                callers waiting for it by key
+            key: normalized request url
+            create: factory of future of new request
+
+        Returns:
+            (tuple): future of the request and flag if the caller sends it
+        """
+        with self._lock:
+            entry = in_flight.get(key)
+            if entry is None:
+                in_flight[key] = [create(), 0]
+                return in_flight[key][0], True
+            self.coalesced += 1
+            entry[1] += 1
+            return entry[0], False
+
+    def _leave(self, in_flight: Dict, key: str) -> bool:
+        """
+        Unregisters request in flight for key.
+        Args:
+            in_flight: requests in flight (as in _join)
+            key: normalized request url
+
+        Returns:
+            True if other callers joined the request
+        """
+        with self._lock:
+            return in_flight.pop(key)[1] > 0
+
+    def fetch(self, url: str, fetch: Callable[[str], Dict]) -> Dict:
+        """
+        Sends request through the throttle.
+        Args:
+            url: full request url
+            fetch: function sending request for url and returning its response
+
+        Returns:
+            response for url (copy of it if it was shared with concurrent callers)
+        """
+        key, _ = _normalize_url(url)
+        call, leader = self._join(self._in_flight, key, Future)
+        if not leader:
+            return _copy_response(call.result())
+
+        try:
+            call.set_result(self._send(url, fetch))
+        except BaseException as err:
+            call.set_exception(err)
+        shared = self._leave(self._in_flight, key)
+        response = call.result()
+        return _copy_response(response) if shared else response
+
+    async def fetch_async(self, url: str, fetch: Callable[[str], Awaitable[Dict]]) -> Dict:
+        """
+        Sends request through the throttle without blocking the event loop.
+        Args:
+            url: full request url
+            fetch: coroutine function sending request for url and returning its response
+
+        Returns:
+            response for url (copy of it if it was shared with concurrent callers)
+        """
+        key, _ = _normalize_url(url)
+        call, leader = self._join(self._in_flight_async, key,
+                                  asyncio.get_running_loop().create_future)
+        if not leader:
+            return _copy_response(await asyncio.shield(call))
+
+        try:
+            call.set_result(await self._send_async(url, fetch))
+        except asyncio.CancelledError:
+            call.cancel()
+            raise
+        except Exception as err:  # pylint: disable=broad-except
+            call.set_exception(err)
+        finally:
+            shared = self._leave(self._in_flight_async, key)
+        response = call.result()
+        return _copy_response(response) if shared else response
+
+    @property
+    def stats(self) -> Dict:
+        """
+        Throttling statistics.
+
+        Returns:
+            dict with number of sent, queued (waiting for token), coalesced and throttled
+            (HTTP 429) requests
+        """
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'queued': self.queued,
+                'coalesced': self.coalesced,
+                'throttled': self.throttled
+            }
+
+
+def set_request_throttle(throttle: Optional[RequestThrottle]) -> None:
+    """
+    Plug throttle into all requests to UMWaw API (None disables throttling).
+    Args:
+        throttle: shared rate limiter
+    """
+    global _ACTIVE_THROTTLE  # pylint: disable=global-statement
+    if throttle is not None:
+        validate_data_is_type(throttle, RequestThrottle)
+    _ACTIVE_THROTTLE = throttle
+
+
+def get_request_throttle() -> Optional[RequestThrottle]:
+    """
+    Get throttle plugged into requests to UMWaw API.
+
+    Returns:
+        active throttle or None
+    """
+    return _ACTIVE_THROTTLE
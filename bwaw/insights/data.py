@@ -1,10 +1,15 @@
 """Data processing utils for data analysis."""
 from typing import Union
+import numpy as np
 import pandas as pd
 from bwaw.utils.validation import (validate_matches_time_format, validate_if_contains_columns,
                                    validate_data_is_time_column, validate_data_is_type,
                                    validate_multiple_params)
 
+DEFAULT_MAX_GAP = 300
+TRAJECTORY_KEY_COLUMNS = ['VehicleNumber', 'Time', 'Lat', 'Lon']
+TRAJECTORY_CODED_COLUMNS = ['Lines', 'Brigade', 'VehicleNumber']
+
 
 def _get_all_of_value(data: pd.DataFrame, name: str, value: Union[str, int, float]) -> pd.DataFrame:
     validate_data_is_type(data, pd.DataFrame)
@@ -12,21 +17,31 @@ def _get_all_of_value(data: pd.DataFrame, name: str, value: Union[str, int, floa
     return data[data[name] == value].reset_index(drop=True)
 
 
-def _adjust_date(column: pd.Series, start_from: pd.Timestamp):
+def _adjust_date(column: pd.Series, start_from: Union[pd.Timestamp, pd.Series]) -> pd.Series:
+    """
+    Moves times of day onto the service day starting at start_from.
+    Times not earlier than start_from (as time of day) land on its date, earlier ones on the
+    next day (after-midnight rollover).
+    Args:
+        column: time column (only time of day is used)
+        start_from: start of service day, single for all rows or a column aligned with column
+            (e.g. when adjusting many timetables at once)
+
+    Returns:
+        adjusted time column with the original index and order
+    """
     validate_data_is_type(column, pd.Series)
     validate_data_is_time_column(column)
+    validate_data_is_type(start_from, (pd.Timestamp, pd.Series))
 
-    pre_start = column[column.dt.time < start_from.time()]
-    post_start = column[column.dt.time >= start_from.time()]
-
-    post_start = pd.to_datetime(post_start.apply(lambda x: f'{start_from.date()} {x.time()}'))
-    day_after = start_from.date() + pd.Timedelta(days=1)
-    pre_start = pd.to_datetime(pre_start.apply(lambda x: f'{day_after} {x.time()}'))
-
-    output = pd.concat((pre_start, post_start))
-    assert output.shape == column.shape
-
-    return output
+    if isinstance(start_from, pd.Series):
+        validate_data_is_time_column(start_from)
+        anchor = start_from.dt.normalize()
+    else:
+        anchor = start_from.normalize()
+    time_of_day = column - column.dt.normalize()
+    rollover = time_of_day < start_from - anchor
+    return anchor + time_of_day + rollover * pd.Timedelta(days=1)
 
 
 def get_all_of_time(data: pd.DataFrame,
@@ -93,3 +108,47 @@ def remove_duplicates(data: pd.DataFrame) -> pd.DataFrame:
     """
     validate_data_is_type(data, pd.DataFrame)
     return data.drop_duplicates().reset_index(drop=True)
+
+
+def build_trajectories(data: pd.DataFrame, max_gap: int = DEFAULT_MAX_GAP) -> pd.DataFrame:
+    """
+    Drop stale repeated pings and split data into trajectories of vehicles.
+    Pings repeating (VehicleNumber, Time, Lat, Lon) of an earlier one (transmitter not updated
+    between snapshots) are found in a single pass over their hashes and dropped. Trajectory
+    of a vehicle is interrupted by a gap longer than max_gap or by change of line or brigade.
+    Args:
+        data: data regarding buses activity (VehicleNumber, Time, Lat, Lon columns required)
+        max_gap: maximum time between consecutive pings of a trajectory (in seconds)
+
+    Returns:
+        data sorted by vehicle (in order of first appearance) and time, with Lines, Brigade and
+        VehicleNumber as categoricals and additional Trajectory column numbering trajectories
+    """
+    validate_data_is_type(data, pd.DataFrame)
+    validate_if_contains_columns(data, TRAJECTORY_KEY_COLUMNS)
+    validate_data_is_type(max_gap, int)
+    if max_gap <= 0:
+        raise ValueError('Maximum gap must be positive.')
+
+    hashes = pd.util.hash_pandas_object(data[TRAJECTORY_KEY_COLUMNS], index=False).to_numpy()
+    data = data[~pd.Series(hashes).duplicated().to_numpy()]
+
+    time = pd.to_datetime(data['Time']).to_numpy(dtype='datetime64[ns]').view(np.int64)
+    vehicles = pd.factorize(data['VehicleNumber'], sort=False)[0]
+    order = np.lexsort((time, vehicles))
+    time, vehicles = time[order], vehicles[order]
+
+    starts = np.diff(vehicles) != 0
+    starts |= np.diff(time) > max_gap * 10 ** 9
+    for name in ['Lines', 'Brigade']:
+        if name in data.columns:
+            codes = pd.factorize(data[name], sort=False)[0][order]
+            starts |= np.diff(codes) != 0
+
+    trajectories = {name: data[name].to_numpy()[order] for name in data.columns}
+    for name in TRAJECTORY_CODED_COLUMNS:
+        if name in trajectories:
+            trajectories[name] = pd.Categorical(trajectories[name])
+    trajectories['Time'] = time.view('datetime64[ns]')
+    trajectories['Trajectory'] = np.concatenate(([0], np.cumsum(starts)))[:len(time)]
+    return pd.DataFrame(trajectories)
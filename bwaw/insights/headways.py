@@ -0,0 +1,167 @@
+"""Headway regularity and bunching insights extraction."""
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from tqdm import tqdm
+
+from bwaw.insights.punctuality import SECONDS_IN_DAY, _create_timetable_store
+from bwaw.insights.timetables import TimetableStore
+from bwaw.utils.metrics import increment, timed
+from bwaw.utils.validation import validate_data_is_type, validate_if_contains_columns
+
+DEFAULT_BUNCHING = 0.25
+DEFAULT_MAX_HEADWAY = 60 * 60
+GROUP_COLUMNS = ['Lines', 'ID', 'Number']
+HEADWAY_COLUMNS = ['Lines', 'ID', 'Number', 'Brigade', 'Departure', 'Headway', 'Scheduled',
+                   'Bunched']
+
+
+def _scheduled_headways(departures: np.ndarray, seconds: np.ndarray) -> np.ndarray:
+    """
+    Finds scheduled headways in effect at given times.
+    Departures are treated as repeating every day, as in punctuality insights.
+    Args:
+        departures: sorted departure times of all brigades (seconds from midnight)
+        seconds: observed departure times (seconds from midnight)
+
+    Returns:
+        time between the scheduled departure nearest to each observed one and the departure
+        scheduled before it (in seconds), nan if there is less than two departures
+    """
+    departures = np.unique(departures)
+    if len(departures) < 2:
+        return np.full(len(seconds), np.nan)
+    extended = np.concatenate(([departures[-1] - SECONDS_IN_DAY], departures,
+                               [departures[0] + SECONDS_IN_DAY]))
+    gaps = np.diff(extended)
+    idx = np.searchsorted(departures, seconds, side='left')
+    before = seconds - extended[idx] <= extended[idx + 1] - seconds
+    nearest = np.where(before, idx, idx + 1)
+    return gaps[(nearest - 1) % len(departures)].astype(np.float64)
+
+
+def _lines_scheduled_headways(headways: pd.DataFrame,
+                              timetables: TimetableStore,
+                              verbosity: bool) -> np.ndarray:
+    """
+    Computes scheduled headways of observed departures, loading each timetable once.
+    Args:
+        headways: data frame with Lines, ID, Number, Departure columns
+        timetables: store of loaded timetables
+        verbosity: if progress bar of timetables processing should be shown
+
+    Returns:
+        scheduled headways (in seconds, nan if timetable is missing)
+    """
+    times = headways['Departure']
+    seconds = ((times - times.dt.normalize()) / pd.Timedelta(seconds=1)).to_numpy()
+    scheduled = np.full(len(headways), np.nan)
+    groups = headways.groupby(GROUP_COLUMNS, sort=False, observed=True).indices
+    for (line, stop_id, stop_nr), rows in tqdm(groups.items(), disable=not verbosity):
+        try:
+            timetable = timetables.get(stop_id, stop_nr, line)
+        except ValueError:
+            continue
+        if timetable:
+            scheduled[rows] = _scheduled_headways(np.concatenate(list(timetable.values())),
+                                                  seconds[rows])
+    return scheduled
+
+
+# pylint: disable=too-many-arguments
+@timed('insights_seconds')
+def get_headways(stop_events: pd.DataFrame,
+                 api_key: str = None,
+                 path: Path = None,
+                 timetables: TimetableStore = None,
+                 bunching: float = DEFAULT_BUNCHING,
+                 max_headway: int = DEFAULT_MAX_HEADWAY,
+                 verbosity: bool = False) -> pd.DataFrame:
+    """
+    Generate observed and scheduled headways of every departure from a bus stop.
+    Departures of the whole fleet are sorted once by (line, bus stop, time) and headway is
+    the time since the previous departure of the same line from the same bus stop. Departure
+    is bunched if its headway is shorter than bunching times the scheduled headway (or the
+    median observed headway of the line on the bus stop if timetable is not available).
+    Args:
+        stop_events: stop visits (as returned by get_stop_events)
+        api_key: UMWaw API key if timetables are processed online
+        path: path to directory containing .csv files if timetables are already downloaded
+        timetables: store of already loaded timetables, created from api_key/path if not given
+            (only observed headways are computed if none of them is given)
+        bunching: fraction of reference headway below which departure is bunched
+        max_headway: longer gaps (in seconds) are treated as breaks in service
+        verbosity: if progress bar of timetables processing should be shown
+
+    Returns:
+        data frame with Lines, ID, Number, Brigade, Departure, Headway and Scheduled headways
+        (in seconds) and Bunched flag, ordered by line, bus stop and departure
+    """
+    validate_data_is_type(stop_events, pd.DataFrame)
+    validate_if_contains_columns(stop_events, GROUP_COLUMNS + ['Brigade', 'Departure'])
+    validate_data_is_type(bunching, (int, float))
+    validate_data_is_type(max_headway, int)
+    validate_data_is_type(verbosity, bool)
+    if not 0 < bunching <= 1 or max_headway <= 0:
+        raise ValueError('Bunching must be in (0, 1] and maximum headway positive.')
+    if timetables is None and (api_key or path):
+        timetables = _create_timetable_store(api_key, path)
+    if timetables is not None:
+        validate_data_is_type(timetables, TimetableStore)
+
+    codes = [pd.factorize(stop_events[name], sort=True)[0] for name in reversed(GROUP_COLUMNS)]
+    departure = stop_events['Departure'].to_numpy(dtype='datetime64[ns]').view(np.int64)
+    order = np.lexsort([departure] + codes)
+    keys = np.stack([code[order] for code in codes])
+    departure = departure[order]
+
+    headway = np.full(len(order), np.nan)
+    same_group = (keys[:, 1:] == keys[:, :-1]).all(axis=0)
+    headway[1:] = np.where(same_group, np.diff(departure) / 10 ** 9, np.nan)
+    headway[headway > max_headway] = np.nan
+
+    headways = stop_events.iloc[order][['Lines', 'ID', 'Number', 'Brigade', 'Departure']]
+    headways = headways.reset_index(drop=True).assign(Headway=headway)
+    scheduled = np.full(len(headways), np.nan) if timetables is None \
+        else _lines_scheduled_headways(headways, timetables, verbosity)
+    increment('insights_rows', len(headways), function='get_headways')
+    increment('insights_matches', np.count_nonzero(~np.isnan(scheduled)), function='get_headways')
+    observed = headways.groupby(GROUP_COLUMNS, sort=False, observed=True)['Headway']
+    reference = np.where(np.isnan(scheduled), observed.transform('median'), scheduled)
+    return headways.assign(Scheduled=scheduled, Bunched=headway < bunching * reference)
+# pylint: enable=too-many-arguments
+
+
+def get_headways_summary(headways: pd.DataFrame, by_stop: bool = False) -> pd.DataFrame:
+    """
+    Generate headways distribution for every line (or line on bus stop).
+    Args:
+        headways: headways (as returned by get_headways)
+        by_stop: if distribution should be computed for every bus stop of the line
+
+    Returns:
+        data frame indexed by line (and bus stop ID and Number) with number of headways
+        (Count), mean, median, 10th and 90th percentile of observed headways and mean
+        scheduled headway (in minutes), coefficient of variation of observed headways (CV)
+        and percentage of bunched departures (Bunching), sorted by percentage of bunching
+    """
+    validate_data_is_type(headways, pd.DataFrame)
+    validate_if_contains_columns(headways, HEADWAY_COLUMNS)
+    validate_data_is_type(by_stop, bool)
+
+    keys = GROUP_COLUMNS if by_stop else ['Lines']
+    measured = headways[headways['Headway'].notna()]
+    groups = [measured[key].astype(str) for key in keys]
+    grouped = (measured['Headway'] / 60).groupby(groups, sort=False)
+    summary = pd.DataFrame({
+        'Count': grouped.size(),
+        'Mean': grouped.mean(),
+        'Median': grouped.median(),
+        'P10': grouped.quantile(0.1),
+        'P90': grouped.quantile(0.9),
+        'CV': grouped.std(ddof=0) / grouped.mean(),
+        'Scheduled': (measured['Scheduled'] / 60).groupby(groups, sort=False).mean(),
+        'Bunching': measured['Bunched'].groupby(groups, sort=False).mean() * 100
+    })
+    summary.index.names = keys
+    return summary.sort_values(by='Bunching', ascending=False, kind='mergesort')
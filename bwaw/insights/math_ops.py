@@ -1,31 +1,22 @@
 """Math operations for speed and punctuality module."""
-from math import radians, cos, sin, asin, sqrt
-import pandas as pd
+import numpy as np
 
 EARTH_RADIUS_KM = 6371
-PROXIMITY_APPROXIMATION_CONST = 0.00001 / 1.30578
+METERS_IN_KM = 1000
 
 
-def _calculate_distance_km(lon_x: float, lat_x: float, lon_y: float, lat_y: float) -> float:
-    lon_x = radians(lon_x)
-    lat_x = radians(lat_x)
-    lon_y = radians(lon_y)
-    lat_y = radians(lat_y)
+def _calculate_distance_km_array(lon_x: np.ndarray, lat_x: np.ndarray,
+                                 lon_y: np.ndarray, lat_y: np.ndarray) -> np.ndarray:
+    lon_x, lat_x, lon_y, lat_y = (np.radians(i) for i in (lon_x, lat_x, lon_y, lat_y))
 
-    haversine = cos(lat_x) * cos(lat_y) * sin((lon_y - lon_x) / 2) ** 2
-    haversine += sin((lat_y - lat_x) / 2) ** 2
-    haversine = 2 * asin(sqrt(haversine))
+    haversine = np.cos(lat_x) * np.cos(lat_y) * np.sin((lon_y - lon_x) / 2) ** 2
+    haversine += np.sin((lat_y - lat_x) / 2) ** 2
+    haversine = 2 * np.arcsin(np.sqrt(haversine))
 
     return EARTH_RADIUS_KM * haversine
 
 
-def _calculate_time_difference_hours(time_x: pd.Timestamp, time_y: pd.Timestamp) -> float:
-    return abs((time_y - time_x).total_seconds()) / 3600
-
-
-def _calculate_speed(distance: float, time: float) -> float:
-    return distance / time
-
-
 def _proximity_to_tolerance(proximity: int) -> float:
-    return proximity * PROXIMITY_APPROXIMATION_CONST
+    if proximity < 0:
+        raise ValueError('Proximity must not be negative.')
+    return proximity / METERS_IN_KM
@@ -0,0 +1,163 @@
+"""Online speed incidents detection for live feeds of active buses."""
+from typing import List, Tuple, Union
+import numpy as np
+import pandas as pd
+
+from bwaw.insights.speed import INCIDENT_COLUMNS, _incidents_of_ordered
+from bwaw.utils.format_conversion import convert_response_list_to_dataframe
+from bwaw.utils.validation import validate_data_is_type, validate_if_contains_columns
+
+DEFAULT_MAX_AGE = 600
+DEFAULT_MAX_VEHICLES = 10000
+INITIAL_CAPACITY = 1024
+
+BusKey = Tuple[str, str]
+
+
+class OnlineSpeedDetector:
+    """
+    Stateful speed incidents detector taking snapshots of active buses one by one.
+
+    The last known position and time of every bus (line, brigade) is kept in a compact table
+    of preallocated arrays addressed through a dict of slots. Every snapshot is matched with
+    the table and checked with the same vectorized engine (and thresholds) as
+    get_all_incidents, so work per snapshot is proportional to its size. Buses not seen for
+    max_age seconds (in feed time) are evicted, and the table never exceeds max_vehicles.
+    """
+
+    def __init__(self, speed_limit: int,
+                 max_age: int = DEFAULT_MAX_AGE,
+                 max_vehicles: int = DEFAULT_MAX_VEHICLES):
+        """
+        Args:
+            speed_limit: maximum speed limit we treat as acceptable (km/hour).
+            max_age: time after which not updated bus is forgotten (in seconds)
+            max_vehicles: maximum number of tracked buses
+        """
+        validate_data_is_type(speed_limit, int)
+        validate_data_is_type(max_age, int)
+        validate_data_is_type(max_vehicles, int)
+        if max_age <= 0 or max_vehicles <= 0:
+            raise ValueError('Maximum age and number of vehicles must be positive.')
+
+        self.speed_limit = speed_limit
+        self.max_age = max_age
+        self.max_vehicles = max_vehicles
+        self.evicted = 0
+        self.reset()
+
+    def reset(self) -> None:
+        """Forget all tracked buses."""
+        capacity = min(INITIAL_CAPACITY, self.max_vehicles)
+        self._slots = {}
+        self._keys = np.empty(capacity, dtype=object)
+        self._lat = np.empty(capacity, dtype=np.float64)
+        self._lon = np.empty(capacity, dtype=np.float64)
+        self._time = np.empty(capacity, dtype=np.int64)
+        self._used = np.zeros(capacity, dtype=bool)
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def __contains__(self, key: BusKey) -> bool:
+        return key in self._slots
+
+    def _grow(self, required: int) -> None:
+        capacity = len(self._keys)
+        while capacity < required:
+            capacity *= 2
+        if capacity == len(self._keys):
+            return
+        for name in ['_keys', '_lat', '_lon', '_time', '_used']:
+            old = getattr(self, name)
+            new = np.zeros(capacity, dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+    def _evict(self, slots: np.ndarray) -> None:
+        for slot in slots:
+            del self._slots[self._keys[slot]]
+        self._keys[slots] = None
+        self._used[slots] = False
+        self.evicted += len(slots)
+
+    def _evict_stale(self, now: int) -> None:
+        self._evict(np.flatnonzero(self._used & (self._time < now - self.max_age * 10 ** 9)))
+
+    def _evict_overflow(self) -> None:
+        overflow = len(self._slots) - self.max_vehicles
+        if overflow > 0:
+            used = np.flatnonzero(self._used)
+            self._evict(used[np.argsort(self._time[used], kind='mergesort')[:overflow]])
+
+    def _store(self, keys: List[BusKey], slots: np.ndarray, lat: np.ndarray,
+               lon: np.ndarray, time: np.ndarray) -> None:
+        new = np.flatnonzero(slots < 0)
+        if len(new) > 0:
+            self._grow(len(self._slots) + len(new))
+            free = np.flatnonzero(~self._used)[:len(new)]
+            slots[new] = free
+            for position, slot in zip(new, free):
+                self._slots[keys[position]] = slot
+                self._keys[slot] = keys[position]
+            self._used[free] = True
+        self._lat[slots], self._lon[slots], self._time[slots] = lat, lon, time
+
+    def update(self, snapshot: Union[List, pd.DataFrame]) -> pd.DataFrame:
+        """
+        Process new snapshot of active buses.
+        Args:
+            snapshot: active buses (as returned by get_active_buses)
+
+        Returns:
+            speed incidents between last known and new positions of buses (in the format of
+            get_all_incidents)
+        """
+        validate_data_is_type(snapshot, (list, pd.DataFrame))
+        if isinstance(snapshot, list):
+            snapshot = convert_response_list_to_dataframe(snapshot)
+        if len(snapshot) == 0:
+            return pd.DataFrame(columns=INCIDENT_COLUMNS)
+        validate_if_contains_columns(snapshot, ['Lines', 'Brigade', 'Lon', 'Lat', 'Time'])
+        snapshot = snapshot[snapshot['Lines'].notna() & snapshot['Brigade'].notna()]
+        if len(snapshot) == 0:
+            return pd.DataFrame(columns=INCIDENT_COLUMNS)
+
+        lines = snapshot['Lines'].astype(str).to_numpy(dtype=object)
+        brigades = snapshot['Brigade'].astype(str).to_numpy(dtype=object)
+        lat = snapshot['Lat'].to_numpy(dtype=np.float64)
+        lon = snapshot['Lon'].to_numpy(dtype=np.float64)
+        time = pd.to_datetime(snapshot['Time']).to_numpy(dtype='datetime64[ns]').view(np.int64)
+        self._evict_stale(int(time.max()))
+
+        codes, keys = np.empty(len(lines), dtype=np.int64), {}
+        for row, key in enumerate(zip(lines, brigades)):
+            codes[row] = keys.setdefault(key, len(keys))
+        keys = list(keys)
+        slots = np.array([self._slots.get(key, -1) for key in keys], dtype=np.int64)
+
+        known = slots[codes] >= 0
+        fresh = ~known | (time > self._time[np.maximum(slots[codes], 0)])
+        codes, lines, brigades = codes[fresh], lines[fresh], brigades[fresh]
+        lat, lon, time = lat[fresh], lon[fresh], time[fresh]
+
+        previous = np.flatnonzero(slots >= 0)
+        previous_slots = slots[previous]
+        order = np.lexsort((np.concatenate((self._time[previous_slots], time)),
+                            np.repeat([0, 1], [len(previous), len(time)]),
+                            np.concatenate((previous, codes))))
+        columns = {
+            'Lines': np.concatenate(([keys[i][0] for i in previous], lines))[order],
+            'Brigade': np.concatenate(([keys[i][1] for i in previous], brigades))[order],
+            'Lat': np.concatenate((self._lat[previous_slots], lat))[order],
+            'Lon': np.concatenate((self._lon[previous_slots], lon))[order],
+            'Time': np.concatenate((self._time[previous_slots], time))[order]
+        }
+        _, incidents = _incidents_of_ordered(columns, self.speed_limit)
+
+        ordered_codes = np.concatenate((previous, codes))[order]
+        last = np.flatnonzero(np.append(ordered_codes[1:] != ordered_codes[:-1], True))
+        self._store([keys[i] for i in ordered_codes[last]], slots[ordered_codes[last]],
+                    columns['Lat'][last], columns['Lon'][last], columns['Time'][last])
+        self._evict_overflow()
+        return pd.DataFrame(incidents, columns=INCIDENT_COLUMNS)
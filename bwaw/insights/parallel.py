@@ -0,0 +1,195 @@
+"""Parallel execution of per-line insights over shared memory partitions."""
+from concurrent.futures import Executor, ProcessPoolExecutor, wait
+from multiprocessing.shared_memory import SharedMemory
+from typing import Callable, Dict, List, Tuple
+import numpy as np
+import pandas as pd
+
+from bwaw.utils.validation import validate_data_is_type, validate_if_contains_columns
+
+PARTITION_COLUMN = 'Lines'
+NATIVE_KINDS = 'biuf'
+
+ColumnSpec = Dict
+FrameSpec = List[ColumnSpec]
+
+
+def _share_column(name: str, column: pd.Series, order: np.ndarray,
+                  blocks: List[SharedMemory]) -> ColumnSpec:
+    """
+    Copies column reordered by order to a new shared memory block.
+    Only native numpy numbers and booleans are copied as they are. Categorical, text and
+    extension (e.g. nullable Int64, boolean) columns are stored as codes, their categories
+    travel in the spec.
+    Args:
+        name: column name
+        column: column to be shared
+        order: positional indices of rows in shared layout
+        blocks: list collecting created shared memory blocks
+
+    Returns:
+        spec allowing to rebuild the column from shared memory
+    """
+    spec = {'name': name, 'kind': 'numeric'}
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        spec.update(kind='category', categories=column.cat.categories)
+        values = column.cat.codes.to_numpy()
+    elif pd.api.types.is_datetime64_any_dtype(column.dtype):
+        spec.update(kind='time')
+        values = column.to_numpy(dtype='datetime64[ns]').view(np.int64)
+    elif isinstance(column.dtype, np.dtype) and column.dtype.kind in NATIVE_KINDS:
+        values = column.to_numpy()
+    else:
+        codes, categories = pd.factorize(column, sort=False)
+        spec.update(kind='object', categories=categories)
+        values = codes
+
+    block = SharedMemory(create=True, size=max(values.nbytes, 1))
+    blocks.append(block)
+    shared = np.ndarray(values.shape, dtype=values.dtype, buffer=block.buf)
+    np.take(values, order, out=shared)
+    spec.update(block=block.name, dtype=values.dtype.str)
+    del shared
+    return spec
+
+
+def _share_frame(data: pd.DataFrame, order: np.ndarray) -> Tuple[FrameSpec, List[SharedMemory]]:
+    blocks = []
+    try:
+        return [_share_column(name, data[name], order, blocks) for name in data.columns], blocks
+    except BaseException:
+        _release(blocks)
+        raise
+
+
+def _release(blocks: List[SharedMemory]) -> None:
+    for block in blocks:
+        block.close()
+        block.unlink()
+
+
+def _attach_partition(spec: FrameSpec, rows: int, start: int, stop: int) -> pd.DataFrame:
+    """
+    Rebuilds rows range of a shared frame.
+    Only the partition is copied out of shared memory, so no buffer is held after return.
+    Args:
+        spec: specs of shared columns
+        rows: number of rows of the shared frame
+        start: first row of the partition
+        stop: row after the last row of the partition
+
+    Returns:
+        partition data frame
+    """
+    columns = {}
+    for column in spec:
+        block = SharedMemory(name=column['block'])
+        try:
+            shared = np.ndarray((rows,), dtype=np.dtype(column['dtype']), buffer=block.buf)
+            values = shared[start:stop].copy()
+            del shared
+        finally:
+            block.close()
+        if column['kind'] == 'category':
+            values = pd.Categorical.from_codes(values, categories=column['categories'])
+        elif column['kind'] == 'object':
+            values = pd.api.extensions.take(column['categories'].array, values,
+                                            allow_fill=True)
+        elif column['kind'] == 'time':
+            values = values.view('datetime64[ns]')
+        columns[column['name']] = values
+    return pd.DataFrame(columns)
+
+
+def _run_partition(func: Callable, spec: FrameSpec, rows: int,
+                   start: int, stop: int, kwargs: Dict):
+    return func(_attach_partition(spec, rows, start, stop), **kwargs)
+
+
+def _partition_bounds(sizes: np.ndarray, partitions: int) -> np.ndarray:
+    """
+    Splits consecutive lines into partitions of similar number of rows.
+    Args:
+        sizes: number of rows of every line
+        partitions: maximum number of partitions
+
+    Returns:
+        row bounds of partitions (first rows and the end), never splitting a line
+    """
+    ends = np.cumsum(sizes)
+    targets = ends[-1] * np.arange(1, partitions) / partitions
+    splits = np.unique(ends[np.searchsorted(ends, targets, side='left')])
+    return np.unique(np.concatenate(([0], splits, [ends[-1]])))
+
+
+# pylint: disable=too-many-arguments
+def map_over_lines(func: Callable,
+                   data: pd.DataFrame,
+                   n_jobs: int = 1,
+                   executor: Executor = None,
+                   partitions: int = None,
+                   **kwargs) -> List:
+    """
+    Applies function to partitions of data made of whole lines, possibly in parallel.
+    Data is reordered by line once and copied to shared memory, so workers receive only
+    the rows range of their partition instead of pickled frames. Rows without line are
+    skipped in parallel mode. Keyword arguments are pickled with every partition, so each
+    worker process gets its own copy of them (e.g. of a TimetableStore) and changes made by
+    workers are not seen by the caller.
+    Args:
+        func: picklable function taking data of some lines (and kwargs)
+        data: data regarding buses activity
+        n_jobs: number of worker processes (used if executor is not given, 1 - serial)
+        executor: executor running the partitions
+        partitions: number of partitions (1 if serial, 4 * n_jobs otherwise)
+        **kwargs: additional arguments of func
+
+    Returns:
+        list of func results for consecutive partitions, lines in order of their first
+        appearance in data
+    """
+    validate_data_is_type(data, pd.DataFrame)
+    validate_if_contains_columns(data, [PARTITION_COLUMN])
+    validate_data_is_type(n_jobs, int)
+    if n_jobs < 1:
+        raise ValueError('Number of jobs must be positive.')
+    if executor is not None:
+        validate_data_is_type(executor, Executor)
+    serial = executor is None and n_jobs == 1
+    if partitions is None:
+        partitions = 1 if serial else 4 * n_jobs
+    validate_data_is_type(partitions, int)
+    if partitions < 1:
+        raise ValueError('Number of partitions must be positive.')
+
+    if serial and partitions == 1:
+        return [func(data, **kwargs)]
+
+    codes, lines = pd.factorize(data[PARTITION_COLUMN], sort=False)
+    order = np.argsort(codes, kind='mergesort')
+    order = order[codes[order] >= 0]
+    if len(lines) == 0:
+        return []
+    bounds = _partition_bounds(np.bincount(codes[codes >= 0], minlength=len(lines)),
+                               partitions)
+    if serial:
+        return [func(data.iloc[order[start:stop]], **kwargs)
+                for start, stop in zip(bounds[:-1], bounds[1:])]
+
+    spec, blocks = _share_frame(data, order)
+    own_executor = executor is None
+    executor = ProcessPoolExecutor(max_workers=n_jobs) if own_executor else executor
+    futures = []
+    try:
+        futures += [executor.submit(_run_partition, func, spec, len(order),
+                                    int(start), int(stop), kwargs)
+                    for start, stop in zip(bounds[:-1], bounds[1:])]
+        return [future.result() for future in futures]
+    finally:
+        for future in futures:
+            future.cancel()
+        wait(futures)
+        if own_executor:
+            executor.shutdown()
+        _release(blocks)
+# pylint: enable=too-many-arguments
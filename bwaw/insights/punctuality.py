@@ -1,16 +1,26 @@
 """Punctuality insights extraction."""
+from concurrent.futures import Executor
+from functools import partial
 from pathlib import Path
-from typing import List, Dict
+from typing import List, Dict, Union
+import numpy as np
 import pandas as pd
 from tqdm import tqdm
 
+from bwaw.api.bulk import _timetable_file_name
 from bwaw.api.requests import get_timetable_for_line_on_bus_stop
-from bwaw.insights.data import (get_all_of_line, get_all_of_brigade,
-                                _adjust_date)
 from bwaw.insights.math_ops import _proximity_to_tolerance
+from bwaw.insights.parallel import map_over_lines
+from bwaw.insights.spatial import BusStopIndex
+from bwaw.insights.timetables import TimetableStore
 from bwaw.io.load import load_response_from_csv
-from bwaw.utils.format_conversion import convert_response_list_to_dataframe, column_str_to_datetime
-from bwaw.utils.validation import validate_data_is_type, validate_multiple_params
+from bwaw.utils.format_conversion import convert_response_list_to_dataframe
+from bwaw.utils.metrics import increment, timed
+from bwaw.utils.validation import validate_data_is_type
+
+SECONDS_IN_DAY = 24 * 60 * 60
+DELAY_COLUMNS = ['Lines', 'Brigade', 'Time', 'ID', 'Number', 'Delay']
+STOP_EVENT_TIME = 'Departure'
 
 
 def _process_online(bus_stop_id: str,
@@ -25,161 +35,392 @@ def _process_from_directory(bus_stop_id: str,
                             bus_stop_nr: str,
                             bus_line: str,
                             path: Path):
-    name = f'timetable_{bus_stop_id}_{bus_stop_nr}_{bus_line}.csv'
-    return load_response_from_csv(path / name)
+    return load_response_from_csv(path / _timetable_file_name(bus_stop_id, bus_stop_nr, bus_line))
 
 
-# pylint: disable=too-many-arguments
 def _process_timetable(bus_stop_id: str,
                        bus_stop_nr: str,
                        bus_line: str,
-                       brigade: str,
-                       start_time_adjust: pd. Timestamp,
                        api_key: str = None,
                        path: Path = None):
     if not (api_key or path):
         raise ValueError
 
     if api_key:
-        timetable = _process_online(bus_stop_id, bus_stop_nr, bus_line, api_key)
+        return _process_online(bus_stop_id, bus_stop_nr, bus_line, api_key)
+    return _process_from_directory(bus_stop_id, bus_stop_nr, bus_line, path)
+
+
+def _create_timetable_store(api_key: str = None, path: Path = None) -> TimetableStore:
+    return TimetableStore(partial(_process_timetable, api_key=api_key, path=path))
+
+
+def _nearest_departure_delays(departures: np.ndarray, seconds: np.ndarray) -> np.ndarray:
+    """
+    Computes signed delays of pings to their nearest scheduled departures.
+    Departures are treated as repeating every day, so pings shortly after midnight can be
+    matched with late evening departures and the other way round.
+    Args:
+        departures: sorted departure times (seconds from midnight)
+        seconds: ping times (seconds from midnight)
+
+    Returns:
+        delays in seconds (positive - bus late, negative - bus early)
+    """
+    extended = np.concatenate(([departures[-1] - SECONDS_IN_DAY], departures,
+                               [departures[0] + SECONDS_IN_DAY]))
+    idx = np.searchsorted(departures, seconds, side='left')
+    delay_before = seconds - extended[idx]
+    delay_after = seconds - extended[idx + 1]
+    return np.where(delay_before <= -delay_after, delay_before, delay_after)
+
+
+def _empty_delays() -> pd.DataFrame:
+    return pd.DataFrame(columns=DELAY_COLUMNS).astype({'Delay': np.float64})
+
+
+def _validate_punctuality_parameters(bus_coordinates: pd.DataFrame,
+                                     stops_coordinates: Union[pd.DataFrame, BusStopIndex],
+                                     api_key: str,
+                                     path: Path,
+                                     proximity: int,
+                                     verbosity: bool) -> None:
+    validate_data_is_type(bus_coordinates, pd.DataFrame)
+    validate_data_is_type(stops_coordinates, (pd.DataFrame, BusStopIndex))
+    validate_data_is_type(proximity, int)
+    if api_key:
+        validate_data_is_type(api_key, str)
+    if path:
+        validate_data_is_type(path, Path)
+    validate_data_is_type(verbosity, bool)
+
+
+@timed('insights_seconds')
+def _match_departures(matched: pd.DataFrame,
+                      timetables: TimetableStore,
+                      verbosity: bool) -> pd.DataFrame:
+    """
+    Matches events at bus stops of single line with the nearest scheduled departures.
+    Events are grouped by (bus stop, brigade), so each timetable is fetched once and all
+    events of the group are resolved with a single searchsorted.
+    Args:
+        matched: data frame with Lines, Brigade, Time, ID and Number columns
+        timetables: store of loaded timetables
+        verbosity: if progress bar of timetables processing should be shown
+
+    Returns:
+        data frame with DELAY_COLUMNS, events at bus stops without timetable dropped
+    """
+    times = matched['Time']
+    seconds = ((times - times.dt.normalize()) / pd.Timedelta(seconds=1)).to_numpy()
+    delays = np.full(len(matched), np.nan)
+    loaded = np.ones(len(matched), dtype=bool)
+    line = matched['Lines'].iloc[0]
+
+    groups = matched.groupby(['ID', 'Number', 'Brigade'], sort=False, observed=True).indices
+    for (stop_id, stop_nr, brigade), rows in tqdm(groups.items(), disable=not verbosity):
+        try:
+            timetable = timetables.get(stop_id, stop_nr, line)
+        except ValueError:
+            loaded[rows] = False
+            continue
+        departures = timetable.get(brigade)
+        if departures is not None and len(departures) > 0:
+            delays[rows] = _nearest_departure_delays(departures, seconds[rows])
+
+    increment('insights_rows', len(matched), function='_match_departures')
+    increment('insights_matches', np.count_nonzero(~np.isnan(delays)),
+              function='_match_departures')
+    matched = matched.assign(Delay=delays)
+    return matched.loc[loaded, DELAY_COLUMNS].reset_index(drop=True)
+
+
+def _line_delays(line_coordinates: pd.DataFrame,
+                 stops_index: BusStopIndex,
+                 timetables: TimetableStore,
+                 tolerance: float,
+                 verbosity: bool) -> pd.DataFrame:
+    """
+    Computes delays of all pings of single line that are close to a bus stop, or of all
+    departures if line_coordinates are stop events (as returned by get_stop_events).
+    Args:
+        line_coordinates: array of active buses (or stop events) for single line
+        stops_index: index of bus stops coordinates
+        timetables: store of loaded timetables
+        tolerance: proximity error (in km)
+        verbosity: if progress bar of timetables processing should be shown
+
+    Returns:
+        data frame with DELAY_COLUMNS, events ordered by brigade (in order of appearance)
+        and then as in line_coordinates
+    """
+    if STOP_EVENT_TIME in line_coordinates.columns:
+        matched = line_coordinates[['Lines', 'Brigade', STOP_EVENT_TIME, 'ID', 'Number']]
+        matched = matched.rename(columns={STOP_EVENT_TIME: 'Time'}).reset_index(drop=True)
     else:
-        timetable = _process_from_directory(bus_stop_id, bus_stop_nr, bus_line, path)
+        nearest = stops_index.nearest(line_coordinates['Lat'].to_numpy(),
+                                      line_coordinates['Lon'].to_numpy(), tolerance)
+        matched = line_coordinates.loc[nearest >= 0, ['Lines', 'Brigade', 'Time']]
+        stops = nearest[nearest >= 0]
+        matched = matched.reset_index(drop=True).assign(
+            ID=stops_index.stops['ID'].to_numpy()[stops],
+            Number=stops_index.stops['Number'].to_numpy()[stops])
+    if len(matched) == 0:
+        return _empty_delays()
 
-    timetable['Brigade'] = timetable['Brigade'].astype(str)
-    timetable = timetable[timetable['Brigade'] == brigade]
-    timetable['Time'] = column_str_to_datetime(timetable['Time'], time_only=True)
-    timetable['Time'] = _adjust_date(timetable['Time'], start_from=start_time_adjust)
-    return timetable
+    brigade_codes = pd.Index(pd.unique(line_coordinates['Brigade'])).get_indexer(
+        matched['Brigade'])
+    order = np.lexsort((np.arange(len(matched)), brigade_codes))
+    return _match_departures(matched.iloc[order].reset_index(drop=True), timetables, verbosity)
+
+
+def _lines_delays(lines_coordinates: pd.DataFrame, **kwargs) -> pd.DataFrame:
+    """
+    Computes delays of every line in data, lines in order of their first appearance.
+    Args:
+        lines_coordinates: array of active buses
+        **kwargs: arguments of _line_delays
+
+    Returns:
+        data frame with DELAY_COLUMNS
+    """
+    codes, lines = pd.factorize(lines_coordinates['Lines'], sort=False)
+    order = np.argsort(codes, kind='mergesort')
+    bounds = np.searchsorted(codes[order], np.arange(len(lines) + 1))
+    delays = [_line_delays(lines_coordinates.iloc[order[start:stop]], **kwargs)
+              for start, stop in zip(bounds[:-1], bounds[1:])]
+    return pd.concat(delays, ignore_index=True) if delays else _empty_delays()
+
+
+# pylint: disable=too-many-arguments
+def get_delays_for_bus(bus_coordinates: pd.DataFrame,
+                       stops_coordinates: Union[pd.DataFrame, BusStopIndex],
+                       api_key: str = None,
+                       path: Path = None,
+                       proximity: int = 10,
+                       verbosity: bool = False,
+                       timetables: TimetableStore = None) -> pd.DataFrame:
+    """
+    Generate delays record for single bus.
+    Every ping close to a bus stop is matched with the nearest scheduled departure of its
+    brigade. For stop events (as returned by get_stop_events) every visit is matched by its
+    departure time instead, so idling at a stop counts once and pass-bys between pings are
+    not missed. Events at bus stops without available timetable are skipped.
+    Args:
+        bus_coordinates: array of active buses for single bus (or its stop events)
+        stops_coordinates: array of bus stops coordinates or index built from it
+        api_key: UMWaw API key if timetables are processed online
+        path: path to directory containing .csv files if timetables are already downloaded
+        proximity: proximity error regarding closeness between bus and a bus stop (in meters)
+        verbosity: if progress bar of timetables processing should be shown
+        timetables: store of already loaded timetables, created from api_key/path if not given
+
+    Returns:
+        data frame with Lines, Brigade, Time, ID, Number and Delay columns, where Delay is
+        difference between ping and departure time (in seconds, positive - bus late,
+        negative - bus early, nan - brigade missing in timetable)
+    """
+    _validate_punctuality_parameters(bus_coordinates, stops_coordinates, api_key, path,
+                                     proximity, verbosity)
+    if isinstance(stops_coordinates, pd.DataFrame):
+        stops_coordinates = BusStopIndex(stops_coordinates)
+    if timetables is None:
+        timetables = _create_timetable_store(api_key, path)
+    validate_data_is_type(timetables, TimetableStore)
+
+    return _line_delays(bus_coordinates, stops_coordinates, timetables,
+                        _proximity_to_tolerance(proximity), verbosity)
+
+
+def get_delays_for_buses(buses_coordinates: pd.DataFrame,
+                         stops_coordinates: Union[pd.DataFrame, BusStopIndex],
+                         api_key: str = None,
+                         path: Path = None,
+                         proximity: int = 10,
+                         verbosity: bool = False,
+                         timetables: TimetableStore = None,
+                         n_jobs: int = 1,
+                         executor: Executor = None) -> pd.DataFrame:
+    """
+    Generate delays record for all buses in a file.
+    Args:
+        buses_coordinates: array of active buses (or their stop events)
+        stops_coordinates: array of bus stops coordinates or index built from it
+        api_key: UMWaw API key if timetables are processed online
+        path: path to directory containing .csv files if timetables are already downloaded
+        proximity: proximity error regarding closeness between bus and a bus stop (in meters)
+        verbosity: if progress bar of timetables processing should be shown
+        timetables: store of already loaded timetables, created from api_key/path if not given
+            (worker processes use their own copies of it)
+        n_jobs: number of worker processes lines are split between (1 - serial)
+        executor: executor lines are split between (overrides n_jobs)
+
+    Returns:
+        data frame with delays of all lines (as in get_delays_for_bus), ordered by line
+        (in order of appearance)
+    """
+    _validate_punctuality_parameters(buses_coordinates, stops_coordinates, api_key, path,
+                                     proximity, verbosity)
+    if isinstance(stops_coordinates, pd.DataFrame):
+        stops_coordinates = BusStopIndex(stops_coordinates)
+    if timetables is None:
+        timetables = _create_timetable_store(api_key, path)
+    validate_data_is_type(timetables, TimetableStore)
+
+    delays = map_over_lines(_lines_delays, buses_coordinates, n_jobs=n_jobs, executor=executor,
+                            stops_index=stops_coordinates, timetables=timetables,
+                            tolerance=_proximity_to_tolerance(proximity), verbosity=verbosity)
+    if not delays:
+        return _empty_delays()
+    return pd.concat(delays, ignore_index=True)
 
 
 def get_punctuality_list_for_bus(bus_coordinates: pd.DataFrame,
-                                 stops_coordinates: pd.DataFrame,
+                                 stops_coordinates: Union[pd.DataFrame, BusStopIndex],
                                  api_key: str = None,
                                  path: Path = None,
                                  proximity: int = 10,
                                  time: int = 1,
-                                 verbosity: bool = False) -> List:
+                                 verbosity: bool = False,
+                                 timetables: TimetableStore = None) -> List:
     """
     Generate punctuality record for single bus.
     Args:
-        bus_coordinates: array of active buses for single bus
-        stops_coordinates: array of bus stops coordinates
+        bus_coordinates: array of active buses for single bus (or its stop events)
+        stops_coordinates: array of bus stops coordinates or index built from it
         api_key: UMWaw API key if timetables are processed online
         path: path to directory containing .csv files if timetables are already downloaded
         proximity: proximity error regarding closeness between bus and a bus stop (in meters)
         time: minimum time meaning punctuality incident (in minutes)
         verbosity: if progress bar of timetables processing should be shown
+        timetables: store of already loaded timetables, created from api_key/path if not given
 
     Returns:
         list with True - punctuality incident, False - bus on time
     """
-    validate_multiple_params([bus_coordinates, stops_coordinates],
-                             lambda x: validate_data_is_type(x, pd.DataFrame))
-    validate_multiple_params([proximity, time],
-                             lambda x: validate_data_is_type(x, int))
-    if api_key:
-        validate_data_is_type(api_key, str)
-    if path:
-        validate_data_is_type(path, Path)
-    validate_data_is_type(verbosity, bool)
-
-    progress_bar = tqdm(total=len(bus_coordinates)) if verbosity else None
-    proximity = _proximity_to_tolerance(proximity)
-    time *= 60
-    punctuality = []
-    for brigade in bus_coordinates["Brigade"].unique():
-        for _, row in get_all_of_brigade(bus_coordinates, brigade).iterrows():
-            found_bus_stops = stops_coordinates[
-                (abs(stops_coordinates['Latitude'] - row['Lat']) < proximity)
-                & (abs(stops_coordinates['Longitude'] - row['Lon']) < proximity)
-            ]
-
-            if len(found_bus_stops) > 0:
-                res = found_bus_stops[["ID", "Number"]].to_dict(orient="records")[0]
-                try:
-                    res = _process_timetable(bus_stop_id=res['ID'],
-                                             bus_stop_nr=res['Number'],
-                                             bus_line=bus_coordinates.at[0, 'Lines'],
-                                             brigade=brigade,
-                                             start_time_adjust=bus_coordinates['Time'].min(),
-                                             api_key=api_key,
-                                             path=path)
-                    time_diff = (res['Time'] - row['Time']).min().total_seconds()
-                    punctuality.append(time_diff >= time)
-                except ValueError:
-                    continue
-
-            if progress_bar:
-                progress_bar.update(1)
-
-    return punctuality
+    validate_data_is_type(time, int)
+    delays = get_delays_for_bus(bus_coordinates, stops_coordinates, api_key, path, proximity,
+                                verbosity, timetables)
+    return (delays['Delay'].abs() >= 60 * time).tolist()
 
 
 def get_punctuality_list_for_buses(buses_coordinates: pd.DataFrame,
-                                   stops_coordinates: pd.DataFrame,
+                                   stops_coordinates: Union[pd.DataFrame, BusStopIndex],
                                    api_key: str = None,
                                    path: Path = None,
                                    proximity: int = 10,
                                    time: int = 1,
-                                   verbosity: bool = False) -> Dict:
+                                   verbosity: bool = False,
+                                   timetables: TimetableStore = None,
+                                   n_jobs: int = 1,
+                                   executor: Executor = None) -> Dict:
     """
     Generate punctuality record for all buses in a file.
     Args:
-        buses_coordinates: array of active buses
-        stops_coordinates: array of bus stops coordinates
+        buses_coordinates: array of active buses (or their stop events)
+        stops_coordinates: array of bus stops coordinates or index built from it
         api_key: UMWaw API key if timetables are processed online
         path: path to directory containing .csv files if timetables are already downloaded
         proximity: proximity error regarding closeness between bus and a bus stop (in meters)
         time: minimum time meaning punctuality incident
         verbosity: if progress bar of timetables processing should be shown
+        timetables: store of already loaded timetables, created from api_key/path if not given
+            (worker processes use their own copies of it)
+        n_jobs: number of worker processes lines are split between (1 - serial)
+        executor: executor lines are split between (overrides n_jobs)
 
     Returns:
         dict, for each bus it is list with True - punctuality incident, False - bus on time
     """
-    punctuality_data = {}
-    for bus_nr in buses_coordinates['Lines'].unique():
-        subset = get_all_of_line(buses_coordinates, bus_nr)
-        punctuality_data[bus_nr] = get_punctuality_list_for_bus(bus_coordinates=subset,
-                                                                stops_coordinates=stops_coordinates,
-                                                                api_key=api_key,
-                                                                path=path,
-                                                                proximity=proximity,
-                                                                time=time,
-                                                                verbosity=verbosity)
+    validate_data_is_type(time, int)
+    delays = get_delays_for_buses(buses_coordinates, stops_coordinates, api_key, path,
+                                  proximity, verbosity, timetables, n_jobs, executor)
+    incidents = delays['Delay'].abs() >= 60 * time
+    return {line: incidents[delays['Lines'] == line].tolist()
+            for line in buses_coordinates['Lines'].unique()}
+
+
+def get_delays_summary(buses_coordinates: pd.DataFrame,
+                       stops_coordinates: Union[pd.DataFrame, BusStopIndex],
+                       api_key: str = None,
+                       path: Path = None,
+                       proximity: int = 10,
+                       time: int = 1,
+                       verbosity: bool = False,
+                       n_jobs: int = 1,
+                       executor: Executor = None) -> pd.DataFrame:
+    """
+    Generate delays distribution for every line.
+    Args:
+        buses_coordinates: array of active buses (or their stop events)
+        stops_coordinates: array of bus stops coordinates or index built from it
+        api_key: UMWaw API key if timetables are processed online
+        path: path to directory containing .csv files if timetables are already downloaded
+        proximity: proximity error regarding closeness between bus and a bus stop (in meters)
+        time: minimum time meaning punctuality incident (in minutes)
+        verbosity: if progress bar of timetables processing should be shown
+        n_jobs: number of worker processes lines are split between (1 - serial)
+        executor: executor lines are split between (overrides n_jobs)
+
+    Returns:
+        data frame indexed by line with number of matched pings (Count), percentage of
+        punctuality incidents (Incidents) and mean, median, 10th and 90th percentile of delays
+        (in minutes), sorted by percentage of incidents
+    """
+    validate_data_is_type(time, int)
+    delays = get_delays_for_buses(buses_coordinates, stops_coordinates, api_key, path,
+                                  proximity, verbosity, n_jobs=n_jobs, executor=executor)
+    return _summarize_delays(delays, buses_coordinates['Lines'].unique(), time)
+
 
-    return punctuality_data
+def _summarize_delays(delays: pd.DataFrame, lines: np.ndarray, time: int) -> pd.DataFrame:
+    minutes = delays['Delay'] / 60
+    grouped = minutes.groupby(delays['Lines'].astype(str), sort=False)
+    summary = pd.DataFrame({
+        'Count': grouped.size(),
+        'Incidents': (minutes.abs() >= time).groupby(delays['Lines'].astype(str),
+                                                     sort=False).mean() * 100,
+        'Mean': grouped.mean(),
+        'Median': grouped.median(),
+        'P10': grouped.quantile(0.1),
+        'P90': grouped.quantile(0.9)
+    })
+    summary = summary.reindex([str(i) for i in lines])
+    summary['Count'] = summary['Count'].fillna(0).astype(int)
+    summary.index.name = 'Lines'
+    return summary.sort_values(by='Incidents', ascending=False, kind='mergesort')
 
 
 def get_punctuality_report(buses_coordinates: pd.DataFrame,
-                           stops_coordinates: pd.DataFrame,
+                           stops_coordinates: Union[pd.DataFrame, BusStopIndex],
                            api_key: str = None,
                            path: Path = None,
                            proximity: int = 10,
                            time: int = 1,
-                           verbosity: bool = False) -> str:
+                           verbosity: bool = False,
+                           n_jobs: int = 1,
+                           executor: Executor = None) -> str:
     """
     Generate punctuality summary for all buses in a file.
     Args:
-        buses_coordinates: array of active buses
-        stops_coordinates: array of bus stops coordinates
+        buses_coordinates: array of active buses (or their stop events)
+        stops_coordinates: array of bus stops coordinates or index built from it
         api_key: UMWaw API key if timetables are processed online
         path: path to directory containing .csv files if timetables are already downloaded
         proximity: proximity error regarding closeness between bus and a bus stop (in meters)
         time: minimum time meaning punctuality incident
         verbosity: if progress bar of timetables processing should be shown
+        n_jobs: number of worker processes lines are split between (1 - serial)
+        executor: executor lines are split between (overrides n_jobs)
 
     Returns:
         human readable summary of punctuality insight for given active buses
     """
-    report = get_punctuality_list_for_buses(buses_coordinates=buses_coordinates,
-                                            stops_coordinates=stops_coordinates,
-                                            api_key=api_key,
-                                            path=path,
-                                            proximity=proximity,
-                                            time=time,
-                                            verbosity=verbosity)
-    report = [[k, round(100 * sum(v) / len(v), 2)] for k, v in report.items()]
-    report = sorted(report, reverse=True, key=lambda x: x[1])
+    validate_data_is_type(time, int)
+    delays = get_delays_for_buses(buses_coordinates, stops_coordinates, api_key, path,
+                                  proximity, verbosity, n_jobs=n_jobs, executor=executor)
+    report = _summarize_delays(delays, buses_coordinates['Lines'].unique(), time)
+    report = [[line, round(incidents, 2)] for line, incidents in report['Incidents'].items()]
     summary = 'Percentage of punctuality incidents:\n'
     for i in report:
         summary += f'- {i[0]} line: {i[1]}% incidents.\n'
@@ -0,0 +1,144 @@
+"""Spatial index of bus stops for proximity lookups."""
+from typing import Tuple
+import numpy as np
+import pandas as pd
+
+from bwaw.insights.math_ops import EARTH_RADIUS_KM, _calculate_distance_km_array
+from bwaw.utils.validation import validate_data_is_type, validate_if_contains_columns
+
+PROJECTION_MARGIN = 1.01
+
+
+class BusStopIndex:
+    """
+    Uniform grid hash over bus stops coordinates.
+
+    Stops are projected to a local equirectangular plane (in km) and bucketed into square
+    cells of cell_size km. Queries only inspect cells neighbouring each point and confirm
+    candidates with the exact haversine distance, so a batch of points is answered
+    in time proportional to the number of points and nearby stops.
+    """
+
+    def __init__(self, stops_coordinates: pd.DataFrame, cell_size: float = 0.1):
+        """
+        Builds index from the output of get_bus_stops_coordinates.
+        Args:
+            stops_coordinates: array of bus stops coordinates
+            cell_size: size of grid cell (in km)
+        """
+        validate_data_is_type(stops_coordinates, pd.DataFrame)
+        validate_if_contains_columns(stops_coordinates, ['ID', 'Number', 'Latitude', 'Longitude'])
+        validate_data_is_type(cell_size, (int, float))
+        if cell_size <= 0:
+            raise ValueError('Cell size must be positive.')
+
+        self.stops = stops_coordinates.reset_index(drop=True)
+        self.cell_size = float(cell_size)
+        self.latitude = self.stops['Latitude'].to_numpy(dtype=float)
+        self.longitude = self.stops['Longitude'].to_numpy(dtype=float)
+        self._cos_lat = np.cos(np.radians(np.nanmean(self.latitude))) if len(self.stops) else 1.
+
+        cell_x, cell_y = self._to_cells(self.latitude, self.longitude)
+        self._min_x, self._min_y = (cell_x.min(), cell_y.min()) if len(self.stops) else (0, 0)
+        self._width = cell_y.max() - self._min_y + 1 if len(self.stops) else 1
+        keys = (cell_x - self._min_x) * self._width + (cell_y - self._min_y)
+        self._order = np.argsort(keys, kind='mergesort')
+        self._keys = keys[self._order]
+
+    def __len__(self) -> int:
+        return len(self.stops)
+
+    def project(self, lat: np.ndarray, lon: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Projects points to the local plane of the index.
+        Args:
+            lat: latitudes of points
+            lon: longitudes of points
+
+        Returns:
+            (tuple): x (east) and y (north) coordinates of points (in km)
+        """
+        return (EARTH_RADIUS_KM * np.radians(lon) * self._cos_lat,
+                EARTH_RADIUS_KM * np.radians(lat))
+
+    def _to_cells(self, lat: np.ndarray, lon: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        pos_x, pos_y = self.project(lat, lon)
+        return (np.floor(pos_x / self.cell_size).astype(np.int64),
+                np.floor(pos_y / self.cell_size).astype(np.int64))
+
+    def query(self, lat: np.ndarray, lon: np.ndarray,
+              radius: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Finds all stops within radius of each point.
+        Points are processed in order of their cells, so lookups of neighbouring cells walk
+        the sorted stop keys sequentially.
+        Args:
+            lat: latitudes of points
+            lon: longitudes of points
+            radius: search radius (in km)
+
+        Returns:
+            (tuple):
+                positions of points having stop nearby
+                positions of found stops in self.stops
+                distances between them (in km)
+            all sorted by point position and distance
+        """
+        lat, lon = np.asarray(lat, dtype=float), np.asarray(lon, dtype=float)
+        if radius < 0:
+            raise ValueError('Radius must not be negative.')
+        if len(self.stops) == 0 or len(lat) == 0:
+            empty = np.array([], dtype=np.int64)
+            return empty, empty, np.array([], dtype=float)
+
+        cell_x, cell_y = self._to_cells(lat, lon)
+        cell_x, cell_y = cell_x - self._min_x, cell_y - self._min_y
+        by_cell = np.argsort(cell_x * self._width + cell_y, kind='stable')
+        cell_x, cell_y = cell_x[by_cell], cell_y[by_cell]
+        reach = int(np.ceil(radius * PROJECTION_MARGIN / self.cell_size))
+        points, stops = [], []
+        for d_x in range(-reach, reach + 1):
+            for d_y in range(-reach, reach + 1):
+                neighbour_x, neighbour_y = cell_x + d_x, cell_y + d_y
+                valid = np.flatnonzero((neighbour_x >= 0) & (neighbour_y >= 0)
+                                       & (neighbour_y < self._width))
+                keys = neighbour_x[valid] * self._width + neighbour_y[valid]
+                start = np.searchsorted(self._keys, keys, side='left')
+                count = np.searchsorted(self._keys, keys, side='right') - start
+                total = count.sum()
+                if total == 0:
+                    continue
+                offset = np.arange(total) - np.repeat(np.cumsum(count) - count, count)
+                points.append(np.repeat(valid, count))
+                stops.append(self._order[np.repeat(start, count) + offset])
+
+        if not points:
+            empty = np.array([], dtype=np.int64)
+            return empty, empty, np.array([], dtype=float)
+
+        points, stops = by_cell[np.concatenate(points)], np.concatenate(stops)
+        distance = _calculate_distance_km_array(lon_x=lon[points], lat_x=lat[points],
+                                                lon_y=self.longitude[stops],
+                                                lat_y=self.latitude[stops])
+        within = distance <= radius
+        points, stops, distance = points[within], stops[within], distance[within]
+        order = np.lexsort((stops, distance, points))
+        return points[order], stops[order], distance[order]
+
+    def nearest(self, lat: np.ndarray, lon: np.ndarray, radius: float) -> np.ndarray:
+        """
+        Finds the nearest stop within radius of each point.
+        Args:
+            lat: latitudes of points
+            lon: longitudes of points
+            radius: search radius (in km)
+
+        Returns:
+            position of the nearest stop in self.stops for each point, -1 if none found
+        """
+        points, stops, _ = self.query(lat, lon, radius)
+        nearest = np.full(len(np.asarray(lat)), -1, dtype=np.int64)
+        first = np.ones(len(points), dtype=bool)
+        first[1:] = points[1:] != points[:-1]
+        nearest[points[first]] = stops[first]
+        return nearest
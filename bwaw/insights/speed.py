@@ -1,42 +1,165 @@
 """Speed insights extraction."""
-from typing import Tuple
+from concurrent.futures import Executor
+from typing import Dict, Iterator, Tuple
 
 import pandas as pd
 import numpy as np
 
-from bwaw.insights.math_ops import (_calculate_distance_km, _calculate_time_difference_hours,
-                                    _calculate_speed)
+from bwaw.insights.math_ops import _calculate_distance_km_array
+from bwaw.insights.parallel import map_over_lines
+from bwaw.utils.metrics import increment, timed
 from bwaw.utils.validation import validate_if_contains_columns, validate_data_is_type
-from bwaw.insights.data import get_all_of_line, get_all_of_brigade
 
+MAX_BUS_SPEED_KMH = 150
+INCIDENT_COLUMNS = ['Lines', 'Speed', 'Lat', 'Lon', 'Time']
+DEFAULT_CHUNK_ROWS = 1_000_000
+DEFAULT_GRID_SIZE = 8
 
-def _report_incident(subset: pd.DataFrame, speed: float) -> dict:
+
+def _order_by_bus(data: pd.DataFrame) -> np.ndarray:
+    """
+    Finds row order grouping data by bus and sorting each bus by time.
+    Lines and brigades keep the order in which they first appear in time. Pings of a bus
+    with equal time keep their input order (stable sort), so incidents around duplicated
+    timestamps are deterministic.
+    Args:
+        data: data regarding buses activity
+
+    Returns:
+        positional indices sorting data by (Lines, Brigade, Time)
+    """
+    by_time = np.argsort(data['Time'].to_numpy(), kind='mergesort')
+    in_time = data.iloc[by_time]
+    line_codes = in_time.groupby('Lines', sort=False).ngroup().to_numpy()
+    bus_codes = in_time.groupby(['Lines', 'Brigade'], sort=False).ngroup().to_numpy()
+    return by_time[np.lexsort((bus_codes, line_codes))]
+
+
+def _ordered_bus_columns(data: pd.DataFrame) -> Dict[str, np.ndarray]:
+    """
+    Extracts columns of buses activity grouped by bus and sorted by time.
+    Rows without line or brigade are skipped.
+    Args:
+        data: data regarding buses activity
+
+    Returns:
+        dict with Lines, Brigade, Lat, Lon and Time (int64 ns) arrays
+    """
+    data = data[data['Lines'].notna() & data['Brigade'].notna()]
+    order = _order_by_bus(data)
     return {
-        'Speed': speed,
-        'Lat': subset['Lat'].mean(),
-        'Lon': subset['Lon'].mean(),
-        'Time': subset['Time'].mean()
+        'Lines': data['Lines'].to_numpy()[order],
+        'Brigade': data['Brigade'].to_numpy()[order],
+        'Lat': data['Lat'].to_numpy(dtype=float)[order],
+        'Lon': data['Lon'].to_numpy(dtype=float)[order],
+        'Time': data['Time'].to_numpy(dtype='datetime64[ns]').view('int64')[order]
+    }
+
+
+def _bus_bounds(lines: np.ndarray, brigades: np.ndarray) -> np.ndarray:
+    changes = np.flatnonzero((lines[1:] != lines[:-1]) | (brigades[1:] != brigades[:-1])) + 1
+    return np.concatenate(([0], changes, [len(lines)]))
+
+
+def _incidents_of_ordered(columns: Dict[str, np.ndarray], speed_limit: int) -> Tuple:
+    """
+    Vectorized speed incidents detection for columns grouped by bus and sorted by time.
+    Args:
+        columns: ordered columns (as in _ordered_bus_columns)
+        speed_limit: maximum speed limit we treat as acceptable (km/hour).
+
+    Returns:
+        (tuple): positions of first pings of incidents and dict with INCIDENT_COLUMNS arrays
+    """
+    lines, brigades = columns['Lines'], columns['Brigade']
+    lat, lon, time = columns['Lat'], columns['Lon'], columns['Time']
+
+    same_bus = (lines[1:] == lines[:-1]) & (brigades[1:] == brigades[:-1])
+    distance = _calculate_distance_km_array(lon_x=lon[:-1], lat_x=lat[:-1],
+                                            lon_y=lon[1:], lat_y=lat[1:])
+    hours = np.abs(time[1:] - time[:-1]) / 1e9 / 3600
+    with np.errstate(divide='ignore', invalid='ignore'):
+        speed = distance / hours
+
+    idx = np.flatnonzero(same_bus & (hours > 0)
+                         & (speed > speed_limit) & (speed < MAX_BUS_SPEED_KMH))
+    return idx, {
+        'Lines': lines[idx],
+        'Speed': speed[idx],
+        'Lat': (lat[idx] + lat[idx + 1]) / 2,
+        'Lon': (lon[idx] + lon[idx + 1]) / 2,
+        'Time': (time[idx] + (time[idx + 1] - time[idx]) // 2).view('datetime64[ns]')
     }
 
 
-def _create_grid(min_lat: float, max_lat: float, min_lon: float, max_lon: float) -> Tuple:
-    latitude = np.linspace(start=min_lat, stop=max_lat, num=9)
-    longitude = np.linspace(start=min_lon, stop=max_lon, num=9)
+@timed('insights_seconds')
+def _find_speed_incidents(data: pd.DataFrame, speed_limit: int) -> pd.DataFrame:
+    """
+    Vectorized speed incidents detection for any number of buses.
+    Args:
+        data: data regarding buses activity
+        speed_limit: maximum speed limit we treat as acceptable (km/hour).
+
+    Returns:
+        All speed incidents (INCIDENT_COLUMNS), ordered by bus and time
+    """
+    _, incidents = _incidents_of_ordered(_ordered_bus_columns(data), speed_limit)
+    incidents = pd.DataFrame(incidents, columns=INCIDENT_COLUMNS)
+    increment('insights_rows', len(data), function='_find_speed_incidents')
+    increment('insights_matches', len(incidents), function='_find_speed_incidents')
+    return incidents
+
+
+def _create_grid(min_lat: float, max_lat: float, min_lon: float, max_lon: float,
+                 grid_size: int = DEFAULT_GRID_SIZE) -> Tuple:
+    latitude = np.linspace(start=min_lat, stop=max_lat, num=grid_size + 1)
+    longitude = np.linspace(start=min_lon, stop=max_lon, num=grid_size + 1)
     return latitude, longitude
 
 
-def _value_to_grid_index(value: float, grid: np.ndarray) -> np.ndarray:
-    arg = np.argmax([value <= i for i in grid[1:]])
-    return arg
+def _grid_index(values: np.ndarray, grid: np.ndarray) -> np.ndarray:
+    """
+    Finds grid cells of values, cell i covering (grid[i], grid[i + 1]] (first one closed).
+    Args:
+        values: values within grid range
+        grid: cells edges
+
+    Returns:
+        cell indices
+    """
+    return np.digitize(values, grid[1:-1], right=True)
 
 
 def _grid_index_to_center_value(grid_idx: np.ndarray, grid: np.ndarray) -> float:
     return (grid[grid_idx + 1] + grid[grid_idx]) / 2
 
 
-def _find_grid(column: pd.Series, grid: np.ndarray) -> pd.Series:
-    column = column.apply(lambda x: _value_to_grid_index(x, grid))
-    return column
+def _incidents_grid(incidents: pd.DataFrame, grid_size: int) -> Tuple:
+    lat = incidents['Lat'].to_numpy(dtype=float)
+    lon = incidents['Lon'].to_numpy(dtype=float)
+    return _create_grid(min_lat=lat.min(), max_lat=lat.max(), min_lon=lon.min(),
+                        max_lon=lon.max(), grid_size=grid_size)
+
+
+def _lines_positions(incidents: pd.DataFrame, grid_size: int) -> pd.DataFrame:
+    """
+    Mean position of incidents of every line and its cell on the grid spanning all incidents.
+    Args:
+        incidents: speed incidents (as returned by get_all_incidents)
+        grid_size: number of grid cells along latitude and along longitude
+
+    Returns:
+        data frame indexed by Lines with Lat, Lon, Lat_grid and Lon_grid columns
+    """
+    positions = incidents.groupby(by='Lines')[['Lat', 'Lon']].mean()
+    if len(positions) == 0:
+        positions['Lat_grid'] = positions['Lon_grid'] = np.array([], dtype=np.int64)
+        return positions
+
+    lat_grid, lon_grid = _incidents_grid(incidents, grid_size)
+    positions['Lat_grid'] = _grid_index(positions['Lat'].to_numpy(), lat_grid)
+    positions['Lon_grid'] = _grid_index(positions['Lon'].to_numpy(), lon_grid)
+    return positions
 
 
 def get_speed_incidents_for_bus(data: pd.DataFrame, speed_limit: int) -> pd.DataFrame:
@@ -47,56 +170,81 @@ def get_speed_incidents_for_bus(data: pd.DataFrame, speed_limit: int) -> pd.Data
         speed_limit: maximum speed limit we treat as acceptable (km/hour).
 
     Returns:
-        All speed incidents in the format based on _report_incident
+        All speed incidents (Speed, Lat, Lon, Time columns)
     """
     validate_if_contains_columns(data, ['Lon', 'Lat', 'Time', 'Lines', 'Brigade'])
     validate_data_is_type(speed_limit, int)
     if len(data['Lines'].unique()) > 1 or len(data['Brigade'].unique()) > 1:
         raise ValueError('Data does not consist of information from single bus/brigade.')
 
-    data.sort_values(by='Time', ascending=True, inplace=True)
-    data.reset_index(drop=True, inplace=True)
-    report = []
-
-    for i in range(len(data) - 1):
-        distance = _calculate_distance_km(lon_x=data.at[i, 'Lon'], lat_x=data.at[i, 'Lat'],
-                                          lon_y=data.at[i+1, 'Lon'], lat_y=data.at[i+1, 'Lat'])
-        time = _calculate_time_difference_hours(data.at[i, 'Time'], data.at[i+1, 'Time'])
-        if time:
-            speed = _calculate_speed(distance, time)
-
-            if 150 > speed > speed_limit:
-                report.append(_report_incident(data.iloc[[i, i+1]], speed))
+    return _find_speed_incidents(data, speed_limit).drop(columns='Lines')
 
-    return pd.DataFrame(report)
 
-
-def get_all_incidents(data: pd.DataFrame, speed_limit: int) -> pd.DataFrame:
+def get_all_incidents(data: pd.DataFrame,
+                      speed_limit: int,
+                      n_jobs: int = 1,
+                      executor: Executor = None) -> pd.DataFrame:
     """
     Get all speed incidents for all buses.
     Args:
         data: data regarding all buses activity
         speed_limit: maximum speed limit we treat as acceptable (km/hour).
+        n_jobs: number of worker processes lines are split between (1 - serial)
+        executor: executor lines are split between (overrides n_jobs)
 
     Returns:
-        All speed incidents in the format based on _report_incident
+        All speed incidents (Lines, Speed, Lat, Lon, Time columns)
     """
     validate_if_contains_columns(data, ['Lines', 'Brigade', 'Lon', 'Lat', 'Time'])
     validate_data_is_type(speed_limit, int)
-    data.sort_values(by='Time', ascending=True, inplace=True)
-    data.reset_index(drop=True, inplace=True)
-    report = pd.DataFrame(columns=['Lines', 'Speed', 'Lat', 'Lon', 'Time'])
+    if executor is None and n_jobs == 1:
+        return _find_speed_incidents(data, speed_limit)
 
-    for line in data['Lines'].unique():
-        per_line = get_all_of_line(data, line)
-        for brigade in per_line['Brigade'].unique():
-            per_brigade = get_all_of_brigade(per_line, brigade)
-            incidents = get_speed_incidents_for_bus(per_brigade, speed_limit)
-            if len(incidents) > 0:
-                incidents['Lines'] = line
-                report = report.append(incidents)
+    in_time = data.iloc[np.argsort(data['Time'].to_numpy(), kind='mergesort')]
+    incidents = map_over_lines(_find_speed_incidents, in_time, n_jobs=n_jobs, executor=executor,
+                               speed_limit=speed_limit)
+    if not incidents:
+        return _find_speed_incidents(data, speed_limit)
+    return pd.concat(incidents, ignore_index=True)
 
-    return report.reset_index(drop=True)
+
+def iter_incidents(data: pd.DataFrame,
+                   speed_limit: int,
+                   chunk_size: int = DEFAULT_CHUNK_ROWS) -> Iterator[Tuple[str, str, pd.DataFrame]]:
+    """
+    Get speed incidents bus by bus, e.g. to stream very large reports to disk.
+    Buses are processed in chunks of at least chunk_size rows (whole buses), so only incidents
+    of a single chunk are kept in memory. Buses without incidents are skipped.
+    Args:
+        data: data regarding all buses activity
+        speed_limit: maximum speed limit we treat as acceptable (km/hour).
+        chunk_size: number of rows processed at once
+
+    Returns:
+        generator of (line, brigade, incidents) tuples, incidents in the format of
+        get_all_incidents, buses in the same order as in get_all_incidents
+    """
+    validate_if_contains_columns(data, ['Lines', 'Brigade', 'Lon', 'Lat', 'Time'])
+    validate_data_is_type(speed_limit, int)
+    validate_data_is_type(chunk_size, int)
+    if chunk_size <= 0:
+        raise ValueError('Chunk size must be positive.')
+
+    columns = _ordered_bus_columns(data)
+    bounds = _bus_bounds(columns['Lines'], columns['Brigade'])
+    starts = np.searchsorted(bounds, np.arange(0, bounds[-1], chunk_size), side='left')
+    chunk_bounds = np.unique(np.append(bounds[starts], bounds[-1]))
+    for start, stop in zip(chunk_bounds[:-1], chunk_bounds[1:]):
+        buses = bounds[(bounds >= start) & (bounds <= stop)] - start
+        idx, incidents = _incidents_of_ordered({k: v[start:stop] for k, v in columns.items()},
+                                               speed_limit)
+        splits = np.searchsorted(idx, buses, side='left')
+        for bus, (first, last) in enumerate(zip(splits[:-1], splits[1:])):
+            if last > first:
+                first_row = start + buses[bus]
+                yield (columns['Lines'][first_row], columns['Brigade'][first_row],
+                       pd.DataFrame({k: v[first:last] for k, v in incidents.items()},
+                                    columns=INCIDENT_COLUMNS))
 
 
 def get_short_incidents_summary(data: pd.DataFrame, speed_limit: int) -> Tuple[str, pd.DataFrame]:
@@ -123,15 +271,53 @@ def get_short_incidents_summary(data: pd.DataFrame, speed_limit: int) -> Tuple[s
     return summary, report
 
 
-def get_full_incidents_summary(data: pd.DataFrame, speed_limit: int) -> Tuple[str, pd.DataFrame]:
+def get_incidents_hotspots(incidents: pd.DataFrame,
+                           grid_size: int = DEFAULT_GRID_SIZE) -> pd.DataFrame:
+    """
+    Count incidents in cells of a regular grid spanning all incidents.
+    Args:
+        incidents: speed incidents (as returned by get_all_incidents)
+        grid_size: number of grid cells along latitude and along longitude
+
+    Returns:
+        data frame with Lat, Lon (cell centers) and Incidents columns for cells with incidents,
+        sorted by number of incidents
+    """
+    validate_if_contains_columns(incidents, ['Lat', 'Lon'])
+    validate_data_is_type(grid_size, int)
+    if grid_size <= 0:
+        raise ValueError('Grid size must be positive.')
+    if len(incidents) == 0:
+        return pd.DataFrame({'Lat': [], 'Lon': [], 'Incidents': np.array([], dtype=np.int64)})
+
+    lat_grid, lon_grid = _incidents_grid(incidents, grid_size)
+    cells = (_grid_index(incidents['Lat'].to_numpy(dtype=float), lat_grid) * grid_size
+             + _grid_index(incidents['Lon'].to_numpy(dtype=float), lon_grid))
+    counts = np.bincount(cells, minlength=grid_size ** 2)
+
+    occupied = np.flatnonzero(counts)
+    occupied = occupied[np.argsort(-counts[occupied], kind='mergesort')]
+    return pd.DataFrame({
+        'Lat': _grid_index_to_center_value(occupied // grid_size, lat_grid),
+        'Lon': _grid_index_to_center_value(occupied % grid_size, lon_grid),
+        'Incidents': counts[occupied]
+    })
+
+
+def get_full_incidents_summary(data: pd.DataFrame,
+                               speed_limit: int,
+                               grid_size: int = DEFAULT_GRID_SIZE) -> Tuple[str, pd.DataFrame]:
     """
     Get all incidents summary (short + top buses, top places).
     Args:
         data: data regarding all buses activity
         speed_limit: maximum speed limit we treat as acceptable (km/hour).
+        grid_size: number of grid cells along latitude and along longitude for top places
 
     Returns:
-        Human readable incidents long summary.
+        Human readable incidents long summary and mean incident position of every line with
+        its grid cell (Lat, Lon, Lat_grid, Lon_grid columns indexed by Lines). Places count
+        all incidents, their full table is returned by get_incidents_hotspots.
     """
     summary, report = get_short_incidents_summary(data, speed_limit)
     summary += 'Top 3 buses with highest number of incidents were:\n'
@@ -140,20 +326,9 @@ def get_full_incidents_summary(data: pd.DataFrame, speed_limit: int) -> Tuple[st
     top_3 = top_3.apply(lambda x: f'{x} incidents')
     summary += top_3.to_string() + '\n'
 
-    report = report.groupby(by='Lines')[['Lat', 'Lon']].mean()
-
-    lat_grid, lon_grid = _create_grid(min_lat=report['Lat'].min(), max_lat=report['Lat'].max(),
-                                      min_lon=report['Lon'].min(), max_lon=report['Lon'].max())
-
-    report['Lat_grid'] = _find_grid(report['Lat'], lat_grid)
-    report['Lon_grid'] = _find_grid(report['Lon'], lon_grid)
-
-    top_3 = report.groupby(by=['Lat_grid', 'Lon_grid']).count()\
-        .sort_values(by='Lat', ascending=False).head(3)
+    hotspots = get_incidents_hotspots(report, grid_size)
     summary += 'Top 3 places with highest number of incidents were:\n'
-    for (i, j), buses_count in top_3.iterrows():
-        lat = round(_grid_index_to_center_value(i, lat_grid), 2)
-        lon = round(_grid_index_to_center_value(j, lon_grid), 2)
-        summary += f'({lat}, {lon}) - {buses_count["Lat"]} incidents.\n'
+    for lat, lon, incidents in hotspots.head(3).itertuples(index=False):
+        summary += f'({round(lat, 2)}, {round(lon, 2)}) - {incidents} incidents.\n'
 
-    return summary, report
+    return summary, _lines_positions(report, grid_size)
@@ -0,0 +1,169 @@
+"""Extraction of stop visits (arrivals, departures, dwell times) from trajectories."""
+from typing import Tuple, Union
+import numpy as np
+import pandas as pd
+
+from bwaw.insights.data import build_trajectories
+from bwaw.insights.math_ops import METERS_IN_KM, _proximity_to_tolerance
+from bwaw.insights.spatial import BusStopIndex
+from bwaw.utils.metrics import increment, timed
+from bwaw.utils.validation import validate_data_is_type, validate_if_contains_columns
+
+DEFAULT_PROXIMITY = 20
+DEFAULT_MAX_SEGMENT = 1000
+STOP_EVENT_COLUMNS = ['Lines', 'Brigade', 'VehicleNumber', 'Trajectory', 'ID', 'Number',
+                      'Arrival', 'Departure', 'Dwell', 'Distance']
+REQUIRED_COLUMNS = ['Lines', 'Brigade', 'VehicleNumber', 'Time', 'Lat', 'Lon']
+
+
+def _segment_candidates(lat: np.ndarray, lon: np.ndarray, segments: np.ndarray,
+                        half_length: np.ndarray, stops_index: BusStopIndex,
+                        tolerance: float) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Finds stops which may be within tolerance of segments between consecutive pings.
+    Segments are queried around their midpoints, grouped by search radius rounded up to
+    multiples of tolerance, so short segments (the vast majority) share one narrow query.
+    Args:
+        lat: latitudes of pings
+        lon: longitudes of pings
+        segments: positions of pings starting segments (each ends at the next ping)
+        half_length: half lengths of segments (in km)
+        stops_index: index of bus stops coordinates
+        tolerance: proximity error (in km)
+
+    Returns:
+        (tuple): positions in segments and positions of stops of candidate pairs
+    """
+    step = max(tolerance, 1e-3)
+    bins = np.ceil((half_length + tolerance) / step).astype(np.int64)
+    order = np.argsort(bins, kind='mergesort')
+    bounds = np.flatnonzero(np.diff(bins[order])) + 1
+    mid_lat = (lat[segments] + lat[segments + 1]) / 2
+    mid_lon = (lon[segments] + lon[segments + 1]) / 2
+
+    found_segments, found_stops = [], []
+    for members in np.split(order, bounds):
+        if len(members) == 0:
+            continue
+        points, stops, _ = stops_index.query(mid_lat[members], mid_lon[members],
+                                             bins[members[0]] * step)
+        found_segments.append(members[points])
+        found_stops.append(stops)
+    if not found_segments:
+        empty = np.array([], dtype=np.int64)
+        return empty, empty
+    return np.concatenate(found_segments), np.concatenate(found_stops)
+
+
+def _empty_stop_events() -> pd.DataFrame:
+    return pd.DataFrame(columns=STOP_EVENT_COLUMNS).astype({
+        'Arrival': 'datetime64[ns]', 'Departure': 'datetime64[ns]',
+        'Dwell': np.float64, 'Distance': np.float64})
+
+
+# pylint: disable=too-many-locals
+@timed('insights_seconds')
+def get_stop_events(data: pd.DataFrame,
+                    stops_coordinates: Union[pd.DataFrame, BusStopIndex],
+                    proximity: int = DEFAULT_PROXIMITY,
+                    max_segment: int = DEFAULT_MAX_SEGMENT) -> pd.DataFrame:
+    """
+    Generate one record per visit of a vehicle at a bus stop.
+    Vehicle is assumed to move linearly between consecutive pings of its trajectory, so
+    a stop is visited when the segment between pings passes within proximity of it, even if
+    no ping was sent nearby. Arrival and departure are interpolated moments of entering and
+    leaving the proximity circle, and consecutive segments near the same stop (a bus idling
+    at a stop) make a single visit. Segments longer than max_segment (GPS errors) are skipped.
+    Args:
+        data: trajectories (as returned by build_trajectories) or data regarding buses
+            activity, which is split into trajectories first
+        stops_coordinates: array of bus stops coordinates or index built from it
+        proximity: proximity error regarding closeness between bus and a bus stop (in meters)
+        max_segment: maximum distance between consecutive pings (in meters)
+
+    Returns:
+        data frame with Lines, Brigade, VehicleNumber, Trajectory, bus stop ID and Number,
+        Arrival and Departure times, Dwell time (in seconds) and minimum Distance to the stop
+        (in meters), ordered by trajectory and arrival
+    """
+    validate_data_is_type(data, pd.DataFrame)
+    validate_if_contains_columns(data, REQUIRED_COLUMNS)
+    validate_data_is_type(stops_coordinates, (pd.DataFrame, BusStopIndex))
+    validate_data_is_type(proximity, int)
+    validate_data_is_type(max_segment, int)
+    if max_segment <= 0:
+        raise ValueError('Maximum segment length must be positive.')
+    tolerance = _proximity_to_tolerance(proximity)
+    if isinstance(stops_coordinates, pd.DataFrame):
+        stops_coordinates = BusStopIndex(stops_coordinates)
+    if 'Trajectory' not in data.columns:
+        data = build_trajectories(data)
+
+    lat = data['Lat'].to_numpy(dtype=np.float64)
+    lon = data['Lon'].to_numpy(dtype=np.float64)
+    time = pd.to_datetime(data['Time']).to_numpy(dtype='datetime64[ns]').view(np.int64)
+    trajectory = data['Trajectory'].to_numpy()
+    pos_x, pos_y = stops_coordinates.project(lat, lon)
+
+    segments = np.flatnonzero(trajectory[1:] == trajectory[:-1])
+    d_x, d_y = pos_x[segments + 1] - pos_x[segments], pos_y[segments + 1] - pos_y[segments]
+    length = np.hypot(d_x, d_y)
+    short = length <= max_segment / METERS_IN_KM
+    segments, d_x, d_y, length = segments[short], d_x[short], d_y[short], length[short]
+    candidates, stops = _segment_candidates(lat, lon, segments, length / 2, stops_coordinates,
+                                            tolerance)
+    increment('insights_rows', len(data), function='get_stop_events')
+    increment('insights_candidates', len(candidates), function='get_stop_events')
+    if len(candidates) == 0:
+        return _empty_stop_events()
+
+    stop_x, stop_y = stops_coordinates.project(stops_coordinates.latitude[stops],
+                                               stops_coordinates.longitude[stops])
+    start = segments[candidates]
+    d_x, d_y, length = d_x[candidates], d_y[candidates], length[candidates]
+    f_x, f_y = pos_x[start] - stop_x, pos_y[start] - stop_y
+    length2 = np.maximum(length ** 2, 1e-18)
+    projection = f_x * d_x + f_y * d_y
+    closest = np.clip(-projection / length2, 0., 1.)
+    distance = np.hypot(f_x + closest * d_x, f_y + closest * d_y)
+    near = distance <= tolerance
+    if not near.any():
+        return _empty_stop_events()
+    start, stops = start[near], stops[near]
+    projection, length2, distance = projection[near], length2[near], distance[near]
+    radicand = projection ** 2 - length2 * (f_x[near] ** 2 + f_y[near] ** 2 - tolerance ** 2)
+    root = np.sqrt(np.maximum(radicand, 0.))
+    enter = np.clip((-projection - root) / length2, 0., 1.)
+    leave = np.clip((-projection + root) / length2, 0., 1.)
+    duration = time[start + 1] - time[start]
+    arrival = time[start] + np.round(enter * duration).astype(np.int64)
+    departure = time[start] + np.round(leave * duration).astype(np.int64)
+
+    order = np.lexsort((start, stops))
+    start, stops = start[order], stops[order]
+    arrival, departure, distance = arrival[order], departure[order], distance[order]
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = (stops[1:] != stops[:-1]) | (start[1:] != start[:-1] + 1)
+    visits = np.flatnonzero(first)
+
+    start, stops = start[visits], stops[visits]
+    arrival = np.minimum.reduceat(arrival, visits)
+    departure = np.maximum.reduceat(departure, visits)
+    distance = np.minimum.reduceat(distance, visits)
+    order = np.lexsort((arrival, trajectory[start]))
+    start, stops = start[order], stops[order]
+    arrival, departure, distance = arrival[order], departure[order], distance[order]
+
+    events = {name: data[name].iloc[start].reset_index(drop=True)
+              for name in ['Lines', 'Brigade', 'VehicleNumber', 'Trajectory']}
+    events.update({
+        'ID': stops_coordinates.stops['ID'].to_numpy()[stops],
+        'Number': stops_coordinates.stops['Number'].to_numpy()[stops],
+        'Arrival': arrival.view('datetime64[ns]'),
+        'Departure': departure.view('datetime64[ns]'),
+        'Dwell': (departure - arrival) / 10 ** 9,
+        'Distance': distance * METERS_IN_KM
+    })
+    increment('insights_matches', len(visits), function='get_stop_events')
+    return pd.DataFrame(events)
+# pylint: enable=too-many-locals
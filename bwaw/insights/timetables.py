@@ -0,0 +1,134 @@
+"""Timetables store shared by punctuality computations."""
+from collections import OrderedDict
+from typing import Callable, Dict, Tuple, Union
+import numpy as np
+import pandas as pd
+
+from bwaw.utils.format_conversion import column_time_to_seconds
+from bwaw.utils.metrics import increment
+from bwaw.utils.validation import validate_data_is_type, validate_if_contains_columns
+
+DEFAULT_MAX_BYTES = 64 * 2 ** 20
+ENTRY_OVERHEAD_BYTES = 64
+SECONDS_IN_DAY = 24 * 60 * 60
+
+TimetableKey = Tuple[str, str, str]
+
+
+def _departure_seconds(times: pd.Series) -> np.ndarray:
+    """
+    Converts departure times of timetable to seconds from midnight.
+    Args:
+        times: departure times (HH:MM:SS, hours can exceed 23 after midnight)
+
+    Returns:
+        array of seconds from midnight (int64)
+    """
+    return column_time_to_seconds(times.astype(str)) % SECONDS_IN_DAY
+
+
+def _parse_timetable(timetable: pd.DataFrame) -> Dict[str, np.ndarray]:
+    """
+    Parses timetable into departures per brigade.
+    Args:
+        timetable: timetable of line on bus stop (Brigade, Time columns)
+
+    Returns:
+        dict, for each brigade sorted departure times (int64 seconds from midnight)
+    """
+    validate_if_contains_columns(timetable, ['Brigade', 'Time'])
+    brigades = timetable['Brigade'].astype(str).to_numpy()
+    seconds = _departure_seconds(timetable['Time'])
+
+    order = np.lexsort((seconds, brigades))
+    brigades, seconds = brigades[order], seconds[order]
+    bounds = np.flatnonzero(brigades[1:] != brigades[:-1]) + 1
+    return {brigade[0]: departures for brigade, departures
+            in zip(np.split(brigades, bounds), np.split(seconds, bounds)) if len(brigade)}
+
+
+def _entry_size(entry: Union[Dict[str, np.ndarray], ValueError]) -> int:
+    if isinstance(entry, ValueError):
+        return ENTRY_OVERHEAD_BYTES
+    return sum(ENTRY_OVERHEAD_BYTES + len(k) + v.nbytes for k, v in entry.items())
+
+
+class TimetableStore:
+    """
+    LRU cache of parsed timetables keyed by (bus stop id, bus stop nr, line).
+
+    Each timetable is loaded and parsed once and kept as sorted int64 seconds from midnight
+    per brigade. Least recently used timetables are evicted when the store exceeds
+    max_bytes. Timetables that could not be loaded (ValueError) are remembered as well,
+    so missing timetables are not requested again. Worker processes of map_over_lines get
+    a copy of the store each; as partitions hold whole lines and timetables are keyed by
+    line, no timetable is loaded by two partitions, but the copies are not merged back.
+    """
+
+    def __init__(self, loader: Callable[[str, str, str], pd.DataFrame],
+                 max_bytes: int = DEFAULT_MAX_BYTES):
+        """
+        Args:
+            loader: function returning timetable for (bus stop id, bus stop nr, line)
+            max_bytes: memory cap for stored timetables (in bytes)
+        """
+        if not callable(loader):
+            raise TypeError('Loader must be callable.')
+        validate_data_is_type(max_bytes, int)
+        if max_bytes <= 0:
+            raise ValueError('Memory cap must be positive.')
+
+        self.loader = loader
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: TimetableKey) -> bool:
+        return key in self._entries
+
+    def _insert(self, key: TimetableKey, entry: Union[Dict[str, np.ndarray], ValueError]) -> None:
+        self._entries[key] = entry
+        self.nbytes += _entry_size(entry)
+        while self.nbytes > self.max_bytes and len(self._entries) > 1:
+            _, evicted = self._entries.popitem(last=False)
+            self.nbytes -= _entry_size(evicted)
+
+    def get(self, bus_stop_id: str, bus_stop_nr: str, line: str) -> Dict[str, np.ndarray]:
+        """
+        Get timetable of line on bus stop, loading it on first use.
+        Args:
+            bus_stop_id: bus stop identifier
+            bus_stop_nr: bus stop number (eg. 01, 02, etc.)
+            line: bus line number
+
+        Returns:
+            dict, for each brigade sorted departure times (int64 seconds from midnight)
+        """
+        key = (bus_stop_id, bus_stop_nr, line)
+        if key in self._entries:
+            self.hits += 1
+            increment('timetable_hits')
+            self._entries.move_to_end(key)
+            entry = self._entries[key]
+        else:
+            self.misses += 1
+            increment('timetable_misses')
+            try:
+                entry = _parse_timetable(self.loader(bus_stop_id, bus_stop_nr, line))
+            except ValueError as err:
+                entry = err
+            self._insert(key, entry)
+
+        if isinstance(entry, ValueError):
+            raise ValueError(*entry.args)
+        return entry
+
+    def clear(self) -> None:
+        """Remove all stored timetables."""
+        self._entries.clear()
+        self.nbytes = 0
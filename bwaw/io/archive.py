@@ -0,0 +1,254 @@
+"""Append-only archive of active buses data partitioned by day."""
+import json
+from pathlib import Path
+from typing import Dict, Iterator, List, Tuple, Union
+import numpy as np
+import pandas as pd
+
+from bwaw.io.columnar import _to_typed_frame
+from bwaw.utils.validation import (validate_data_is_type, validate_if_contains_columns,
+                                   validate_matches_time_format)
+
+CODE_COLUMNS = ['Lines', 'Brigade', 'VehicleNumber']
+VALUE_COLUMNS = {'Lat': np.float64, 'Lon': np.float64, 'Time': np.int64}
+ARCHIVE_COLUMNS = ['Lines', 'Brigade', 'VehicleNumber', 'Lat', 'Lon', 'Time']
+CODE_DTYPE = np.int32
+DICTIONARY_FILE = 'dictionary.json'
+INDEX_FILE = 'index.jsonl'
+
+Timestamp = Union[str, pd.Timestamp]
+
+
+def _to_timestamp(time: Timestamp) -> pd.Timestamp:
+    if isinstance(time, pd.Timestamp):
+        return time
+    validate_data_is_type(time, str)
+    validate_matches_time_format(time)
+    return pd.Timestamp(time)
+
+
+def _column_dtype(name: str) -> np.dtype:
+    return np.dtype(VALUE_COLUMNS.get(name, CODE_DTYPE))
+
+
+def _decoding(dictionary: List[str]) -> np.ndarray:
+    """Values of codes of dictionary, code -1 (missing value) decoded as None."""
+    return np.asarray(dictionary + [None], dtype=object)
+
+
+class GpsArchive:
+    """
+    Multi-day archive of active buses data stored as append-only column files.
+
+    Every day is a separate partition directory with one raw file per column (codes for
+    Lines, Brigade and VehicleNumber, floats for Lat/Lon and int64 nanoseconds for Time).
+    Each appended chunk is ordered by (Lines, Brigade, Time) and a sidecar index records
+    its time span and row ranges of every (line, brigade), so queries memory-map the columns
+    and slice only the matching rows. A chunk is committed once its index line is written.
+    Indexes are read once per instance, so chunks appended by other instances are seen after
+    the archive is reopened.
+    """
+
+    def __init__(self, path: Union[Path, str]):
+        """
+        Opens existing archive or creates new one.
+        Args:
+            path: root directory of the archive
+        """
+        validate_data_is_type(path, (Path, str))
+        self.path = Path(path) if isinstance(path, str) else path
+        self.path.mkdir(exist_ok=True, parents=True)
+        self._indexes = {}
+
+    def __len__(self) -> int:
+        return sum(self._committed_rows(day) for day in self.days())
+
+    def days(self) -> List[str]:
+        """
+        Days stored in the archive.
+
+        Returns:
+            sorted list of days (YYYY-MM-DD)
+        """
+        return sorted(i.name for i in self.path.iterdir() if (i / INDEX_FILE).exists())
+
+    def _index(self, day: str) -> List[Dict]:
+        if day not in self._indexes:
+            with (self.path / day / INDEX_FILE).open() as file:
+                self._indexes[day] = [json.loads(line) for line in file if line.endswith('\n')]
+        return self._indexes[day]
+
+    def _dictionary(self, day: str) -> Dict[str, List[str]]:
+        path = self.path / day / DICTIONARY_FILE
+        if path.exists():
+            return json.loads(path.read_text())
+        return {name: [] for name in CODE_COLUMNS}
+
+    def _committed_rows(self, day: str) -> int:
+        index = self._index(day) if (self.path / day / INDEX_FILE).exists() else []
+        return index[-1]['rows'][1] if index else 0
+
+    def append(self, data: pd.DataFrame) -> None:
+        """
+        Appends active buses data to the archive.
+        Args:
+            data: data regarding buses activity
+        """
+        validate_data_is_type(data, pd.DataFrame)
+        validate_if_contains_columns(data, ARCHIVE_COLUMNS)
+        data = _to_typed_frame(data[ARCHIVE_COLUMNS])
+        for day, chunk in data.groupby(data['Time'].dt.normalize(), sort=True):
+            self._append_chunk(day.strftime('%Y-%m-%d'), chunk)
+
+    def _append_chunk(self, day: str, chunk: pd.DataFrame) -> None:
+        partition = self.path / day
+        partition.mkdir(exist_ok=True)
+        first_row = self._committed_rows(day)
+
+        dictionary = self._dictionary(day)
+        codes = {}
+        for name in CODE_COLUMNS:
+            positions = {value: code for code, value in enumerate(dictionary[name])}
+            for value in chunk[name].cat.categories:
+                if value not in positions:
+                    positions[value] = len(dictionary[name])
+                    dictionary[name].append(value)
+            mapping = np.array([positions[i] for i in chunk[name].cat.categories] + [-1],
+                               dtype=CODE_DTYPE)
+            codes[name] = mapping[chunk[name].cat.codes.to_numpy()]
+
+        time = chunk['Time'].to_numpy(dtype='datetime64[ns]').view(np.int64)
+        order = np.lexsort((time, codes['Brigade'], codes['Lines']))
+        columns = {name: codes[name][order] for name in CODE_COLUMNS}
+        columns.update({name: chunk[name].to_numpy(dtype=dtype)[order]
+                        for name, dtype in VALUE_COLUMNS.items() if name != 'Time'})
+        columns['Time'] = time[order]
+
+        for name, values in columns.items():
+            with (partition / f'{name}.bin').open('ab') as file:
+                file.truncate(first_row * _column_dtype(name).itemsize)
+                values.tofile(file)
+        (partition / DICTIONARY_FILE).write_text(json.dumps(dictionary))
+
+        lines, brigades = columns['Lines'], columns['Brigade']
+        line_values = _decoding(dictionary['Lines'])
+        brigade_values = _decoding(dictionary['Brigade'])
+        bounds = np.concatenate(([0], np.flatnonzero((lines[1:] != lines[:-1])
+                                                     | (brigades[1:] != brigades[:-1])) + 1,
+                                 [len(lines)]))
+        groups = [[line_values[lines[i]], brigade_values[brigades[i]],
+                   first_row + int(i), first_row + int(j)] for i, j in zip(bounds[:-1], bounds[1:])]
+        record = {'rows': [first_row, first_row + len(chunk)],
+                  'time': [int(time.min()), int(time.max())], 'groups': groups}
+        with (partition / INDEX_FILE).open('a') as file:
+            file.write(json.dumps(record) + '\n')
+        self._indexes.pop(day, None)
+
+    def _read_rows(self, day: str, ranges: List[Tuple[int, int]]) -> pd.DataFrame:
+        """
+        Reads rows ranges of a partition, slicing memory-mapped columns.
+        Args:
+            day: partition day
+            ranges: list of (first row, row after last) ranges
+
+        Returns:
+            data frame with ARCHIVE_COLUMNS
+        """
+        ranges = [(i, j) for i, j in ranges if j > i]
+        if not ranges:
+            return pd.DataFrame({'Lines': [], 'Brigade': [], 'VehicleNumber': [],
+                                 'Lat': np.array([], dtype=np.float64),
+                                 'Lon': np.array([], dtype=np.float64),
+                                 'Time': np.array([], dtype='datetime64[ns]')},
+                                columns=ARCHIVE_COLUMNS)
+        rows = self._committed_rows(day)
+        dictionary = self._dictionary(day)
+        columns = {}
+        for name in ARCHIVE_COLUMNS:
+            column = np.memmap(self.path / day / f'{name}.bin', dtype=_column_dtype(name),
+                               mode='r', shape=(rows,))
+            values = np.concatenate([column[i:j] for i, j in ranges])
+            if name in CODE_COLUMNS:
+                values = _decoding(dictionary[name])[values]
+            columns[name] = values
+        columns['Time'] = columns['Time'].view('datetime64[ns]')
+        return pd.DataFrame(columns)
+
+    def _days_between(self, start: Timestamp = None, end: Timestamp = None) -> Iterator[str]:
+        for day in self.days():
+            if start is not None and day < start.strftime('%Y-%m-%d'):
+                continue
+            if end is not None and day > end.strftime('%Y-%m-%d'):
+                continue
+            yield day
+
+    def _query(self, line: str = None, brigade: str = None,
+               start: Timestamp = None, end: Timestamp = None) -> pd.DataFrame:
+        start = None if start is None else _to_timestamp(start)
+        end = None if end is None else _to_timestamp(end)
+        parts = []
+        for day in self._days_between(start, end):
+            ranges = []
+            for chunk in self._index(day):
+                if (start is not None and chunk['time'][1] < start.value) \
+                        or (end is not None and chunk['time'][0] > end.value):
+                    continue
+                if line is None and brigade is None:
+                    ranges.append(tuple(chunk['rows']))
+                    continue
+                ranges.extend((i, j) for chunk_line, chunk_brigade, i, j in chunk['groups']
+                              if (line is None or chunk_line == line)
+                              and (brigade is None or chunk_brigade == brigade))
+            parts.append(self._read_rows(day, ranges))
+
+        data = pd.concat(parts, ignore_index=True) if parts else self._read_rows('', [])
+        if start is not None:
+            data = data[data['Time'] >= start]
+        if end is not None:
+            data = data[data['Time'] <= end]
+        return data.sort_values(by='Time', kind='mergesort').reset_index(drop=True)
+
+    def get_all_of_line(self, line: str,
+                        start: Timestamp = None, end: Timestamp = None) -> pd.DataFrame:
+        """
+        Restrict archive to chosen line.
+        Args:
+            line: chosen line
+            start: optional start time
+            end: optional end time
+
+        Returns:
+            restricted dataset sorted by time.
+        """
+        validate_data_is_type(line, str)
+        return self._query(line=line, start=start, end=end)
+
+    def get_all_of_brigade(self, brigade: str, line: str = None,
+                           start: Timestamp = None, end: Timestamp = None) -> pd.DataFrame:
+        """
+        Restrict archive to chosen brigade (of chosen line).
+        Args:
+            brigade: chosen brigade
+            line: optional chosen line
+            start: optional start time
+            end: optional end time
+
+        Returns:
+            restricted dataset sorted by time.
+        """
+        validate_data_is_type(brigade, str)
+        if line is not None:
+            validate_data_is_type(line, str)
+        return self._query(line=line, brigade=brigade, start=start, end=end)
+
+    def get_all_of_time(self, start: Timestamp, end: Timestamp) -> pd.DataFrame:
+        """
+        Restrict archive to dates between start and end.
+        Args:
+            start: start time
+            end: end time
+
+        Returns:
+            restricted dataset sorted by time.
+        """
+        return self._query(start=start, end=end)
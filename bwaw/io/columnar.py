@@ -0,0 +1,183 @@
+"""Typed columnar layout of responses shared by columnar save/load utils."""
+import json
+from pathlib import Path
+from typing import Dict, List, Tuple, Union
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow  # pylint: disable=unused-import
+except ImportError:
+    pyarrow = None
+
+META_FILE = 'meta.json'
+CATEGORICAL_COLUMNS = ['Lines', 'Brigade', 'VehicleNumber']
+FLOAT_COLUMNS = ['Lat', 'Lon']
+TIME_COLUMNS = ['Time']
+PARQUET_SUFFIX = '.parquet'
+COLUMNS_SUFFIX = '.cols'
+
+Timestamp = Union[str, pd.Timestamp]
+
+
+def _validate_parquet_available() -> None:
+    if pyarrow is None:
+        raise ImportError('Parquet format requires pyarrow. Install it or use .cols suffix.')
+
+
+def _to_category(column: pd.Series) -> pd.Series:
+    """
+    Converts column to categorical with text categories, keeping missing values missing.
+    Args:
+        column: column to be converted
+
+    Returns:
+        categorical column
+    """
+    column = column.astype('category')
+    if not pd.api.types.is_string_dtype(column.cat.categories):
+        column = column.cat.rename_categories(str)
+    return column
+
+
+def _to_typed_frame(data: pd.DataFrame) -> pd.DataFrame:
+    """
+    Converts response data frame to typed columns.
+    Lines, Brigade and VehicleNumber (and other text columns) become categoricals (missing
+    values stay NaN), Lat and Lon floats and Time datetime.
+    Args:
+        data: response data frame
+
+    Returns:
+        typed data frame sorted by time (if time is available)
+    """
+    typed = {}
+    for name in data.columns:
+        column = data[name]
+        if name in TIME_COLUMNS or pd.api.types.is_datetime64_any_dtype(column.dtype):
+            typed[name] = pd.to_datetime(column)
+        elif name in FLOAT_COLUMNS:
+            typed[name] = column.astype(np.float64)
+        elif name in CATEGORICAL_COLUMNS or not pd.api.types.is_numeric_dtype(column.dtype):
+            typed[name] = _to_category(column)
+        else:
+            typed[name] = column
+    typed = pd.DataFrame(typed)
+    if 'Time' in typed.columns:
+        typed = typed.sort_values(by='Time', kind='mergesort')
+    return typed.reset_index(drop=True)
+
+
+def _column_to_array(column: pd.Series) -> Tuple[np.ndarray, Dict]:
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        return (column.cat.codes.to_numpy().astype(np.int32),
+                {'kind': 'category', 'categories': [str(i) for i in column.cat.categories]})
+    if pd.api.types.is_datetime64_any_dtype(column.dtype):
+        return column.to_numpy(dtype='datetime64[ns]').view(np.int64), {'kind': 'time'}
+    return column.to_numpy(), {'kind': 'numeric'}
+
+
+def _array_to_column(array: np.ndarray, meta: Dict) -> Union[pd.Categorical, np.ndarray]:
+    if meta['kind'] == 'category':
+        return pd.Categorical.from_codes(array, categories=meta['categories'])
+    if meta['kind'] == 'time':
+        return np.asarray(array).view('datetime64[ns]')
+    return np.asarray(array)
+
+
+def _write_columns(data: pd.DataFrame, path: Path) -> None:
+    """
+    Writes typed data frame as directory of .npy columns with metadata.
+    Args:
+        data: typed data frame
+        path: directory where data is stored
+    """
+    path.mkdir(exist_ok=True, parents=True)
+    meta = {'rows': len(data), 'sorted_by': 'Time' if 'Time' in data.columns else None,
+            'columns': {}}
+    for position, name in enumerate(data.columns):
+        array, meta['columns'][name] = _column_to_array(data[name])
+        meta['columns'][name]['file'] = f'{position}.npy'
+        np.save(path / meta['columns'][name]['file'], array)
+    (path / META_FILE).write_text(json.dumps(meta))
+
+
+def _time_bounds(time: np.ndarray, start: Timestamp, end: Timestamp) -> Tuple[int, int]:
+    """
+    Finds rows range between start and end in sorted time column.
+    Args:
+        time: sorted time column (int64 ns)
+        start: start time (None for no lower bound)
+        end: end time (None for no upper bound)
+
+    Returns:
+        (tuple): first row and row after the last one in range
+    """
+    lower = 0 if start is None else np.searchsorted(time, pd.Timestamp(start).value, side='left')
+    upper = len(time) if end is None else np.searchsorted(time, pd.Timestamp(end).value,
+                                                          side='right')
+    return int(lower), int(max(upper, lower))
+
+
+def _read_columns(path: Path,
+                  columns: List[str] = None,
+                  start: Timestamp = None,
+                  end: Timestamp = None,
+                  lines: List[str] = None) -> pd.DataFrame:
+    """
+    Reads projected columns of rows matching time range and lines from directory of columns.
+    Columns are memory-mapped, so only the required parts are read from disk.
+    Args:
+        path: directory where data is stored
+        columns: columns to read (all if None)
+        start: start time (inclusive)
+        end: end time (inclusive)
+        lines: lines to read (all if None)
+
+    Returns:
+        restricted dataset
+    """
+    meta = json.loads((path / META_FILE).read_text())
+    columns = list(meta['columns']) if columns is None else columns
+    required = columns + (['Time'] if start is not None or end is not None else []) \
+        + (['Lines'] if lines is not None else [])
+    for name in required:
+        if name not in meta['columns']:
+            raise ValueError(f'Data does not contain {name} column.')
+
+    def load(name):
+        return np.load(path / meta['columns'][name]['file'], mmap_mode='r')
+
+    lower, upper = 0, meta['rows']
+    if start is not None or end is not None:
+        lower, upper = _time_bounds(load('Time'), start, end)
+    rows = slice(lower, upper)
+    if lines is not None:
+        categories = meta['columns']['Lines']['categories']
+        codes = [categories.index(str(i)) for i in lines if str(i) in categories]
+        rows = lower + np.flatnonzero(np.isin(load('Lines')[lower:upper], codes))
+
+    return pd.DataFrame({name: _array_to_column(np.array(load(name)[rows]), meta['columns'][name])
+                         for name in columns})
+
+
+def _write_parquet(data: pd.DataFrame, path: Path) -> None:
+    _validate_parquet_available()
+    path.parent.mkdir(exist_ok=True, parents=True)
+    data.to_parquet(path, index=False)
+
+
+def _read_parquet(path: Path,
+                  columns: List[str] = None,
+                  start: Timestamp = None,
+                  end: Timestamp = None,
+                  lines: List[str] = None) -> pd.DataFrame:
+    _validate_parquet_available()
+    filters = []
+    if start is not None:
+        filters.append(('Time', '>=', pd.Timestamp(start)))
+    if end is not None:
+        filters.append(('Time', '<=', pd.Timestamp(end)))
+    if lines is not None:
+        filters.append(('Lines', 'in', [str(i) for i in lines]))
+    return pd.read_parquet(path, columns=columns, filters=filters or None)
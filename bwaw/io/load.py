@@ -1,13 +1,16 @@
 """Loading utils."""
 import pickle
 from pathlib import Path
-from typing import Union
+from typing import List, Tuple, Union
 import pandas as pd
+from bwaw.io.columnar import _read_columns, _read_parquet, PARQUET_SUFFIX, COLUMNS_SUFFIX
+from bwaw.io.save import _record_io
 from bwaw.utils.format_conversion import convert_response_list_to_dataframe
+from bwaw.utils.metrics import timer
 from bwaw.utils.validation import validate_data_is_type
 
 
-def _validate_load_parameters(path: Union[Path, str], suffix: str) -> None:
+def _validate_load_parameters(path: Union[Path, str], suffix: Union[str, Tuple]) -> None:
     """
     Validates typical parameters for load function in bwaw library.
     Args:
@@ -26,7 +29,11 @@ def load_response_from_csv(path: Union[Path, str]) -> pd.DataFrame:
         path: path where data is stored
     """
     _validate_load_parameters(path, '.csv')
-    return pd.read_csv(path, dtype=str)
+    path = Path(path) if isinstance(path, str) else path
+    with timer('io_seconds', operation='load', format=path.suffix):
+        data = pd.read_csv(path, dtype=str)
+    _record_io('load', path, len(data))
+    return data
 
 
 def load_response_from_pickle(path: Union[Path, str]) -> pd.DataFrame:
@@ -37,8 +44,40 @@ def load_response_from_pickle(path: Union[Path, str]) -> pd.DataFrame:
     """
     _validate_load_parameters(path, '.pkl')
     path = Path(path) if isinstance(path, str) else path
-    with path.open('rb') as input_file:
-        data = pickle.load(input_file)
-    if isinstance(data, list):
-        data = convert_response_list_to_dataframe(data)
+    with timer('io_seconds', operation='load', format=path.suffix):
+        with path.open('rb') as input_file:
+            data = pickle.load(input_file)
+        if isinstance(data, list):
+            data = convert_response_list_to_dataframe(data)
+    _record_io('load', path, len(data))
+    return data
+
+
+def load_response_from_columnar(path: Union[Path, str],
+                                columns: List[str] = None,
+                                start: Union[str, pd.Timestamp] = None,
+                                end: Union[str, pd.Timestamp] = None,
+                                lines: List[str] = None) -> pd.DataFrame:
+    """
+    Load response from typed columnar format (.parquet file or .cols directory) into dataframe.
+    Only the requested columns and rows are read.
+    Args:
+        path: path where data is stored
+        columns: columns to load (all if None)
+        start: load only rows not earlier than start
+        end: load only rows not later than end
+        lines: load only rows of given lines
+    """
+    _validate_load_parameters(path, (PARQUET_SUFFIX, COLUMNS_SUFFIX))
+    if columns is not None:
+        validate_data_is_type(columns, list)
+    if lines is not None:
+        validate_data_is_type(lines, list)
+    path = Path(path) if isinstance(path, str) else path
+    with timer('io_seconds', operation='load', format=path.suffix):
+        if path.suffix == PARQUET_SUFFIX:
+            data = _read_parquet(path, columns=columns, start=start, end=end, lines=lines)
+        else:
+            data = _read_columns(path, columns=columns, start=start, end=end, lines=lines)
+    _record_io('load', path, len(data))
     return data
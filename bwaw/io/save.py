@@ -1,14 +1,17 @@
 """Saving utils."""
 import pickle
 from pathlib import Path
-from typing import List, Union
+from typing import List, Tuple, Union
 import pandas as pd
+from bwaw.io.columnar import (_to_typed_frame, _write_columns, _write_parquet,
+                              PARQUET_SUFFIX, COLUMNS_SUFFIX)
 from bwaw.utils.format_conversion import convert_response_list_to_dataframe
+from bwaw.utils.metrics import get_metrics_registry, increment, timer
 from bwaw.utils.validation import validate_data_is_type
 
 
 def _validate_save_parameters(data: Union[List, pd.DataFrame], path: Union[Path, str],
-                              suffix: str) -> None:
+                              suffix: Union[str, Tuple]) -> None:
     """
     Validates typical parameters for save function in bwaw library.
     Args:
@@ -22,6 +25,23 @@ def _validate_save_parameters(data: Union[List, pd.DataFrame], path: Union[Path,
         raise ValueError(f'Path must have {suffix} suffix.')
 
 
+def _record_io(operation: str, path: Path, rows: int) -> None:
+    """
+    Records number of rows and size of files of saved or loaded data in the active metrics
+    registry, if any.
+    Args:
+        operation: save or load
+        path: path where data is stored (file or directory)
+        rows: number of rows
+    """
+    if get_metrics_registry() is None:
+        return
+    files = [path] if path.is_file() else [file for file in path.rglob('*') if file.is_file()]
+    increment('io_rows', rows, operation=operation, format=path.suffix)
+    increment('io_bytes', sum(file.stat().st_size for file in files), operation=operation,
+              format=path.suffix)
+
+
 def save_response_to_csv(data: Union[List, pd.DataFrame], path: Union[Path, str]) -> None:
     """
     Save response list to .csv file.
@@ -34,7 +54,9 @@ def save_response_to_csv(data: Union[List, pd.DataFrame], path: Union[Path, str]
         data = convert_response_list_to_dataframe(data)
     path = Path(path) if isinstance(path, str) else path
     path.parent.mkdir(exist_ok=True, parents=True)
-    data.to_csv(path, index=False)
+    with timer('io_seconds', operation='save', format=path.suffix):
+        data.to_csv(path, index=False)
+    _record_io('save', path, len(data))
 
 
 def save_response_to_pickle(data: Union[List, pd.DataFrame], path: Union[Path, str]) -> None:
@@ -47,5 +69,30 @@ def save_response_to_pickle(data: Union[List, pd.DataFrame], path: Union[Path, s
     _validate_save_parameters(data, path, '.pkl')
     path = Path(path) if isinstance(path, str) else path
     path.parent.mkdir(exist_ok=True, parents=True)
-    with path.open('wb') as output_file:
-        pickle.dump(data, output_file)
+    with timer('io_seconds', operation='save', format=path.suffix):
+        with path.open('wb') as output_file:
+            pickle.dump(data, output_file)
+    _record_io('save', path, len(data))
+
+
+def save_response_to_columnar(data: Union[List, pd.DataFrame], path: Union[Path, str]) -> None:
+    """
+    Save response list to typed columnar format, sorted by time.
+    Lines, Brigade and VehicleNumber are stored as categoricals, Lat/Lon as floats and Time
+    as int64 nanoseconds. Path with .parquet suffix is stored as Parquet file (requires pyarrow),
+    path with .cols suffix as directory of NumPy columns which can be memory-mapped.
+    Args:
+        data: data in the format of response list (values or dicts)
+        path: path where to store data
+    """
+    _validate_save_parameters(data, path, (PARQUET_SUFFIX, COLUMNS_SUFFIX))
+    if isinstance(data, list):
+        data = convert_response_list_to_dataframe(data)
+    path = Path(path) if isinstance(path, str) else path
+    with timer('io_seconds', operation='save', format=path.suffix):
+        data = _to_typed_frame(data)
+        if path.suffix == PARQUET_SUFFIX:
+            _write_parquet(data, path)
+        else:
+            _write_columns(data, path)
+    _record_io('save', path, len(data))
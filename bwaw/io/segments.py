@@ -0,0 +1,137 @@
+"""Append-only storage of snapshots in JSON lines segments."""
+import json
+import os
+from pathlib import Path
+from typing import Any, Iterator, Union
+from bwaw.utils.validation import validate_data_is_type
+
+META_FILE = 'meta.json'
+SEGMENT_PATTERN = 'segment_*.jsonl'
+READ_BLOCK_BYTES = 2 ** 20
+
+
+def _segment_name(number: int) -> str:
+    return f'segment_{number:06d}.jsonl'
+
+
+def _committed_lines(path: Path) -> int:
+    """
+    Counts complete lines of segment, truncating partially written last line.
+    The last newline is searched backwards from the end of the file and lines are counted
+    block by block, so the segment is never loaded into memory at once.
+    Args:
+        path: path to segment
+
+    Returns:
+        number of committed snapshots in segment
+    """
+    with path.open('rb+') as file:
+        size = file.seek(0, os.SEEK_END)
+        committed = size
+        while committed > 0:
+            start = max(0, committed - READ_BLOCK_BYTES)
+            file.seek(start)
+            newline = file.read(committed - start).rfind(b'\n')
+            if newline >= 0:
+                committed = start + newline + 1
+                break
+            committed = start
+        if committed != size:
+            file.truncate(committed)
+
+        file.seek(0)
+        lines, remaining = 0, committed
+        while remaining > 0:
+            block = file.read(min(READ_BLOCK_BYTES, remaining))
+            lines += block.count(b'\n')
+            remaining -= len(block)
+    return lines
+
+
+class SegmentStore:
+    """
+    Directory of JSON lines segments, each holding at most segment_size snapshots.
+
+    Every appended snapshot is written as a single line and flushed, so a crashed collection
+    loses at most the snapshot being written. Only sealed segments precede the last one,
+    hence reopening the store reads just the last segment to resume.
+    """
+
+    def __init__(self, path: Union[Path, str], segment_size: int = 1000, durable: bool = False):
+        """
+        Opens existing store or creates new one.
+        Args:
+            path: directory of the store
+            segment_size: number of snapshots in a single segment (ignored for existing store)
+            durable: if every append should be synced to disk
+        """
+        validate_data_is_type(path, (Path, str))
+        validate_data_is_type(segment_size, int)
+        if segment_size <= 0:
+            raise ValueError('Segment size must be positive.')
+
+        self.path = Path(path) if isinstance(path, str) else path
+        self.path.mkdir(exist_ok=True, parents=True)
+        self.durable = durable
+        meta = self.path / META_FILE
+        if meta.exists():
+            segment_size = json.loads(meta.read_text())['segment_size']
+        else:
+            meta.write_text(json.dumps({'segment_size': segment_size}))
+        self.segment_size = segment_size
+
+        segments = sorted(self.path.glob(SEGMENT_PATTERN))
+        self._segment = len(segments) - 1 if segments else 0
+        self._in_segment = _committed_lines(segments[-1]) if segments else 0
+        self._file = None
+
+    def __len__(self) -> int:
+        return self._segment * self.segment_size + self._in_segment
+
+    def __iter__(self) -> Iterator[Any]:
+        for segment in sorted(self.path.glob(SEGMENT_PATTERN)):
+            with segment.open('rb') as file:
+                for line in file:
+                    if line.endswith(b'\n'):
+                        yield json.loads(line)
+
+    def __enter__(self) -> 'SegmentStore':
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def append(self, snapshot: Any) -> None:
+        """
+        Appends single snapshot to the store.
+        Args:
+            snapshot: JSON serializable snapshot
+        """
+        if self._in_segment == self.segment_size:
+            self.close()
+            self._segment += 1
+            self._in_segment = 0
+        if self._file is None:
+            self._file = (self.path / _segment_name(self._segment)).open('ab')
+
+        self._file.write(json.dumps(snapshot).encode() + b'\n')
+        self._file.flush()
+        if self.durable:
+            os.fsync(self._file.fileno())
+        self._in_segment += 1
+
+    def close(self) -> None:
+        """Closes currently written segment."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def clear(self) -> None:
+        """Removes the store with all its segments."""
+        self.close()
+        for segment in self.path.glob(SEGMENT_PATTERN):
+            segment.unlink()
+        (self.path / META_FILE).unlink(missing_ok=True)
+        if not any(self.path.iterdir()):
+            self.path.rmdir()
+        self._segment, self._in_segment = 0, 0
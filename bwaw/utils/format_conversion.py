@@ -1,7 +1,10 @@
 """Module with utilities for data types conversion."""
 from typing import List
+import numpy as np
 import pandas as pd
-from bwaw.utils.validation import (validate_data_is_type, validate_matches_time_format)
+from bwaw.utils.validation import validate_data_is_type, validate_column_matches_time_format
+
+SERVICE_TIME_FORMAT = '[0-9]{2}:[0-5][0-9]:[0-5][0-9]'
 
 
 def convert_response_list_to_dataframe(response_list: List) -> pd.DataFrame:
@@ -44,11 +47,26 @@ def column_str_to_datetime(column: pd.Series, time_only: bool = False) -> pd.Ser
     Returns:
         formatted column
     """
-    validate_data_is_type(column, pd.Series)
-    for string in column:
-        validate_matches_time_format(string)
+    validate_column_matches_time_format(column)
 
     if time_only:
         return pd.to_datetime(column, format='%H:%M:%S')
 
     return pd.to_datetime(column)
+
+
+def column_time_to_seconds(column: pd.Series) -> np.ndarray:
+    """
+    Convert string column containing time of service day (HH:MM:SS) to seconds.
+    Hours can exceed 23 for departures after midnight that belong to the previous service day.
+    Args:
+        column: given column
+
+    Returns:
+        array of seconds since the beginning of service day (int64)
+    """
+    validate_column_matches_time_format(column, SERVICE_TIME_FORMAT)
+    hours = column.str.slice(0, 2).to_numpy(dtype=np.int64)
+    minutes = column.str.slice(3, 5).to_numpy(dtype=np.int64)
+    seconds = column.str.slice(6, 8).to_numpy(dtype=np.int64)
+    return hours * 3600 + minutes * 60 + seconds
@@ -0,0 +1,337 @@
+"""Low-overhead timers and counters of bwaw hot paths."""
+import json
+import logging
+import os
+from functools import wraps
+from pathlib import Path
+from threading import Lock
+from time import perf_counter, time
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+from bwaw.utils.validation import validate_data_is_type
+
+DEFAULT_PREFIX = 'bwaw'
+COUNTER = 'counter'
+SUMMARY = 'summary'
+
+_ACTIVE_REGISTRY = None
+
+MetricKey = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+
+def _metric_key(name: str, labels: Dict) -> MetricKey:
+    return name, tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _escape_label_value(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class LoggingSink:
+    """Sink writing every metric as a single log line."""
+
+    def __init__(self, logger: logging.Logger = None, level: int = logging.INFO):
+        """
+        Args:
+            logger: logger to write to (logger of this module if None)
+            level: logging level of metrics lines
+        """
+        self.logger = logger or logging.getLogger(__name__)
+        self.level = level
+
+    def emit(self, metrics: List[Dict], timestamp: float) -> None:
+        """
+        Writes metrics snapshot.
+        Args:
+            metrics: snapshot of metrics (as returned by MetricsRegistry.snapshot)
+            timestamp: time of snapshot (seconds since epoch)
+        """
+        for metric in metrics:
+            labels = ','.join(f'{key}={value}' for key, value in metric['labels'].items())
+            values = ' '.join(f'{key}={metric[key]:g}' for key in ('count', 'sum', 'max')
+                              if key in metric)
+            self.logger.log(self.level, 'metric %s{%s} %s', metric['name'], labels, values)
+
+
+class JsonLinesSink:
+    """Sink appending every metric as a JSON line with time of snapshot."""
+
+    def __init__(self, path: Union[Path, str]):
+        """
+        Args:
+            path: path of .jsonl file
+        """
+        validate_data_is_type(path, (Path, str))
+        self.path = Path(path)
+
+    def emit(self, metrics: List[Dict], timestamp: float) -> None:
+        """
+        Writes metrics snapshot.
+        Args:
+            metrics: snapshot of metrics (as returned by MetricsRegistry.snapshot)
+            timestamp: time of snapshot (seconds since epoch)
+        """
+        self.path.parent.mkdir(exist_ok=True, parents=True)
+        with self.path.open('a') as output_file:
+            for metric in metrics:
+                output_file.write(json.dumps({'time': timestamp, **metric}) + '\n')
+
+
+class PrometheusTextSink:
+    """
+    Sink writing metrics in Prometheus text exposition format.
+
+    The file is replaced atomically on every flush, so it can be scraped by node exporter
+    textfile collector. Counters are exposed with _total suffix, summaries as _count and _sum
+    together with _max gauge. Samples of every metric family are written as one block.
+    """
+
+    def __init__(self, path: Union[Path, str], prefix: str = DEFAULT_PREFIX):
+        """
+        Args:
+            path: path of .prom file
+            prefix: prefix of metrics names
+        """
+        validate_data_is_type(path, (Path, str))
+        validate_data_is_type(prefix, str)
+        self.path = Path(path)
+        self.prefix = prefix
+
+    def _lines(self, metrics: List[Dict]) -> List[str]:
+        families = {}
+        for metric in metrics:
+            name = f"{self.prefix}_{metric['name']}" if self.prefix else metric['name']
+            labels = ','.join(f'{key}="{_escape_label_value(value)}"'
+                              for key, value in metric['labels'].items())
+            labels = f'{{{labels}}}' if labels else ''
+            if metric['type'] == COUNTER:
+                samples = [(f'{name}_total', COUNTER, f'{name}_total', metric['sum'])]
+            else:
+                samples = [(name, SUMMARY, f'{name}_count', metric['count']),
+                           (name, SUMMARY, f'{name}_sum', metric['sum']),
+                           (f'{name}_max', 'gauge', f'{name}_max', metric['max'])]
+            for family, kind, sample, value in samples:
+                families.setdefault((family, kind), []).append(f'{sample}{labels} {value:g}')
+
+        lines = []
+        for (family, kind), samples in families.items():
+            lines.append(f'# TYPE {family} {kind}')
+            lines.extend(samples)
+        return lines
+
+    def emit(self, metrics: List[Dict], timestamp: float) -> None:
+        """
+        Writes metrics snapshot.
+        Args:
+            metrics: snapshot of metrics (as returned by MetricsRegistry.snapshot)
+            timestamp: time of snapshot (seconds since epoch)
+        """
+        self.path.parent.mkdir(exist_ok=True, parents=True)
+        temporary = self.path.with_name(f'.{self.path.name}.tmp')
+        temporary.write_text('\n'.join(self._lines(metrics)) + '\n')
+        os.replace(temporary, self.path)
+
+
+class MetricsRegistry:
+    """
+    Thread-safe aggregation of counters and summaries (timers, sizes) keyed by name and labels.
+
+    Summaries keep number of observations, their sum and maximum, so the registry has
+    constant memory per metric regardless of number of observations. Metrics are cumulative
+    and written to sinks on flush. Metrics of worker processes (map_over_lines) are not
+    collected.
+    """
+
+    def __init__(self, sinks: List = None, clock: Callable[[], float] = None):
+        """
+        Args:
+            sinks: objects with emit(metrics, timestamp) method metrics are flushed to
+            clock: monotonic clock used by timers (time.perf_counter by default)
+        """
+        if sinks is not None:
+            validate_data_is_type(sinks, list)
+        self.sinks = sinks or []
+        self.clock = clock or perf_counter
+        self._counters = {}
+        self._summaries = {}
+        self._lock = Lock()
+
+    def increment(self, name: str, value: Union[int, float] = 1, **labels) -> None:
+        """
+        Adds value to counter.
+        Args:
+            name: metric name
+            value: value added
+            **labels: metric labels
+        """
+        key = _metric_key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name: str, value: Union[int, float], **labels) -> None:
+        """
+        Records observation (e.g. duration in seconds) in summary.
+        Args:
+            name: metric name
+            value: observed value
+            **labels: metric labels
+        """
+        key = _metric_key(name, labels)
+        with self._lock:
+            summary = self._summaries.get(key)
+            if summary is None:
+                self._summaries[key] = [1, value, value]
+            else:
+                summary[0] += 1
+                summary[1] += value
+                summary[2] = max(summary[2], value)
+
+    def snapshot(self) -> List[Dict]:
+        """
+        Current values of all metrics.
+
+        Returns:
+            list of dicts with name, labels, type (counter or summary), sum and, for summaries,
+            count and max, sorted by name and labels
+        """
+        with self._lock:
+            metrics = [{'name': name, 'labels': dict(labels), 'type': COUNTER, 'sum': value}
+                       for (name, labels), value in self._counters.items()]
+            metrics += [{'name': name, 'labels': dict(labels), 'type': SUMMARY, 'count': count,
+                         'sum': total, 'max': maximum}
+                        for (name, labels), (count, total, maximum) in self._summaries.items()]
+        return sorted(metrics, key=lambda metric: (metric['name'],
+                                                   sorted(metric['labels'].items())))
+
+    def flush(self) -> None:
+        """Writes current values of all metrics to every sink."""
+        metrics, timestamp = self.snapshot(), time()
+        for sink in self.sinks:
+            sink.emit(metrics, timestamp)
+
+    def reset(self) -> None:
+        """Removes all metrics."""
+        with self._lock:
+            self._counters.clear()
+            self._summaries.clear()
+
+
+class _Timer:
+    """Context manager recording duration of its block in summary."""
+
+    def __init__(self, registry: MetricsRegistry, name: str, labels: Dict):
+        self.registry = registry
+        self.name = name
+        self.labels = labels
+        self.start = None
+
+    def __enter__(self) -> '_Timer':
+        self.start = self.registry.clock()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.registry.observe(self.name, self.registry.clock() - self.start, **self.labels)
+
+
+class _NullTimer:
+    """Context manager doing nothing, used when metrics are disabled."""
+
+    def __enter__(self) -> '_NullTimer':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        pass
+
+
+_NULL_TIMER = _NullTimer()
+
+
+def increment(name: str, value: Union[int, float] = 1, **labels) -> None:
+    """
+    Adds value to counter of the active registry (does nothing if metrics are disabled).
+    Args:
+        name: metric name
+        value: value added
+        **labels: metric labels
+    """
+    registry = _ACTIVE_REGISTRY
+    if registry is not None:
+        registry.increment(name, value, **labels)
+
+
+def observe(name: str, value: Union[int, float], **labels) -> None:
+    """
+    Records observation in summary of the active registry (does nothing if metrics are
+    disabled).
+    Args:
+        name: metric name
+        value: observed value
+        **labels: metric labels
+    """
+    registry = _ACTIVE_REGISTRY
+    if registry is not None:
+        registry.observe(name, value, **labels)
+
+
+def timer(name: str, **labels) -> Union[_Timer, _NullTimer]:
+    """
+    Context manager recording duration of its block (in seconds) in the active registry.
+    Args:
+        name: metric name
+        **labels: metric labels
+
+    Returns:
+        timer, shared no-op context manager if metrics are disabled
+    """
+    registry = _ACTIVE_REGISTRY
+    if registry is None:
+        return _NULL_TIMER
+    return _Timer(registry, name, labels)
+
+
+def timed(name: str) -> Callable[[Callable], Callable]:
+    """
+    Decorator recording duration of every call (in seconds) in the active registry.
+    Calls are labelled with function name. If metrics are disabled, the only overhead is
+    a single lookup of the active registry.
+    Args:
+        name: metric name
+
+    Returns:
+        decorator
+    """
+    def decorator(func: Callable) -> Callable:
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            registry = _ACTIVE_REGISTRY
+            if registry is None:
+                return func(*args, **kwargs)
+            start = registry.clock()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                registry.observe(name, registry.clock() - start, function=func.__name__)
+        return wrapper
+    return decorator
+
+
+def set_metrics_registry(registry: Optional[MetricsRegistry]) -> None:
+    """
+    Plug registry into instrumented hot paths of bwaw (None disables metrics).
+    Args:
+        registry: shared metrics registry
+    """
+    global _ACTIVE_REGISTRY  # pylint: disable=global-statement
+    if registry is not None:
+        validate_data_is_type(registry, MetricsRegistry)
+    _ACTIVE_REGISTRY = registry
+
+
+def get_metrics_registry() -> Optional[MetricsRegistry]:
+    """
+    Get registry plugged into instrumented hot paths of bwaw.
+
+    Returns:
+        active registry or None
+    """
+    return _ACTIVE_REGISTRY
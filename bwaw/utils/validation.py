@@ -4,6 +4,10 @@ from typing import Any, List, Type, Union, Tuple
 import pandas as pd
 import numpy as np
 
+DATE_FORMAT = '[0-9]{4}(-[0-9]{2}){2}'
+TIME_FORMAT = '([0-9]{2}:){2}[0-9]{2}'
+MAX_REPORTED_ROWS = 10
+
 
 def validate_data_is_type(data: Any, dtype: Union[Type, Tuple]) -> None:
     """
@@ -57,11 +61,35 @@ def validate_matches_time_format(data: str) -> None:
         data: data to check
     """
     validate_data_is_type(data, str)
-    date_format = '[0-9]{4}(-[0-9]{2}){2}'
-    time_format = '([0-9]{2}:){2}[0-9]{2}'
-    is_match = any([re.match(date_format, data),
-                    re.match(time_format, data),
-                    re.match(f'{date_format} {time_format}', data)])
+    is_match = any([re.match(DATE_FORMAT, data),
+                    re.match(TIME_FORMAT, data),
+                    re.match(f'{DATE_FORMAT} {TIME_FORMAT}', data)])
 
     if not is_match:
         raise ValueError('String is not time.')
+
+
+def validate_column_matches_time_format(column: pd.Series, pattern: str = None) -> None:
+    """
+    Validate if all strings in column are of data format accepted by bwaw.
+    Whole column is checked at once, the error lists positions of mismatched rows.
+    Args:
+        column: column to check
+        pattern: regular expression rows must fully match (formats accepted by
+            validate_matches_time_format if None)
+    """
+    validate_data_is_type(column, pd.Series)
+    if len(column) == 0:
+        return
+    if pd.api.types.infer_dtype(column, skipna=False) != 'string':
+        raise TypeError('Data must be of type str.')
+    if pattern is None:
+        matched = column.str.fullmatch(
+            f'{DATE_FORMAT}|{TIME_FORMAT}|{DATE_FORMAT} {TIME_FORMAT}')
+    else:
+        matched = column.str.fullmatch(pattern)
+    invalid = np.flatnonzero(~matched.to_numpy(dtype=bool))
+    if len(invalid) > 0:
+        shown = ', '.join(str(i) for i in invalid[:MAX_REPORTED_ROWS])
+        more = '...' if len(invalid) > MAX_REPORTED_ROWS else ''
+        raise ValueError(f'Strings are not time in {len(invalid)} rows: {shown}{more}.')
@@ -17,6 +17,11 @@ setup(
                       'pytest==6.2.2',
                       'pytest-mock==3.5.1'
                       ],
+    extras_require={
+        'parquet': ['pyarrow>=3.0.0'],
+        'fast-json': ['orjson>=3.4.0'],
+        'async': ['aiohttp>=3.7.0']
+    },
 
     classifiers=[
         'Development Status :: 3 - Alpha',
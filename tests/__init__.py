@@ -0,0 +1,22 @@
+"""Helpers shared by bwaw tests."""
+
+
+class FakeClock:
+    """Manually advanced clock, advanced also by sleeping and (by step) by every reading."""
+
+    def __init__(self, now=100., step=0.):
+        self.now = now
+        self.step = step
+        self.sleeps = []
+
+    def __call__(self):
+        now = self.now
+        self.now += self.step
+        return now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+    async def sleep_async(self, seconds):
+        self.sleep(seconds)
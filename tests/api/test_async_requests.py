@@ -0,0 +1,195 @@
+"""Tests for async_requests module."""
+import asyncio
+import json
+from urllib import error, parse
+
+import pytest
+
+pytest.importorskip('aiohttp')
+# pylint: disable=wrong-import-position
+
+from bwaw.api import RESOURCE_ID
+from bwaw.api.async_requests import (AsyncSession, get_active_buses, get_active_buses_over_time,
+                                     get_bus_stops_ids_by_name, get_all_lines_on_bus_stop,
+                                     get_timetable_for_line_on_bus_stop,
+                                     get_bus_stops_coordinates)
+from bwaw.api.throttling import RequestThrottle, set_request_throttle
+
+API_KEY = 'secret'
+RECORD = {'Lines': '213', 'Lon': 21.0921481, 'VehicleNumber': '1001',
+          'Time': '2021-02-09 15:45:27', 'Lat': 52.224536, 'Brigade': '2'}
+COORDINATES = {'result': [{'values': [{'value': '1001', 'key': 'zespol'},
+                                      {'value': '01', 'key': 'slupek'},
+                                      {'value': '52.248455', 'key': 'szer_geo'},
+                                      {'value': '21.044827', 'key': 'dlug_geo'},
+                                      {'value': 'al.Zieleniecka', 'key': 'kierunek'},
+                                      {'value': '2020-10-12 00:00:00.0',
+                                       'key': 'obowiazuje_od'}]}]}
+RESPONSES = {
+    RESOURCE_ID.BUSES_ACTIVE: {'result': [RECORD]},
+    RESOURCE_ID.BUS_STOP_BY_NAME: {'result': [{'values': [{'value': '7009', 'key': 'zespol'}]}]},
+    RESOURCE_ID.BUSES_ON_STOP: {'result': [{'values': [{'value': '138', 'key': 'linia'}]}]},
+    RESOURCE_ID.TIMETABLE_FOR_LINE: {'result': [{'values': [
+        {'value': '010', 'key': 'brygada'}, {'value': 'Utrata', 'key': 'kierunek'},
+        {'value': '24:39:00', 'key': 'czas'}]}]},
+    RESOURCE_ID.BUS_STOP_COORDINATE: COORDINATES
+}
+
+
+class _StubServer:
+    """Local HTTP/1.1 server answering like UMWaw API."""
+
+    def __init__(self, delay=0.):
+        self.delay = delay
+        self.connections = 0
+        self.requests = 0
+        self._server = None
+
+    async def _handle(self, reader, writer):
+        self.connections += 1
+        while True:
+            request_line = await reader.readline()
+            if not request_line:
+                break
+            while (await reader.readline()) not in (b'\r\n', b''):
+                pass
+            self.requests += 1
+            query = dict(parse.parse_qsl(parse.urlsplit(request_line.split()[1].decode()).query))
+            resource = query.get('resource_id', query.get('id'))
+            await asyncio.sleep(self.delay)
+            if query.get('apikey') != API_KEY:
+                body, status = json.dumps({'result': 'false', 'error': 'Wrong key'}), '200 OK'
+            elif resource in RESPONSES:
+                body, status = json.dumps(RESPONSES[resource]), '200 OK'
+            else:
+                body, status = '{}', '404 Not Found'
+            half = len(body) // 2
+            writer.write((f'HTTP/1.1 {status}\r\nTransfer-Encoding: chunked\r\n\r\n'
+                          f'{half:x}\r\n{body[:half]}\r\n{len(body) - half:x}\r\n'
+                          f'{body[half:]}\r\n0\r\n\r\n').encode())
+            await writer.drain()
+        writer.close()
+
+    async def __aenter__(self):
+        self._server = await asyncio.start_server(self._handle, '127.0.0.1', 0)
+        port = self._server.sockets[0].getsockname()[1]
+        return f'http://127.0.0.1:{port}/api/action/'
+
+    async def __aexit__(self, *args):
+        self._server.close()
+        await self._server.wait_closed()
+
+
+@pytest.fixture(name='stub')
+def fixture_stub(mocker):
+    """Runs coroutine against stub server with requests routed to it."""
+    def run(test, delay=0.):
+        async def main():
+            server = _StubServer(delay)
+            async with server as url:
+                mocker.patch('bwaw.api.requests._create_request.__defaults__', (url,))
+                mocker.patch('bwaw.api.requests._create_timetable_request.__defaults__', (url,))
+                await test()
+            return server
+        return asyncio.run(main())
+    return run
+
+
+def test_async_session(stub):
+    """Test for bwaw.api.async_requests.AsyncSession"""
+    with pytest.raises(TypeError):
+        AsyncSession(pool_size='2')
+
+    with pytest.raises(ValueError):
+        AsyncSession(timeout=0)
+
+    async def pooled():
+        async with AsyncSession(pool_size=2) as session:
+            results = await asyncio.gather(*[get_all_lines_on_bus_stop(
+                API_KEY, '7009', '01', session=session) for _ in range(10)])
+        assert results == [['138']] * 10
+    server = stub(pooled)
+    assert server.requests == 10 and server.connections == 2
+
+    session = AsyncSession()
+
+    async def reused():
+        async with session:
+            assert await get_all_lines_on_bus_stop(API_KEY, '7009', '01',
+                                                   session=session) == ['138']
+    for _ in range(2):
+        assert stub(reused).connections == 1
+
+    async def timed_out():
+        async with AsyncSession(timeout=0.05) as session:
+            with pytest.raises(error.URLError):
+                await get_bus_stops_ids_by_name(API_KEY, 'Banacha', session=session)
+            assert await get_bus_stops_ids_by_name(API_KEY, 'Banacha', session=session,
+                                                   timeout=1.) == ['7009']
+    stub(timed_out, delay=0.1)
+
+
+def test_get_active_buses(stub):
+    """Test for bwaw.api.async_requests.get_active_buses"""
+    async def test():
+        with pytest.raises(error.HTTPError):
+            await get_active_buses('wrong')
+        assert await get_active_buses(API_KEY) == [RECORD]
+        frame = await get_active_buses(API_KEY, as_dataframe=True)
+        assert list(frame['Lines']) == ['213']
+
+        throttle = RequestThrottle(api_keys=[API_KEY])
+        set_request_throttle(throttle)
+        try:
+            first, second = await asyncio.gather(get_active_buses('wrong'),
+                                                 get_active_buses('wrong'))
+        finally:
+            set_request_throttle(None)
+        assert first == second == [RECORD] and first is not second
+        assert throttle.stats['requests'] == 1 and throttle.stats['coalesced'] == 1
+    stub(test)
+
+
+def test_get_active_buses_over_time(stub):
+    """Test for bwaw.api.async_requests.get_active_buses_over_time"""
+    async def test():
+        with pytest.raises(ValueError):
+            await get_active_buses_over_time(API_KEY, no_of_requests=0)
+        assert await get_active_buses_over_time(API_KEY, no_of_requests=3,
+                                                interval_btwn_requests=0.0001) == [RECORD] * 3
+    server = stub(test)
+    assert server.connections == 1
+
+
+def test_get_bus_stops_ids_by_name(stub):
+    """Test for bwaw.api.async_requests.get_bus_stops_ids_by_name"""
+    async def test():
+        with pytest.raises(TypeError):
+            await get_bus_stops_ids_by_name(API_KEY, 1)
+        assert await get_bus_stops_ids_by_name(API_KEY, 'Banacha') == ['7009']
+    stub(test)
+
+
+def test_get_all_lines_on_bus_stop(stub):
+    """Test for bwaw.api.async_requests.get_all_lines_on_bus_stop"""
+    async def test():
+        assert await get_all_lines_on_bus_stop(API_KEY, '7009', '01') == ['138']
+    stub(test)
+
+
+def test_get_timetable_for_line_on_bus_stop(stub):
+    """Test for bwaw.api.async_requests.get_timetable_for_line_on_bus_stop"""
+    async def test():
+        assert await get_timetable_for_line_on_bus_stop(API_KEY, '7009', '01', '138') == [
+            {'Brigade': '010', 'Destination': 'Utrata', 'Time': '00:39:00'}]
+    stub(test)
+
+
+def test_get_bus_stops_coordinates(stub):
+    """Test for bwaw.api.async_requests.get_bus_stops_coordinates"""
+    async def test():
+        coordinates = await get_bus_stops_coordinates(API_KEY)
+        assert coordinates[0]['Latitude'] == '52.248455'
+        frame = await get_bus_stops_coordinates(API_KEY, as_dataframe=True)
+        assert frame['Latitude'].tolist() == [52.248455]
+    stub(test)
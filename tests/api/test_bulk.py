@@ -0,0 +1,86 @@
+"""Tests for bulk module."""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+from urllib import parse
+import json
+
+import pytest
+
+from bwaw.api.bulk import download_timetables
+from bwaw.io.load import load_response_from_csv
+
+PROPER_API_KEY = "5fbe79ed-1f5b-4019-ab03-641443842d8b"
+TIMETABLE_RESPONSE = {'result': [{'values': [{'value': '010', 'key': 'brygada'},
+                                             {'value': 'Utrata', 'key': 'kierunek'},
+                                             {'value': 'TD-7UTS', 'key': 'trasa'},
+                                             {'value': '24:39:00', 'key': 'czas'}]}]}
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """Serves timetable, fails once for stop 7002 and has no data for stop 0000."""
+        query = dict(parse.parse_qsl(parse.urlsplit(self.path).query))
+        self.server.requests.append(query)
+        if query['busstopId'] == '7002' and len(
+                [q for q in self.server.requests if q['busstopId'] == '7002']) == 1:
+            self.send_response(503)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        body = TIMETABLE_RESPONSE if query['busstopId'] != '0000' else {'result': []}
+        body = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):  # pylint: disable=arguments-differ
+        pass
+
+
+@pytest.fixture(name='stub_url')
+def fixture_stub_url():
+    """Local stub of UMWaw API."""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _StubHandler)
+    server.connections, server.requests = 0, []
+    thread = Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server, f'http://127.0.0.1:{server.server_address[1]}/api/action/'
+    server.shutdown()
+    server.server_close()
+
+
+def test_download_timetables(stub_url, tmp_path):
+    """Test for bwaw.api.bulk.download_timetables"""
+    server, url = stub_url
+    with pytest.raises(TypeError):
+        download_timetables(PROPER_API_KEY, ('7001', '01', '138'), tmp_path, api_url=url)
+
+    with pytest.raises(ValueError):
+        download_timetables(PROPER_API_KEY, [], tmp_path, max_workers=0, api_url=url)
+
+    keys = [(f'70{i:02d}', '01', '138') for i in range(1, 21)] + [('0000', '01', '138')]
+    stored, failed = download_timetables(PROPER_API_KEY, keys + keys[:2], tmp_path,
+                                         max_workers=4, connections_per_host=2,
+                                         backoff=0.01, api_url=url)
+
+    assert list(failed) == [('0000', '01', '138')]
+    assert isinstance(failed[('0000', '01', '138')], ValueError)
+    assert sorted(stored) == sorted(keys[:-1])
+    assert len(server.requests) == 22
+    assert server.connections <= 3
+
+    loaded = load_response_from_csv(tmp_path / 'timetable_7002_01_138.csv')
+    assert loaded.to_dict(orient='records') == [{'Brigade': '010', 'Destination': 'Utrata',
+                                                 'Time': '00:39:00'}]
+
+    stored, failed = download_timetables(PROPER_API_KEY, keys[:-1], tmp_path, api_url=url)
+    assert len(stored) == 20 and not failed
+    assert len(server.requests) == 22
@@ -0,0 +1,101 @@
+"""Tests for cache module."""
+import json
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from unittest import mock
+import pytest
+from bwaw.api import RESOURCE_ID
+from bwaw.api.cache import ResponseCache, set_response_cache, get_response_cache
+from bwaw.api.download import _get_resource_from_request
+from bwaw.api.requests import _create_request
+from tests import FakeClock
+
+URL = 'https://api.um.warszawa.pl/api/action/dbstore_get'
+STOPS_URL = f'{URL}/?id={RESOURCE_ID.BUS_STOP_COORDINATE}&apikey=secret'
+RESPONSE = {'result': [{'values': [{'value': '1001', 'key': 'zespol'},
+                                   {'value': '2020-10-12 00:00:00.0', 'key': 'obowiazuje_od'}]}]}
+
+
+def test_response_cache(tmp_path):
+    """Test for bwaw.api.cache.ResponseCache"""
+    with pytest.raises(TypeError):
+        ResponseCache(path=1)
+
+    with pytest.raises(ValueError):
+        ResponseCache(max_entries=0)
+
+    clock = FakeClock(1e9)
+    cache = ResponseCache(tmp_path, ttls={RESOURCE_ID.BUS_STOP_COORDINATE: 100}, clock=clock)
+    assert cache.is_cacheable(STOPS_URL)
+    assert not cache.is_cacheable(f'{URL}/?id={RESOURCE_ID.BUS_STOP_BY_NAME}')
+    assert cache.get(STOPS_URL) is None
+    cache.put(STOPS_URL, RESPONSE)
+    cache.put(f'{URL}/?id={RESOURCE_ID.BUS_STOP_BY_NAME}', RESPONSE)
+    assert len(cache) == 1
+    hit = cache.get(f'{URL}?apikey=other&id={RESOURCE_ID.BUS_STOP_COORDINATE}')
+    assert hit == RESPONSE
+    hit['result'].clear()
+    assert cache.get(STOPS_URL) == RESPONSE
+    assert 'secret' not in ''.join(file.read_text() for file in tmp_path.glob('*.json'))
+
+    restored = ResponseCache(tmp_path, ttls={RESOURCE_ID.BUS_STOP_COORDINATE: 100}, clock=clock)
+    assert restored.get(STOPS_URL) == RESPONSE
+    assert restored.stats['disk_hits'] == 1
+    clock.now += 100
+    assert cache.get(STOPS_URL) is None
+    assert cache.stats == {'hits': 2, 'disk_hits': 0, 'misses': 2, 'stores': 1, 'entries': 0,
+                           'hit_ratio': pytest.approx(1 / 2)}
+
+    valid_from = datetime.fromtimestamp(clock.now + 10).strftime('%Y-%m-%d %H:%M:%S.0')
+    upcoming = {'result': [{'values': [{'value': valid_from, 'key': 'obowiazuje_od'}]}]}
+    cache.put(STOPS_URL, upcoming)
+    clock.now += 5
+    assert cache.get(STOPS_URL) == upcoming
+    clock.now += 5
+    assert cache.get(STOPS_URL) is None
+
+    cache.clear()
+    assert len(cache) == 0 and not list(tmp_path.glob('*.json'))
+
+    small = ResponseCache(max_entries=1, clock=clock)
+    small.put(STOPS_URL, RESPONSE)
+    small.put(f'{URL}/?id={RESOURCE_ID.BUS_STOP_BY_NAME}', RESPONSE)
+    assert len(small) == 1 and small.get(STOPS_URL) is None
+
+    shared = ResponseCache(tmp_path, ttls={RESOURCE_ID.BUS_STOP_COORDINATE: 100}, max_entries=4,
+                           clock=clock)
+
+    def hammer(worker):
+        for step in range(200):
+            url = f'{STOPS_URL}&nr={(worker + step) % 8}'
+            if shared.get(url) is None:
+                shared.put(url, RESPONSE)
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(hammer, range(8)))
+    stats = shared.stats
+    assert stats['hits'] + stats['misses'] == 8 * 200
+    assert stats['stores'] == stats['misses'] and stats['entries'] == len(shared) == 4
+    assert not list(tmp_path.glob('*.tmp'))
+
+
+def test_set_response_cache():
+    """Test for bwaw.api.cache.set_response_cache"""
+    with pytest.raises(TypeError):
+        set_response_cache('cache')
+
+    cache = ResponseCache()
+    set_response_cache(cache)
+    try:
+        assert get_response_cache() is cache
+        req = _create_request('dbstore_get', {'id': RESOURCE_ID.BUS_STOP_COORDINATE,
+                                                       'apikey': 'secret'})
+        reply = mock.MagicMock()
+        reply.__enter__.return_value.read.return_value = json.dumps(RESPONSE).encode()
+        with mock.patch('bwaw.api.download.request.urlopen', return_value=reply) as urlopen:
+            assert _get_resource_from_request(req) == RESPONSE
+            assert _get_resource_from_request(req) == RESPONSE
+            assert urlopen.call_count == 1
+    finally:
+        set_response_cache(None)
+    assert get_response_cache() is None
@@ -4,7 +4,8 @@ from urllib import error
 import pytest
 
 from bwaw.api.requests import (get_active_buses, get_active_buses_over_time,
-                               get_bus_stops_ids_by_name, get_all_lines_on_bus_stop,
+                               stream_active_buses_over_time, get_bus_stops_ids_by_name,
+                               get_all_lines_on_bus_stop,
                                get_timetable_for_line_on_bus_stop, get_bus_stops_coordinates)
 
 
@@ -34,6 +35,17 @@ def test_get_active_buses_over_time(mocker):
     assert get_active_buses_over_time(PROPER_API_KEY,
                                       keep_partial_if_fail=False) == 2 * response_list
 
+    record = {'Lines': '213', 'Lon': 21.0921481, 'VehicleNumber': '1001',
+              'Time': '2021-02-09 15:45:27', 'Lat': 52.224536, 'Brigade': '2'}
+    mocker.patch('bwaw.api.requests._get_resource_over_time',
+                 return_value=[{'result': [record]}, {'result': [dict(record, Lines='138')]}])
+    output = get_active_buses_over_time(PROPER_API_KEY, as_dataframe=True)
+    assert list(output.columns) == list(record)
+    assert list(output['Lines']) == ['213', '138']
+    assert output['Lines'].cat.categories.tolist() == ['213', '138']
+    assert output['Time'].dtype == 'datetime64[ns]'
+    assert output['Lat'].tolist() == [52.224536, 52.224536]
+
 
 def test_get_bus_stops_ids_by_name(mocker):
     """Test for bwaw.api.requests.get_bus_stops_ids_by_name"""
@@ -113,3 +125,32 @@ def test_get_bus_stops_coordinates(mocker):
 
     mocker.patch('bwaw.api.requests._get_resource_from_request', return_value=response)
     assert get_bus_stops_coordinates(PROPER_API_KEY) == formatted_response
+
+    response['result'][0]['values'].reverse()
+    assert get_bus_stops_coordinates(PROPER_API_KEY) == formatted_response
+    frame = get_bus_stops_coordinates(PROPER_API_KEY, as_dataframe=True)
+    assert frame['Latitude'].dtype == float
+    assert frame.astype(str).to_dict('records') == formatted_response
+
+
+def test_stream_active_buses_over_time(mocker, tmp_path):
+    """Test for bwaw.api.requests.stream_active_buses_over_time"""
+    with pytest.raises(TypeError):
+        next(stream_active_buses_over_time(PROPER_API_KEY, 5))
+
+    responses = [{'result': [i]} for i in range(4)]
+    mocker.patch('bwaw.api.scheduling.sleep')
+    mocker.patch('bwaw.api.download._get_resource_from_request',
+                 side_effect=responses[:2] + [error.URLError('timeout')] * 3)
+    stream = stream_active_buses_over_time(PROPER_API_KEY, tmp_path, no_of_requests=4)
+    assert [next(stream), next(stream)] == [[0], [1]]
+    with pytest.raises(RuntimeError):
+        next(stream)
+
+    mocker.patch('bwaw.api.download._get_resource_from_request', side_effect=responses[2:])
+    assert list(stream_active_buses_over_time(PROPER_API_KEY, tmp_path,
+                                              no_of_requests=4)) == [[0], [1], [2], [3]]
+    assert list(stream_active_buses_over_time(PROPER_API_KEY, tmp_path, no_of_requests=4,
+                                              replay=False)) == []
+    assert list(stream_active_buses_over_time(PROPER_API_KEY, tmp_path, no_of_requests=2,
+                                              replay=False)) == []
@@ -0,0 +1,37 @@
+"""Tests for scheduling module."""
+import pytest
+from bwaw.api.scheduling import FixedRateScheduler
+from tests import FakeClock
+
+
+def test_fixed_rate_scheduler():
+    """Test for bwaw.api.scheduling.FixedRateScheduler"""
+    with pytest.raises(TypeError):
+        FixedRateScheduler('10')
+
+    with pytest.raises(ValueError):
+        FixedRateScheduler(0)
+
+    clock = FakeClock()
+    scheduler = FixedRateScheduler(10., clock=clock, sleeper=clock.sleep)
+    assert scheduler.wait() == 0
+    clock.now += 3.
+    assert scheduler.wait() == 1
+    assert clock.sleeps == [7.]
+    clock.now += 25.
+    assert scheduler.wait() == 3
+    assert scheduler.wait() == 4
+    assert clock.sleeps == [7., 5.]
+    assert scheduler.stats == {'ticks': 4, 'skipped': 1, 'jitter_mean': 1.25,
+                               'jitter_std': pytest.approx(2.1650635), 'jitter_max': 5.}
+
+
+def test_fixed_rate_scheduler_alignment():
+    """Test for bwaw.api.scheduling.FixedRateScheduler.start"""
+    clock = FakeClock()
+    scheduler = FixedRateScheduler(0.5, align_to_clock=True, clock=clock,
+                                   wall_clock=lambda: 1613.2, sleeper=clock.sleep)
+    scheduler.start(delay_first=True)
+    scheduler.wait()
+    scheduler.wait()
+    assert clock.sleeps == [pytest.approx(0.8), pytest.approx(0.5)]
@@ -0,0 +1,133 @@
+"""Tests for throttling module."""
+import asyncio
+import json
+import threading
+from unittest import mock
+from urllib import error
+import pytest
+from bwaw.api import RESOURCE_ID
+from bwaw.api.download import _get_resource_from_request
+from bwaw.api.requests import _create_request
+from bwaw.api.throttling import (TokenBucket, RequestThrottle, set_request_throttle,
+                                 get_request_throttle)
+from tests import FakeClock
+
+URL = 'https://api.um.warszawa.pl/api/action/busestrams_get/?resource_id=1&apikey='
+
+
+def _throttled(url):
+    raise error.HTTPError(url=url, code=429, msg='Too Many Requests', hdrs={}, fp=None)
+
+
+def test_token_bucket():
+    """Test for bwaw.api.throttling.TokenBucket"""
+    with pytest.raises(TypeError):
+        TokenBucket('1')
+
+    with pytest.raises(ValueError):
+        TokenBucket(1, capacity=0.5)
+
+    clock = FakeClock()
+    bucket = TokenBucket(2, capacity=2, clock=clock)
+    assert [bucket.reserve() for _ in range(4)] == [0., 0., 0.5, 1.]
+    assert bucket.delay() == 1.5
+    clock.now += 2.
+    assert bucket.delay() == 0.
+    bucket.drain()
+    assert bucket.reserve() == 0.5
+
+
+def test_request_throttle():
+    """Test for bwaw.api.throttling.RequestThrottle"""
+    with pytest.raises(ValueError):
+        RequestThrottle(api_keys=[])
+
+    with pytest.raises(ValueError):
+        RequestThrottle(retries=-1)
+
+    clock = FakeClock()
+    throttle = RequestThrottle(rate=1, api_keys=['a', 'b'], clock=clock, sleeper=clock.sleep)
+    sent = []
+    for _ in range(4):
+        throttle.fetch(f'{URL}x', lambda url: sent.append(url) or {'result': []})
+    assert [url[-1] for url in sent] == ['a', 'b', 'a', 'b']
+    assert clock.sleeps == [1.]
+
+    fetch = mock.Mock(side_effect=[error.HTTPError(URL, 429, 'Too Many Requests', {}, None),
+                                   {'result': [1]}])
+    assert throttle.fetch(f'{URL}x', fetch) == {'result': [1]}
+    with pytest.raises(error.HTTPError):
+        throttle.fetch(f'{URL}x', _throttled)
+    assert throttle.stats == {'requests': 9, 'queued': 4, 'coalesced': 0, 'throttled': 4}
+
+    started, release = threading.Event(), threading.Event()
+
+    def slow(url):
+        started.set()
+        release.wait()
+        return {'result': [url]}
+
+    throttle = RequestThrottle(rate=100)
+    results = []
+    leader = threading.Thread(target=lambda: results.append(throttle.fetch(f'{URL}a', slow)))
+    leader.start()
+    started.wait()
+    followers = [threading.Thread(target=lambda: results.append(throttle.fetch(f'{URL}b', slow)))
+                 for _ in range(3)]
+    for follower in followers:
+        follower.start()
+    while throttle.coalesced < 3:
+        threading.Event().wait(0.001)
+    release.set()
+    for thread in [leader] + followers:
+        thread.join()
+    assert results == [{'result': [f'{URL}a']}] * 4
+    assert len({id(result) for result in results}) == 4
+    assert throttle.stats == {'requests': 1, 'queued': 0, 'coalesced': 3, 'throttled': 0}
+
+    clock = FakeClock()
+    throttle = RequestThrottle(rate=1, api_keys=['a'], clock=clock, sleeper=clock.sleep,
+                               async_sleeper=clock.sleep_async)
+    calls = []
+
+    async def fetch_async(url):
+        calls.append(url)
+        await asyncio.sleep(0)
+        if len(calls) == 2:
+            _throttled(url)
+        return {'result': [url]}
+
+    async def fetch_all():
+        return await asyncio.gather(throttle.fetch_async(f'{URL}x', fetch_async),
+                                    throttle.fetch_async(f'{URL}x', fetch_async),
+                                    throttle.fetch_async(f'{URL}y&page=2', fetch_async))
+
+    first, second, third = asyncio.run(fetch_all())
+    assert first == second == {'result': [f'{URL}a']} and first is not second
+    first['result'].clear()
+    assert second == {'result': [f'{URL}a']}
+    assert third == {'result': [f'{URL}a&page=2']}
+    assert clock.sleeps == [1., 1.]
+    assert throttle.stats == {'requests': 3, 'queued': 2, 'coalesced': 1, 'throttled': 1}
+
+
+def test_set_request_throttle():
+    """Test for bwaw.api.throttling.set_request_throttle"""
+    with pytest.raises(TypeError):
+        set_request_throttle('throttle')
+
+    throttle = RequestThrottle(api_keys=['spread'])
+    set_request_throttle(throttle)
+    try:
+        assert get_request_throttle() is throttle
+        req = _create_request('busestrams_get', {'resource_id': RESOURCE_ID.BUSES_ACTIVE,
+                                                 'apikey': 'secret'})
+        reply = mock.MagicMock()
+        reply.__enter__.return_value.read.return_value = json.dumps({'result': []}).encode()
+        with mock.patch('bwaw.api.download.request.urlopen', return_value=reply) as urlopen:
+            assert _get_resource_from_request(req) == {'result': []}
+        assert 'apikey=spread' in urlopen.call_args[0][0].full_url
+        assert throttle.stats['requests'] == 1
+    finally:
+        set_request_throttle(None)
+    assert get_request_throttle() is None
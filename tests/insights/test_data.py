@@ -3,8 +3,8 @@ import pandas as pd
 import numpy as np
 import pytest
 
-from bwaw.insights.data import (get_all_of_line, get_all_of_time,
-                                get_all_of_brigade, remove_duplicates)
+from bwaw.insights.data import (_adjust_date, get_all_of_line, get_all_of_time,
+                                get_all_of_brigade, remove_duplicates, build_trajectories)
 
 
 def _test_numericals(proper_col_name, wrong_col_name, value, func):
@@ -69,3 +69,51 @@ def test_remove_duplicates():
         remove_duplicates(wrong_data)
 
     remove_duplicates(proper_data).equals(pd.DataFrame([[1, 2], [2, 1]], columns=['a', 'b']))
+
+
+def test_build_trajectories():
+    """Test for bwaw.insights.data.build_trajectories"""
+    with pytest.raises(TypeError):
+        build_trajectories([1, 2, 3])
+        build_trajectories(pd.DataFrame(columns=['VehicleNumber', 'Time', 'Lat', 'Lon']), 1.5)
+
+    with pytest.raises(ValueError):
+        build_trajectories(pd.DataFrame(columns=['VehicleNumber', 'Time']))
+
+    data = pd.DataFrame([
+        ['213', '1001', '2021-02-09 15:46:22', 52.22, 21.09, '2'],
+        ['213', '1001', '2021-02-09 15:45:27', 52.21, 21.08, '2'],
+        ['138', '1002', '2021-02-09 15:45:27', 52.23, 21.07, '5'],
+        ['213', '1001', '2021-02-09 15:46:22', 52.22, 21.09, '2'],
+        ['213', '1001', '2021-02-09 16:00:00', 52.25, 21.10, '2'],
+        ['114', '1001', '2021-02-09 16:00:20', 52.25, 21.11, '3']
+    ], columns=['Lines', 'VehicleNumber', 'Time', 'Lat', 'Lon', 'Brigade'])
+    output = build_trajectories(data)
+    assert len(output) == 5
+    assert output['Time'].dt.strftime('%H:%M:%S').tolist() == ['15:45:27', '15:46:22', '16:00:00',
+                                                              '16:00:20', '15:45:27']
+    assert output['Trajectory'].tolist() == [0, 0, 1, 2, 3]
+    assert output['Lines'].dtype == 'category'
+    assert build_trajectories(data, max_gap=3600)['Trajectory'].tolist() == [0, 0, 0, 1, 2]
+
+
+def test_adjust_date():
+    """Test for bwaw.insights.data._adjust_date"""
+    with pytest.raises(TypeError):
+        _adjust_date(pd.Series([1, 2]), pd.Timestamp('2021-02-09 04:00:00'))
+        _adjust_date(pd.Series(pd.to_datetime(['1900-01-01 12:00:00'])), '2021-02-09')
+
+    column = pd.Series(pd.to_datetime(['1900-01-01 23:59:00', '1900-01-01 00:30:00',
+                                       '1900-01-01 04:00:00']), index=[5, 3, 9])
+    output = _adjust_date(column, pd.Timestamp('2021-02-09 04:00:00'))
+    assert output.index.tolist() == [5, 3, 9]
+    assert output.dt.strftime('%Y-%m-%d %H:%M').tolist() == ['2021-02-09 23:59',
+                                                             '2021-02-10 00:30',
+                                                             '2021-02-09 04:00']
+
+    starts = pd.Series(pd.to_datetime(['2021-02-09 00:00:00', '2021-02-10 01:00:00',
+                                       '2021-02-11 05:00:00']), index=[5, 3, 9])
+    output = _adjust_date(column, starts)
+    assert output.dt.strftime('%Y-%m-%d %H:%M').tolist() == ['2021-02-09 23:59',
+                                                             '2021-02-11 00:30',
+                                                             '2021-02-12 04:00']
@@ -0,0 +1,61 @@
+"""Tests for headways module."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from bwaw.insights.headways import get_headways, get_headways_summary
+from bwaw.insights.timetables import TimetableStore
+
+EVENTS = pd.DataFrame({
+    'Lines': ['213'] * 4 + ['138'] * 2,
+    'Brigade': ['1', '2', '3', '4', '1', '2'],
+    'ID': ['1001'] * 6,
+    'Number': ['01'] * 6,
+    'Departure': pd.to_datetime(['2021-02-09 15:20:00', '2021-02-09 15:00:00',
+                                 '2021-02-09 15:10:00', '2021-02-09 15:11:00',
+                                 '2021-02-09 15:00:00', '2021-02-09 17:00:00'])
+})
+TIMETABLE = pd.DataFrame({'Brigade': ['1', '2', '3', '4'],
+                          'Time': ['14:50:00', '15:00:00', '15:10:00', '15:20:00']})
+
+
+def _loader(bus_stop_id, bus_stop_nr, line):
+    if line != '213':
+        raise ValueError('No timetable.')
+    return TIMETABLE
+
+
+def test_get_headways():
+    """Test for bwaw.insights.headways.get_headways"""
+    with pytest.raises(TypeError):
+        get_headways(EVENTS, bunching='0.5')
+
+    with pytest.raises(ValueError):
+        get_headways(EVENTS, bunching=2.)
+
+    output = get_headways(EVENTS)
+    assert output['Lines'].tolist() == ['138', '138', '213', '213', '213', '213']
+    assert output['Brigade'].tolist() == ['1', '2', '2', '3', '4', '1']
+    assert np.allclose(output['Headway'], [np.nan, np.nan, np.nan, 600, 60, 540], equal_nan=True)
+    assert output['Scheduled'].isna().all()
+    assert output['Bunched'].tolist() == [False, False, False, False, True, False]
+
+    output = get_headways(EVENTS, timetables=TimetableStore(_loader))
+    assert np.allclose(output['Scheduled'], [np.nan, np.nan, 600, 600, 600, 600],
+                       equal_nan=True)
+    assert output['Bunched'].tolist() == [False, False, False, False, True, False]
+
+
+def test_get_headways_summary():
+    """Test for bwaw.insights.headways.get_headways_summary"""
+    with pytest.raises(ValueError):
+        get_headways_summary(EVENTS)
+
+    headways = get_headways(EVENTS, timetables=TimetableStore(_loader))
+    output = get_headways_summary(headways)
+    assert output.index.tolist() == ['213']
+    assert output.loc['213', 'Count'] == 3
+    assert output.loc['213', 'Mean'] == pytest.approx(400 / 60)
+    assert output.loc['213', 'Scheduled'] == pytest.approx(10.)
+    assert output.loc['213', 'Bunching'] == pytest.approx(100 / 3)
+    assert get_headways_summary(headways, by_stop=True).index.tolist() == [('213', '1001', '01')]
@@ -0,0 +1,36 @@
+"""Tests for online module."""
+import pandas as pd
+import pytest
+
+from bwaw.insights.online import OnlineSpeedDetector
+from bwaw.insights.speed import get_all_incidents
+from tests.insights import ACTIVE_BUSES
+
+
+def test_online_speed_detector():
+    """Test for bwaw.insights.online.OnlineSpeedDetector"""
+    with pytest.raises(TypeError):
+        OnlineSpeedDetector(50.4)
+
+    with pytest.raises(ValueError):
+        OnlineSpeedDetector(50, max_age=0)
+
+    detector = OnlineSpeedDetector(10)
+    assert detector.update([]).empty
+    first, second = ACTIVE_BUSES.iloc[[0, 2]], ACTIVE_BUSES.iloc[[1, 3]]
+    assert detector.update(first).empty
+    assert len(detector) == 2 and ('213', '2') in detector
+
+    output = detector.update(second.to_dict('records'))
+    expected = get_all_incidents(ACTIVE_BUSES, 10)
+    pd.testing.assert_frame_equal(output.sort_values('Lines').reset_index(drop=True),
+                                  expected.sort_values('Lines').reset_index(drop=True))
+    assert detector.update(second).empty
+
+    late = second.assign(Time=second['Time'] + pd.Timedelta(minutes=30), Lat=52.3)
+    assert detector.update(late).empty
+    assert detector.evicted == 2 and len(detector) == 2
+
+    detector = OnlineSpeedDetector(10, max_vehicles=1)
+    detector.update(first)
+    assert len(detector) == 1 and detector.evicted == 1
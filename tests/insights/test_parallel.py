@@ -0,0 +1,40 @@
+"""Tests for parallel module."""
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import pytest
+
+from bwaw.insights.parallel import map_over_lines
+from tests.insights import ACTIVE_BUSES
+
+
+def _lines_with_rows(data):
+    return [(line, len(data[data['Lines'] == line])) for line in data['Lines'].unique()]
+
+
+def test_map_over_lines():
+    """Test for bwaw.insights.parallel.map_over_lines"""
+    with pytest.raises(TypeError):
+        map_over_lines(len, 'a')
+
+    with pytest.raises(ValueError):
+        map_over_lines(len, ACTIVE_BUSES, n_jobs=0)
+        map_over_lines(len, pd.DataFrame())
+
+    data = pd.concat([ACTIVE_BUSES, ACTIVE_BUSES.assign(Lines='520')], ignore_index=True)
+    data['Brigade'] = data['Brigade'].astype('category')
+    data['Seats'] = pd.array([40, None, 60, 40, 40, None, 60, 40], dtype='Int64')
+    data['LowFloor'] = pd.array([True, None, False, True] * 2, dtype='boolean')
+    assert map_over_lines(_lines_with_rows, data) == [[('213', 2), ('138', 2), ('520', 4)]]
+    assert map_over_lines(_lines_with_rows, data, partitions=4) == [[('213', 2)], [('138', 2)],
+                                                                    [('520', 4)]]
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        output = map_over_lines(pd.DataFrame.copy, data, executor=executor, partitions=2)
+    assert [i['Lines'].unique().tolist() for i in output] == [['213', '138'], ['520']]
+    pd.testing.assert_frame_equal(pd.concat(output, ignore_index=True),
+                                  data.iloc[[0, 1, 2, 3, 4, 5, 6, 7]].reset_index(drop=True))
+    assert list(output[1]['Brigade'].cat.categories) == ['05', '2']
+
+    assert map_over_lines(_lines_with_rows, data, n_jobs=2) == [[('213', 2)], [('138', 2)],
+                                                               [('520', 4)]]
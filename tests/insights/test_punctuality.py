@@ -1,9 +1,13 @@
 """Tests for punctuality module."""
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
 import pandas as pd
 import pytest
 
 from bwaw.insights.punctuality import (get_punctuality_report, get_punctuality_list_for_bus,
-                                       get_punctuality_list_for_buses)
+                                       get_punctuality_list_for_buses, get_delays_for_bus,
+                                       get_delays_for_buses, get_delays_summary)
 from tests.insights import ACTIVE_BUSES, COORDINATES, TIMETABLE
 
 
@@ -38,6 +42,9 @@ def test_get_punctuality_list_for_buses(mocker):
     output = {'213': [False], '138': [False]}
     assert get_punctuality_list_for_buses(ACTIVE_BUSES, COORDINATES,
                                           api_key=PROPER_API_KEY) == output
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        assert get_punctuality_list_for_buses(ACTIVE_BUSES, COORDINATES, api_key=PROPER_API_KEY,
+                                              executor=executor) == output
 
 
 def test_get_punctuality_report(mocker):
@@ -49,3 +56,56 @@ def test_get_punctuality_report(mocker):
              '- 213 line: 0.0% incidents.\n' \
              '- 138 line: 0.0% incidents.\n'
     assert get_punctuality_report(ACTIVE_BUSES, COORDINATES, api_key=PROPER_API_KEY) == output
+
+
+def test_get_delays_for_bus(mocker):
+    """Test for bwaw.insights.punctuality.get_delays_for_bus"""
+    with pytest.raises(TypeError):
+        get_delays_for_bus('a', COORDINATES, api_key='abc')
+    mocker.patch('bwaw.insights.punctuality.get_timetable_for_line_on_bus_stop',
+                 return_value=TIMETABLE + [{'Brigade': '2', 'Destination': 'al.Zieleniecka',
+                                            'Time': '23:59:00'}])
+    output = get_delays_for_bus(ACTIVE_BUSES[ACTIVE_BUSES['Lines'] == '213'], COORDINATES,
+                                api_key=PROPER_API_KEY)
+    assert output['Delay'].tolist() == [-33.]
+    assert output[['ID', 'Number', 'Brigade']].values.tolist() == [['1001', '01', '2']]
+
+    night = ACTIVE_BUSES[ACTIVE_BUSES['Lines'] == '213'].assign(
+        Time=pd.to_datetime(['2021-02-10 00:01:00', '2021-02-10 00:02:00']))
+    assert get_delays_for_bus(night, COORDINATES,
+                              api_key=PROPER_API_KEY)['Delay'].tolist() == [120.]
+
+    events = pd.DataFrame({'Lines': ['213'], 'Brigade': ['2'], 'ID': ['1001'], 'Number': ['01'],
+                           'Arrival': pd.to_datetime(['2021-02-09 15:45:00']),
+                           'Departure': pd.to_datetime(['2021-02-09 15:46:30'])})
+    output = get_delays_for_bus(events, COORDINATES, api_key=PROPER_API_KEY)
+    assert output[['Time', 'Delay']].values.tolist() == [[pd.Timestamp('2021-02-09 15:46:30'),
+                                                          30.]]
+
+
+def test_get_delays_for_buses(mocker):
+    """Test for bwaw.insights.punctuality.get_delays_for_buses"""
+    with pytest.raises(TypeError):
+        get_delays_for_buses(ACTIVE_BUSES, 'a', api_key='abc')
+    mocker.patch('bwaw.insights.punctuality.get_timetable_for_line_on_bus_stop',
+                 return_value=TIMETABLE)
+    output = get_delays_for_buses(ACTIVE_BUSES, COORDINATES, api_key=PROPER_API_KEY)
+    assert output['Lines'].tolist() == ['213', '138']
+    assert output['Delay'].iloc[0] == -33.
+    assert np.isnan(output['Delay'].iloc[1])
+
+    mocker.patch('bwaw.insights.punctuality.get_timetable_for_line_on_bus_stop',
+                 side_effect=ValueError)
+    assert get_delays_for_buses(ACTIVE_BUSES, COORDINATES, api_key=PROPER_API_KEY).empty
+
+
+def test_get_delays_summary(mocker):
+    """Test for bwaw.insights.punctuality.get_delays_summary"""
+    _types_check(get_delays_summary)
+    mocker.patch('bwaw.insights.punctuality.get_timetable_for_line_on_bus_stop',
+                 return_value=TIMETABLE)
+    output = get_delays_summary(ACTIVE_BUSES, COORDINATES, api_key=PROPER_API_KEY)
+    assert output.index.tolist() == ['213', '138']
+    assert output['Count'].tolist() == [1, 1]
+    assert output.at['213', 'Median'] == -0.55
+    assert output.at['213', 'Incidents'] == 0.
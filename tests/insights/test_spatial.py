@@ -0,0 +1,62 @@
+"""Tests for spatial module."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from bwaw.insights.math_ops import _calculate_distance_km_array
+from bwaw.insights.spatial import BusStopIndex
+from tests.insights import COORDINATES
+
+RNG = np.random.default_rng(0)
+STOPS = pd.DataFrame({
+    'ID': [str(i) for i in range(500)],
+    'Number': ['01'] * 500,
+    'Latitude': 52.1 + RNG.random(500) * 0.2,
+    'Longitude': 20.9 + RNG.random(500) * 0.3
+})
+POINTS_LAT = 52.1 + RNG.random(200) * 0.2
+POINTS_LON = 20.9 + RNG.random(200) * 0.3
+
+
+def test_bus_stop_index_query():
+    """Test for bwaw.insights.spatial.BusStopIndex.query"""
+    with pytest.raises(TypeError):
+        BusStopIndex([1, 2, 3])
+
+    with pytest.raises(ValueError):
+        BusStopIndex(pd.DataFrame())
+
+    index = BusStopIndex(STOPS, cell_size=0.2)
+    points, stops, distance = index.query(POINTS_LAT, POINTS_LON, 0.5)
+
+    brute = _calculate_distance_km_array(POINTS_LON[:, None], POINTS_LAT[:, None],
+                                         STOPS['Longitude'].to_numpy()[None, :],
+                                         STOPS['Latitude'].to_numpy()[None, :])
+    expected_points, expected_stops = np.nonzero(brute <= 0.5)
+    assert set(zip(points, stops)) == set(zip(expected_points, expected_stops))
+    assert np.allclose(distance, brute[points, stops])
+    assert np.all(np.diff(points) >= 0)
+
+
+def test_bus_stop_index_nearest():
+    """Test for bwaw.insights.spatial.BusStopIndex.nearest"""
+    index = BusStopIndex(COORDINATES)
+    assert list(index.nearest([52.224536, 52.2223788], [21.0921481, 21.0911025], 0.01)) == [0, -1]
+
+    index = BusStopIndex(STOPS)
+    nearest = index.nearest(POINTS_LAT, POINTS_LON, 1.)
+    brute = _calculate_distance_km_array(POINTS_LON[:, None], POINTS_LAT[:, None],
+                                         STOPS['Longitude'].to_numpy()[None, :],
+                                         STOPS['Latitude'].to_numpy()[None, :])
+    expected = np.where(brute.min(axis=1) <= 1., brute.argmin(axis=1), -1)
+    assert np.array_equal(nearest, expected)
+
+
+def test_bus_stop_index_project():
+    """Test for bwaw.insights.spatial.BusStopIndex.project"""
+    index = BusStopIndex(STOPS)
+    pos_x, pos_y = index.project(POINTS_LAT, POINTS_LON)
+    planar = np.hypot(pos_x[1:] - pos_x[:-1], pos_y[1:] - pos_y[:-1])
+    exact = _calculate_distance_km_array(POINTS_LON[1:], POINTS_LAT[1:],
+                                         POINTS_LON[:-1], POINTS_LAT[:-1])
+    assert np.allclose(planar, exact, rtol=1e-2)
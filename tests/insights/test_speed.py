@@ -1,9 +1,12 @@
 """Tests for speed module."""
+from concurrent.futures import ThreadPoolExecutor
+
 import pytest
 import pandas as pd
 import numpy as np
-from bwaw.insights.speed import (get_speed_incidents_for_bus, get_all_incidents,
-                                 get_short_incidents_summary, get_full_incidents_summary)
+from bwaw.insights.speed import (get_speed_incidents_for_bus, get_all_incidents, iter_incidents,
+                                 get_short_incidents_summary, get_full_incidents_summary,
+                                 get_incidents_hotspots)
 from tests.insights import ACTIVE_BUSES, SPEED_INCIDENT, SPEED_INCIDENTS
 
 
@@ -39,6 +42,37 @@ def test_get_all_incidents():
         else:
             assert np.all(output[col] == SPEED_INCIDENTS[col])
 
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        pd.testing.assert_frame_equal(get_all_incidents(ACTIVE_BUSES, 10, executor=executor),
+                                      output)
+    pd.testing.assert_frame_equal(get_all_incidents(ACTIVE_BUSES, 10, n_jobs=2), output)
+
+    duplicated = pd.DataFrame({
+        'Lines': ['1'] * 4, 'Brigade': ['1'] * 4, 'Lon': [21.] * 4,
+        'Lat': [52., 52.003, 52.0015, 52.004],
+        'Time': pd.to_datetime(['2021-01-01 12:00:00', '2021-01-01 12:01:00',
+                                '2021-01-01 12:01:00', '2021-01-01 12:02:00'])})
+    output = get_all_incidents(duplicated, 5)
+    assert np.allclose(output['Lat'], [52.0015, 52.00275])
+    output = get_all_incidents(duplicated.iloc[[0, 2, 1, 3]], 5)
+    assert np.allclose(output['Lat'], [52.00075, 52.0035])
+
+
+def test_iter_incidents():
+    """Test for bwaw.insights.speed.iter_incidents"""
+    with pytest.raises(TypeError):
+        next(iter_incidents(ACTIVE_BUSES, 50.4))
+
+    with pytest.raises(ValueError):
+        next(iter_incidents(ACTIVE_BUSES, 10, chunk_size=0))
+
+    for chunk_size in [1, 3, 100]:
+        output = list(iter_incidents(ACTIVE_BUSES, 10, chunk_size=chunk_size))
+        assert [(line, brigade) for line, brigade, _ in output] == [('213', '2'), ('138', '05')]
+        pd.testing.assert_frame_equal(pd.concat([i for _, _, i in output], ignore_index=True),
+                                      get_all_incidents(ACTIVE_BUSES, 10))
+    assert not list(iter_incidents(ACTIVE_BUSES, 100))
+
 
 def test_get_short_incidents_summary():
     """Test for bwaw.insights.speed.get_short_incidents_summary"""
@@ -54,6 +88,24 @@ def test_get_short_incidents_summary():
     assert output == get_short_incidents_summary(ACTIVE_BUSES, 10)[0]
 
 
+def test_get_incidents_hotspots():
+    """Test for bwaw.insights.speed.get_incidents_hotspots"""
+    with pytest.raises(TypeError):
+        get_incidents_hotspots(SPEED_INCIDENTS, 8.5)
+
+    with pytest.raises(ValueError):
+        get_incidents_hotspots(pd.DataFrame(), 8)
+        get_incidents_hotspots(SPEED_INCIDENTS, 0)
+
+    incidents = pd.DataFrame({'Lat': [52.0, 52.1, 52.4, 52.39, 52.4],
+                              'Lon': [21.0, 21.0, 21.4, 21.4, 21.01]})
+    output = get_incidents_hotspots(incidents, 2)
+    assert np.allclose(output.values, [[52.1, 21.1, 2], [52.3, 21.3, 2], [52.3, 21.1, 1]])
+    assert np.allclose(get_incidents_hotspots(SPEED_INCIDENTS).values,
+                       [[52.223457, 21.091625, 2]])
+    assert get_incidents_hotspots(SPEED_INCIDENTS.iloc[:0]).empty
+
+
 def test_get_full_incidents_summary():
     """Test for bwaw.insights.speed.get_full_incidents_summary"""
     with pytest.raises(TypeError):
@@ -69,4 +121,10 @@ def test_get_full_incidents_summary():
               '\n213    1 incidents\n'
     output += 'Top 3 places with highest number of incidents were:\n(52.22, 21.09) - 2 incidents.\n'
 
-    assert output == get_full_incidents_summary(ACTIVE_BUSES, 10)[0]
+    summary, positions = get_full_incidents_summary(ACTIVE_BUSES, 10)
+    assert output == summary
+    assert list(positions.columns) == ['Lat', 'Lon', 'Lat_grid', 'Lon_grid']
+    assert sorted(positions.index) == ['138', '213']
+    assert np.allclose(positions.loc[['138', '213'], ['Lat', 'Lon']].values,
+                       SPEED_INCIDENTS.groupby('Lines')[['Lat', 'Lon']].mean()
+                       .loc[['138', '213']].values)
@@ -0,0 +1,42 @@
+"""Tests for stop_events module."""
+import pandas as pd
+import pytest
+
+from bwaw.insights.data import build_trajectories
+from bwaw.insights.stop_events import get_stop_events
+
+STOP = pd.DataFrame([['1001', '01', 52.0, 21.0]], columns=['ID', 'Number', 'Latitude', 'Longitude'])
+PINGS = pd.DataFrame({
+    'Lines': ['213'] * 2 + ['138'] * 4,
+    'Brigade': ['2'] * 2 + ['5'] * 4,
+    'VehicleNumber': ['1001'] * 2 + ['1002'] * 4,
+    'Time': pd.to_datetime(['2021-02-09 15:00:00', '2021-02-09 15:00:20',
+                            '2021-02-09 15:00:00', '2021-02-09 15:00:10',
+                            '2021-02-09 15:00:40', '2021-02-09 15:00:50']),
+    'Lat': [52.0] * 6,
+    'Lon': [20.999, 21.001, 20.999, 21.0, 21.0, 21.001]
+})
+
+
+def test_get_stop_events():
+    """Test for bwaw.insights.stop_events.get_stop_events"""
+    with pytest.raises(TypeError):
+        get_stop_events(PINGS, STOP, proximity='20')
+
+    with pytest.raises(ValueError):
+        get_stop_events(PINGS, STOP, max_segment=0)
+
+    events = get_stop_events(PINGS, STOP)
+    assert events[['Lines', 'ID', 'Number']].values.tolist() == [['213', '1001', '01'],
+                                                                ['138', '1001', '01']]
+    start = pd.Timestamp('2021-02-09 15:00:00')
+    arrival = (events['Arrival'] - start).dt.total_seconds()
+    departure = (events['Departure'] - start).dt.total_seconds()
+    assert arrival.tolist() == pytest.approx([7.08, 7.08], abs=0.05)
+    assert departure.tolist() == pytest.approx([12.92, 42.92], abs=0.05)
+    assert events['Dwell'].tolist() == pytest.approx((departure - arrival).tolist())
+    assert events['Distance'].tolist() == pytest.approx([0., 0.])
+
+    assert get_stop_events(build_trajectories(PINGS), STOP).equals(events)
+    assert get_stop_events(PINGS, STOP, max_segment=100)['Lines'].tolist() == ['138']
+    assert get_stop_events(PINGS.assign(Lat=52.001), STOP).empty
@@ -0,0 +1,65 @@
+"""Tests for timetables module."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from bwaw.insights.timetables import TimetableStore
+from tests.insights import TIMETABLE
+
+
+def _loader(calls):
+    def load(bus_stop_id, bus_stop_nr, line):
+        calls.append((bus_stop_id, bus_stop_nr, line))
+        if bus_stop_id == '0000':
+            raise ValueError('Incorrect bus stop or line number. No results found.')
+        return pd.DataFrame(TIMETABLE + [{'Brigade': '2', 'Destination': 'x', 'Time': '05:00:01'},
+                                         {'Brigade': '3', 'Destination': 'x', 'Time': '00:00:00'}])
+    return load
+
+
+def test_timetable_store_get():
+    """Test for bwaw.insights.timetables.TimetableStore.get"""
+    with pytest.raises(TypeError):
+        TimetableStore('loader')
+
+    with pytest.raises(TypeError):
+        TimetableStore(_loader([]), max_bytes='1')
+
+    with pytest.raises(ValueError):
+        TimetableStore(_loader([]), max_bytes=0)
+
+    calls = []
+    store = TimetableStore(_loader(calls))
+    for _ in range(3):
+        timetable = store.get('1001', '01', '213')
+    assert calls == [('1001', '01', '213')]
+    assert (store.hits, store.misses) == (2, 1)
+    assert np.array_equal(timetable['2'], [5 * 3600 + 1, 15 * 3600 + 46 * 60])
+    assert np.array_equal(timetable['3'], [0])
+    assert timetable['2'].dtype == np.int64
+
+    parsed = TimetableStore(lambda *_: pd.DataFrame({'Brigade': ['2', '2'],
+                                                     'Time': ['24:39:00', '01:00:00']}))
+    assert np.array_equal(parsed.get('1001', '01', '213')['2'], [2340, 3600])
+
+    for _ in range(2):
+        with pytest.raises(ValueError):
+            store.get('0000', '01', '213')
+    assert len(calls) == 2
+
+
+def test_timetable_store_eviction():
+    """Test for bwaw.insights.timetables.TimetableStore eviction"""
+    calls = []
+    store = TimetableStore(_loader(calls), max_bytes=1)
+    store.get('1001', '01', '213')
+    store.get('1001', '02', '213')
+    assert len(store) == 1
+    assert ('1001', '02', '213') in store
+    store.get('1001', '01', '213')
+    assert len(calls) == 3
+
+    store = TimetableStore(_loader(calls))
+    store.get('1001', '01', '213')
+    store.clear()
+    assert len(store) == 0 and store.nbytes == 0
@@ -0,0 +1,57 @@
+"""Tests for archive module."""
+import pandas as pd
+import pytest
+
+from bwaw.io.archive import GpsArchive
+
+DATA = pd.DataFrame([
+    ['213', 21.0921481, '1001', '2021-02-09 15:45:27', 52.224536, '2'],
+    ['138', 21.0921481, '1002', '2021-02-09 23:59:27', 52.224536, '05'],
+    ['213', 21.0911025, '1001', '2021-02-09 15:46:22', 52.2223788, '2'],
+    ['213', 21.0911025, '1003', '2021-02-09 15:46:22', 52.2223788, '3'],
+    ['138', 21.0911025, '1002', '2021-02-10 00:00:22', 52.2223788, '05']
+], columns=['Lines', 'Lon', 'VehicleNumber', 'Time', 'Lat', 'Brigade'])
+DATA['Time'] = pd.to_datetime(DATA['Time'])
+COLUMNS = ['Lines', 'Brigade', 'VehicleNumber', 'Lat', 'Lon', 'Time']
+
+
+def _expected(mask):
+    return DATA[mask][COLUMNS].sort_values(by='Time', kind='mergesort').reset_index(drop=True)
+
+
+def test_gps_archive(tmp_path):
+    """Test for bwaw.io.archive.GpsArchive"""
+    with pytest.raises(TypeError):
+        GpsArchive(5)
+
+    archive = GpsArchive(tmp_path / 'archive')
+    with pytest.raises(ValueError):
+        archive.append(DATA.drop(columns=['Lat']))
+
+    archive.append(DATA.iloc[:3])
+    archive = GpsArchive(tmp_path / 'archive')
+    archive.append(DATA.iloc[3:])
+
+    assert archive.days() == ['2021-02-09', '2021-02-10']
+    assert len(archive) == 5
+    assert archive.get_all_of_line('213').equals(_expected(DATA['Lines'] == '213'))
+    assert archive.get_all_of_line('138', end='2021-02-09 23:59:59').equals(
+        _expected(DATA['Time'] == pd.Timestamp('2021-02-09 23:59:27')))
+    assert archive.get_all_of_brigade('3').equals(_expected(DATA['Brigade'] == '3'))
+    assert archive.get_all_of_brigade('2', line='138').empty
+    assert archive.get_all_of_time('2021-02-09 15:46:00', '2021-02-10 00:00:00').equals(
+        _expected((DATA['Time'] >= '2021-02-09 15:46:00') & (DATA['Time'] <= '2021-02-10')))
+    assert archive.get_all_of_line('180').empty
+
+    assert sorted(archive._indexes) == archive.days()  # pylint: disable=protected-access
+    archive.append(DATA.iloc[:1])
+    assert list(archive._indexes) == ['2021-02-10']  # pylint: disable=protected-access
+    assert len(archive) == 6 and len(archive.get_all_of_brigade('2', line='213')) == 3
+
+    with pytest.raises(ValueError):
+        archive.get_all_of_time('2021.02.09', '2021-02-10 00:00:00')
+
+    missing = GpsArchive(tmp_path / 'missing')
+    missing.append(DATA.assign(Brigade=[None, '05', '2', '3', '05']))
+    assert missing.get_all_of_line('213')['Brigade'].tolist() == [None, '2', '3']
+    assert len(missing.get_all_of_brigade('3', line='213')) == 1
@@ -1,8 +1,11 @@
 """Tests for load module."""
 from pathlib import Path
+import numpy as np
 import pytest
 import pandas as pd
-from bwaw.io.load import load_response_from_pickle, load_response_from_csv
+from bwaw.io.load import (load_response_from_pickle, load_response_from_csv,
+                          load_response_from_columnar)
+from bwaw.io.save import save_response_to_columnar
 
 ANSWER = pd.DataFrame([{
     'ID': '1001',
@@ -32,3 +35,50 @@ def test_load_response_from_pickle():
 
     loaded = load_response_from_pickle(resources_path / 'resources/test.pkl')
     assert loaded.equals(ANSWER)
+
+
+def test_load_response_from_columnar(tmp_path):
+    """Test for bwaw.io.load.load_response_from_columnar"""
+    with pytest.raises(TypeError):
+        load_response_from_columnar(5)
+
+    with pytest.raises(ValueError):
+        load_response_from_columnar(tmp_path / 'data.csv')
+
+    response = [{'Lines': '213', 'Lon': '21.09', 'VehicleNumber': '1001',
+                 'Time': '2021-02-09 15:46:22', 'Lat': '52.22', 'Brigade': '2'},
+                {'Lines': '138', 'Lon': '21.08', 'VehicleNumber': '1002',
+                 'Time': '2021-02-09 15:45:27', 'Lat': '52.23', 'Brigade': '05'},
+                {'Lines': '213', 'Lon': '21.07', 'VehicleNumber': '1001',
+                 'Time': '2021-02-09 15:47:00', 'Lat': '52.24', 'Brigade': '2'}]
+    save_response_to_columnar(response, tmp_path / 'data.cols')
+
+    loaded = load_response_from_columnar(tmp_path / 'data.cols')
+    assert list(loaded.columns) == list(response[0])
+    assert list(loaded['Lines']) == ['138', '213', '213']
+    assert loaded['Lines'].dtype == 'category'
+    assert loaded['Lat'].dtype == np.float64
+    assert loaded['Time'].dtype == 'datetime64[ns]'
+
+    loaded = load_response_from_columnar(str(tmp_path / 'data.cols'), columns=['Lat', 'Time'],
+                                         start='2021-02-09 15:46:00', lines=['213', '180'])
+    assert loaded.equals(pd.DataFrame({'Lat': [52.22, 52.24],
+                                       'Time': pd.to_datetime(['2021-02-09 15:46:22',
+                                                               '2021-02-09 15:47:00'])}))
+
+    loaded = load_response_from_columnar(tmp_path / 'data.cols', columns=['Lines'],
+                                         end=pd.Timestamp('2021-02-09 15:46:22'))
+    assert list(loaded['Lines']) == ['138', '213']
+
+    with pytest.raises(ValueError):
+        load_response_from_columnar(tmp_path / 'data.cols', columns=['Speed'])
+
+    missing = pd.DataFrame({'Lines': ['213', None, 138], 'Brigade': [np.nan, '2', '05'],
+                            'Time': pd.to_datetime(['2021-02-09 15:45:00', '2021-02-09 15:46:00',
+                                                    '2021-02-09 15:47:00'])})
+    save_response_to_columnar(missing, tmp_path / 'missing.cols')
+    loaded = load_response_from_columnar(tmp_path / 'missing.cols')
+    assert loaded['Lines'].isna().tolist() == [False, True, False]
+    assert loaded['Brigade'].isna().tolist() == [True, False, False]
+    assert list(loaded['Lines'].cat.categories) == ['138', '213']
+    assert 'nan' not in list(loaded['Brigade'].cat.categories)
@@ -2,7 +2,7 @@
 from pathlib import Path
 import pytest
 import pandas as pd
-from bwaw.io.save import save_response_to_csv, save_response_to_pickle
+from bwaw.io.save import save_response_to_csv, save_response_to_pickle, save_response_to_columnar
 
 LIST_ANSWER = [1, 2, 3]
 PANDAS_ANSWER = pd.DataFrame([[1, 2, 3]], columns=['a', 'b', 'c'])
@@ -37,3 +37,20 @@ def test_save_response_to_csv():
 def test_save_response_to_pickle():
     """Test for bwaw.io.save_response_to_pickle"""
     _general_test('.pkl', save_response_to_pickle)
+
+
+def test_save_response_to_columnar(tmp_path):
+    """Test for bwaw.io.save.save_response_to_columnar"""
+    with pytest.raises(TypeError):
+        save_response_to_columnar(WRONG_TYPE, tmp_path / 'data.cols')
+
+    with pytest.raises(ValueError):
+        save_response_to_columnar(PANDAS_ANSWER, tmp_path / 'data.csv')
+
+    save_response_to_columnar([{'Lines': '213', 'Lat': 52.2, 'Time': '2021-02-09 15:45:27'}],
+                              tmp_path / 'non/existing.cols')
+    assert (tmp_path / 'non/existing.cols/meta.json').exists()
+
+    categorical = PANDAS_ANSWER.astype({'a': 'category'})
+    save_response_to_columnar(categorical, tmp_path / 'categorical.cols')
+    assert (tmp_path / 'categorical.cols/meta.json').exists()
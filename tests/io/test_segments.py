@@ -0,0 +1,38 @@
+"""Tests for segments module."""
+from unittest import mock
+import pytest
+from bwaw.io.segments import SegmentStore
+
+SNAPSHOTS = [{'result': [{'Lines': str(i), 'Lat': 52.2}]} for i in range(7)]
+
+
+def test_segment_store(tmp_path):
+    """Test for bwaw.io.segments.SegmentStore"""
+    with pytest.raises(TypeError):
+        SegmentStore(5)
+
+    with pytest.raises(ValueError):
+        SegmentStore(tmp_path, segment_size=0)
+
+    path = tmp_path / 'store'
+    with SegmentStore(path, segment_size=3) as store:
+        for snapshot in SNAPSHOTS[:5]:
+            store.append(snapshot)
+        assert len(store) == 5
+    assert len(list(path.glob('segment_*.jsonl'))) == 2
+
+    with (path / 'segment_000001.jsonl').open('ab') as segment:
+        segment.write(b'{"result": [{"Lin')
+
+    with mock.patch('bwaw.io.segments.READ_BLOCK_BYTES', 4):
+        assert len(SegmentStore(path)) == 5
+    with SegmentStore(path, segment_size=10) as store:
+        assert len(store) == 5
+        assert store.segment_size == 3
+        for snapshot in SNAPSHOTS[5:]:
+            store.append(snapshot)
+        assert list(store) == SNAPSHOTS
+    assert len(list(path.glob('segment_*.jsonl'))) == 3
+
+    SegmentStore(path).clear()
+    assert not path.exists()
@@ -4,7 +4,7 @@ import pytest
 
 from bwaw.utils.format_conversion import (convert_response_list_to_dataframe,
                                           convert_dataframe_to_response_list,
-                                          column_str_to_datetime)
+                                          column_str_to_datetime, column_time_to_seconds)
 
 RESPONSE_LIST = [{'a': 1, 'b': 1}, {'a': 2, 'b': 2}]
 RESPONSE_PANDAS = pd.DataFrame([[1, 1], [2, 2]], columns=['a', 'b'])
@@ -41,5 +41,22 @@ def test_column_str_to_datetime():
         column_str_to_datetime(pd.Series(['24-2-05']))
         column_str_to_datetime(pd.Series(['24-15-12 12.12.12']))
 
+    with pytest.raises(ValueError, match='rows: 1'):
+        column_str_to_datetime(pd.Series(['12:00:00', '12:00:00xyz']), time_only=True)
+
     assert column_str_to_datetime(SERIES_TIME_ONLY, time_only=True)[0] == TIME
     assert column_str_to_datetime(SERIES_FULL)[0] == FULL
+
+
+def test_column_time_to_seconds():
+    """Test for bwaw.utils.format_conversion.column_time_to_seconds"""
+    with pytest.raises(TypeError):
+        column_time_to_seconds(['12:30:00'])
+        column_time_to_seconds(pd.Series([1230]))
+
+    with pytest.raises(ValueError):
+        column_time_to_seconds(pd.Series(['12:30:00', '2021-02-09 12:30:00']))
+
+    output = column_time_to_seconds(pd.Series(['00:00:00', '12:30:05', '24:10:00']))
+    assert output.tolist() == [0, 45005, 87000]
+    assert output.dtype == 'int64'
@@ -0,0 +1,190 @@
+"""Tests for metrics module."""
+import json
+import logging
+from unittest import mock
+import pandas as pd
+import pytest
+from bwaw.api import RESOURCE_ID
+from bwaw.api.download import _get_resource_from_request
+from bwaw.api.requests import _create_request
+from bwaw.io.load import load_response_from_csv
+from bwaw.io.save import save_response_to_csv
+from bwaw.utils.metrics import (MetricsRegistry, LoggingSink, JsonLinesSink, PrometheusTextSink,
+                                increment, observe, timer, timed, set_metrics_registry,
+                                get_metrics_registry)
+from tests import FakeClock
+
+RESPONSE = {'result': [{'values': [{'key': 'zespol', 'value': '1001'}]}]}
+
+
+def _filled_registry(sinks=None):
+    registry = MetricsRegistry(sinks=sinks)
+    registry.increment('api_responses', endpoint='busestrams_get', status=200)
+    registry.observe('io_seconds', 2., operation='save')
+    registry.observe('io_seconds', 1., operation='save')
+    return registry
+
+
+def test_metrics_registry():
+    """Test for bwaw.utils.metrics.MetricsRegistry"""
+    with pytest.raises(TypeError):
+        MetricsRegistry(sinks='sink')
+
+    registry = _filled_registry()
+    registry.increment('api_responses', 2, status=200, endpoint='busestrams_get')
+    assert registry.snapshot() == [
+        {'name': 'api_responses', 'labels': {'endpoint': 'busestrams_get', 'status': '200'},
+         'type': 'counter', 'sum': 3},
+        {'name': 'io_seconds', 'labels': {'operation': 'save'}, 'type': 'summary',
+         'count': 2, 'sum': 3., 'max': 2.}]
+
+    sink = mock.MagicMock()
+    registry.sinks.append(sink)
+    registry.flush()
+    assert sink.emit.call_args[0][0] == registry.snapshot()
+    registry.reset()
+    assert registry.snapshot() == []
+
+
+def test_logging_sink(caplog):
+    """Test for bwaw.utils.metrics.LoggingSink"""
+    with caplog.at_level(logging.INFO, logger='bwaw.utils.metrics'):
+        _filled_registry([LoggingSink()]).flush()
+    assert caplog.messages == [
+        'metric api_responses{endpoint=busestrams_get,status=200} sum=1',
+        'metric io_seconds{operation=save} count=2 sum=3 max=2']
+
+
+def test_json_lines_sink(tmp_path):
+    """Test for bwaw.utils.metrics.JsonLinesSink"""
+    with pytest.raises(TypeError):
+        JsonLinesSink(5)
+
+    path = tmp_path / 'metrics' / 'bwaw.jsonl'
+    registry = _filled_registry([JsonLinesSink(path)])
+    registry.flush()
+    registry.flush()
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert len(lines) == 4
+    assert lines[1]['name'] == 'io_seconds' and lines[1]['count'] == 2
+    assert lines[0]['time'] == lines[1]['time'] <= lines[2]['time']
+
+
+def test_prometheus_text_sink(tmp_path):
+    """Test for bwaw.utils.metrics.PrometheusTextSink"""
+    path = tmp_path / 'bwaw.prom'
+    registry = _filled_registry([PrometheusTextSink(path)])
+    registry.observe('io_seconds', 4., operation='load "C:\\data"\n')
+    registry.flush()
+    registry.flush()
+    assert path.read_text().splitlines() == [
+        '# TYPE bwaw_api_responses_total counter',
+        'bwaw_api_responses_total{endpoint="busestrams_get",status="200"} 1',
+        '# TYPE bwaw_io_seconds summary',
+        'bwaw_io_seconds_count{operation="load \\"C:\\\\data\\"\\n"} 1',
+        'bwaw_io_seconds_sum{operation="load \\"C:\\\\data\\"\\n"} 4',
+        'bwaw_io_seconds_count{operation="save"} 2',
+        'bwaw_io_seconds_sum{operation="save"} 3',
+        '# TYPE bwaw_io_seconds_max gauge',
+        'bwaw_io_seconds_max{operation="load \\"C:\\\\data\\"\\n"} 4',
+        'bwaw_io_seconds_max{operation="save"} 2']
+    assert [file.name for file in tmp_path.iterdir()] == ['bwaw.prom']
+
+
+def test_increment():
+    """Test for bwaw.utils.metrics.increment"""
+    increment('ignored')
+    registry = MetricsRegistry()
+    set_metrics_registry(registry)
+    try:
+        increment('rows', 5, function='f')
+        increment('rows', function='f')
+    finally:
+        set_metrics_registry(None)
+    increment('rows', function='f')
+    assert registry.snapshot()[0]['sum'] == 6
+
+
+def test_observe():
+    """Test for bwaw.utils.metrics.observe"""
+    observe('ignored', 1.)
+    registry = MetricsRegistry()
+    set_metrics_registry(registry)
+    try:
+        observe('size', 3)
+        observe('size', 1)
+    finally:
+        set_metrics_registry(None)
+    assert registry.snapshot()[0]['count'] == 2 and registry.snapshot()[0]['max'] == 3
+
+
+def test_timer():
+    """Test for bwaw.utils.metrics.timer"""
+    with timer('ignored'):
+        pass
+
+    registry = MetricsRegistry(clock=FakeClock(step=0.5))
+    set_metrics_registry(registry)
+    try:
+        with pytest.raises(KeyError):
+            with timer('block', stage='a'):
+                raise KeyError('failed')
+    finally:
+        set_metrics_registry(None)
+    assert registry.snapshot() == [{'name': 'block', 'labels': {'stage': 'a'},
+                                    'type': 'summary', 'count': 1, 'sum': .5, 'max': .5}]
+
+
+def test_timed():
+    """Test for bwaw.utils.metrics.timed"""
+    @timed('call_seconds')
+    def add(first, second=1):
+        """Adds numbers."""
+        return first + second
+
+    assert add.__name__ == 'add' and add.__doc__ == 'Adds numbers.'
+    assert add(1) == 2
+
+    registry = MetricsRegistry(clock=FakeClock(step=0.5))
+    set_metrics_registry(registry)
+    try:
+        assert add(1, second=2) == 3
+        assert add(2) == 3
+    finally:
+        set_metrics_registry(None)
+    assert registry.snapshot() == [{'name': 'call_seconds', 'labels': {'function': 'add'},
+                                    'type': 'summary', 'count': 2, 'sum': 1., 'max': .5}]
+
+
+def test_set_metrics_registry(tmp_path):
+    """Test for bwaw.utils.metrics.set_metrics_registry"""
+    with pytest.raises(TypeError):
+        set_metrics_registry('registry')
+
+    registry = MetricsRegistry()
+    set_metrics_registry(registry)
+    try:
+        assert get_metrics_registry() is registry
+        req = _create_request('dbstore_get', {'id': RESOURCE_ID.BUS_STOP_COORDINATE,
+                                                       'apikey': 'secret'})
+        reply = mock.MagicMock()
+        reply.__enter__.return_value.read.return_value = json.dumps(RESPONSE).encode()
+        reply.__enter__.return_value.status = 200
+        with mock.patch('bwaw.api.download.request.urlopen', return_value=reply):
+            _get_resource_from_request(req)
+
+        path = tmp_path / 'data.csv'
+        save_response_to_csv(pd.DataFrame({'Lines': ['1', '2', '3']}), path)
+        load_response_from_csv(path)
+    finally:
+        set_metrics_registry(None)
+    assert get_metrics_registry() is None
+
+    metrics = {(metric['name'], tuple(metric['labels'].values())): metric
+               for metric in registry.snapshot()}
+    assert metrics[('api_responses', ('dbstore_get', '200'))]['sum'] == 1
+    assert metrics[('api_response_bytes', ('dbstore_get',))]['sum'] == len(json.dumps(RESPONSE))
+    assert metrics[('api_request_seconds', ('dbstore_get',))]['count'] == 1
+    assert metrics[('io_rows', ('.csv', 'load'))]['sum'] == 3
+    assert metrics[('io_bytes', ('.csv', 'save'))]['sum'] == path.stat().st_size
+    assert metrics[('io_seconds', ('.csv', 'save'))]['count'] == 1
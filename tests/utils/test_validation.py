@@ -3,7 +3,8 @@ import pytest
 import pandas as pd
 from bwaw.utils.validation import (validate_data_is_type, validate_multiple_params,
                                    validate_if_contains_columns, validate_data_is_time_column,
-                                   validate_matches_time_format)
+                                   validate_matches_time_format,
+                                   validate_column_matches_time_format)
 
 COLUMNS_CHECK = pd.DataFrame(columns=['a', 'b', 'c'])
 
@@ -58,3 +59,21 @@ def test_validate_matches_time_format():
     with pytest.raises(ValueError):
         validate_matches_time_format('abcd')
         validate_matches_time_format('12.30.00')
+
+
+def test_validate_column_matches_time_format():
+    """Test for bwaw.utils.validation.validate_column_matches_time_format"""
+    validate_column_matches_time_format(pd.Series(['2021-02-21', '12:30:00',
+                                                   '2021-02-21 12:30:00']))
+    validate_column_matches_time_format(pd.Series([], dtype=object))
+    validate_column_matches_time_format(pd.Series(['12:30']), '[0-9]{2}:[0-9]{2}')
+
+    with pytest.raises(TypeError):
+        validate_column_matches_time_format(['12:30:00'])
+        validate_column_matches_time_format(pd.Series(['12:30:00', 1]))
+
+    with pytest.raises(ValueError, match='2 rows: 1, 3'):
+        validate_column_matches_time_format(pd.Series(['12:30:00', 'abcd', '12:31:00', '1.2']))
+
+    with pytest.raises(ValueError, match='1 rows: 0'):
+        validate_column_matches_time_format(pd.Series(['12:00:00xyz', '2021-02-21 12:30:00']))